@@ -0,0 +1,250 @@
+"""
+Archival of soft-deleted projects and tasks.
+
+Deleted projects and tasks stay in place for ARCHIVE_RETENTION_DAYS after
+deleted_at, where restoring them is just clearing is_deleted. After that a
+run moves them into projects_archive / tasks_archive, so the hot tables and
+their indexes only grow with live data. Each batch of ARCHIVE_BATCH_ROWS
+rows, all from one tenant, is its own transaction:
+  1. tasks deleted before the cutoff, and all tasks of projects deleted
+     before it
+  2. once a project has no tasks left, the project itself, along with its
+     memberships (into project_members_archive) so a restore brings its
+     owners back
+Archived rows leave sync tombstones, so a client that last synced before
+the delete still learns the rows are gone. A batch takes its tenant's
+change number (and tenant row lock) before locking any rows, in the same
+order as every other writer.
+
+Archival takes row locks with SKIP LOCKED, so it passes over rows a restore
+is working on, and a restore that comes second finds the rows in the archive.
+POST /projects/{id}/restore and /projects/{id}/task/{id}/restore move rows
+back and undelete them.
+
+Every worker runs the loop, but on Postgres an advisory lock lets only one
+do the work.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, delete, exists, insert, or_, select, text, update
+from ..database import async_engine
+from ..models import models
+from . import changes, task_counters
+
+
+ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "30"))
+ARCHIVE_BATCH_ROWS = int(os.getenv("ARCHIVE_BATCH_ROWS", "1000"))
+# 0 disables the in-app loop (run archive_deleted.py from cron instead)
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+
+ADVISORY_LOCK_KEY = 804_221_003
+
+
+def move(source, target, where) -> list:
+    """Statements that move source's rows matching where into target; run in order."""
+    names = [column.name for column in source.columns if column.name in target.c]
+    return [
+        insert(target).from_select(names, select(*(source.c[name] for name in names)).where(where)),
+        delete(source).where(where),
+    ]
+
+
+def deleted_projects(cutoff: datetime):
+    return select(models.Project.id).where(
+        models.Project.is_deleted.is_(True),
+        models.Project.deleted_at < cutoff,
+    )
+
+
+def archivable_tasks(cutoff: datetime):
+    return or_(
+        and_(models.Task.is_deleted.is_(True), models.Task.deleted_at < cutoff),
+        models.Task.project_id.in_(deleted_projects(cutoff)),
+    )
+
+
+def archive_batch(conn, cutoff: datetime, limit: int = ARCHIVE_BATCH_ROWS):
+    """Move one batch on a sync connection (inside a transaction). None if another worker holds the lock."""
+    if conn.dialect.name == "postgresql":
+        if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY}).scalar():
+            return None
+
+    tenant_id = conn.execute(select(models.Task.tenant_id).where(archivable_tasks(cutoff)).limit(1)).scalar()
+    if tenant_id is None:
+        tenant_id = conn.execute(
+            deleted_projects(cutoff).with_only_columns(models.Project.tenant_id).limit(1)
+        ).scalar()
+    if tenant_id is None:
+        return {"tasks": 0, "projects": 0}
+    seq = conn.execute(changes.next_seq_statement(tenant_id)).scalar()
+
+    task_ids = conn.execute(
+        select(models.Task.id).where(models.Task.tenant_id == tenant_id, archivable_tasks(cutoff))
+        .order_by(models.Task.id).limit(limit)
+        .with_for_update(of=models.Task, skip_locked=True)
+    ).scalars().all()
+    if task_ids:
+        where = models.Task.id.in_(task_ids)
+        conn.execute(changes.tombstones_from(tenant_id, seq, "task", models.Task.id, models.Task.project_id, where))
+        for statement in move(models.Task.__table__, models.tasks_archive, where):
+            conn.execute(statement)
+
+    project_ids = []
+    if len(task_ids) < limit:
+        project_ids = conn.execute(
+            deleted_projects(cutoff)
+            .where(models.Project.tenant_id == tenant_id)
+            .where(~exists().where(models.Task.project_id == models.Project.id))
+            .order_by(models.Project.id).limit(limit)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if project_ids:
+            members = models.ProjectMembers.project_id.in_(project_ids)
+            projects = models.Project.id.in_(project_ids)
+            statements = (
+                [
+                    changes.tombstones_from(tenant_id, seq, "member", models.ProjectMembers.id,
+                                            models.ProjectMembers.project_id, members),
+                    changes.tombstones_from(tenant_id, seq, "project", models.Project.id, models.Project.id, projects),
+                ]
+                + move(models.ProjectMembers.__table__, models.project_members_archive, members)
+                + move(models.Project.__table__, models.projects_archive, projects)
+            )
+            for statement in statements:
+                conn.execute(statement)
+
+    return {"tasks": len(task_ids), "projects": len(project_ids)}
+
+
+async def run_once(bind=async_engine) -> dict:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=ARCHIVE_RETENTION_DAYS)
+    moved = {"tasks": 0, "projects": 0}
+    while True:
+        async with bind.begin() as conn:
+            batch = await conn.run_sync(archive_batch, cutoff)
+        if batch is None:
+            return {"skipped": True}
+        moved["tasks"] += batch["tasks"]
+        moved["projects"] += batch["projects"]
+        if not batch["tasks"] and not batch["projects"]:
+            return moved
+
+
+async def run_forever(interval: float = ARCHIVE_INTERVAL_SECONDS):
+    while True:
+        try:
+            await run_once()
+        except Exception as e:
+            print(f"Archival error: {e}")
+        await asyncio.sleep(interval)
+
+
+def unassign_departed(where):
+    """Archived tasks keep assignees who have since been deleted; clear them like ON DELETE SET NULL would."""
+    return (
+        update(models.tasks_archive)
+        .where(where, models.tasks_archive.c.assigned_to.notin_(select(models.User.id)))
+        .values(assigned_to=None)
+    )
+
+
+def drop_tombstones(kind: str, ids):
+    """Restored rows are live again under the same id; their archival tombstones must not delete them."""
+    return delete(models.SyncTombstone).where(models.SyncTombstone.kind == kind, models.SyncTombstone.object_id.in_(ids))
+
+
+async def was_owner(db, user_id: int, project_id: int) -> bool:
+    """Whether the user owns the project, counting archived memberships."""
+    live = select(models.ProjectMembers.id).where(
+        models.ProjectMembers.project_id == project_id,
+        models.ProjectMembers.user_id == user_id,
+        models.ProjectMembers.role == "owner",
+    )
+    archived = select(models.project_members_archive.c.id).where(
+        models.project_members_archive.c.project_id == project_id,
+        models.project_members_archive.c.user_id == user_id,
+        models.project_members_archive.c.role == "owner",
+    )
+    return await db.scalar(select(or_(exists(live), exists(archived))))
+
+
+async def restore_project(db, tenant_id: int, project_id: int, *, seq: int) -> bool:
+    """
+    Move a project and its tasks and memberships back from the archive,
+    wherever they are, and undelete the project. False if there is no such
+    project. Does not commit.
+    """
+    in_place = await db.scalar(
+        select(models.Project.id)
+        .where(models.Project.id == project_id, models.Project.tenant_id == tenant_id)
+        .with_for_update()
+    )
+    if in_place is None:
+        archived = await db.scalar(select(models.projects_archive.c.id).where(
+            models.projects_archive.c.id == project_id,
+            models.projects_archive.c.tenant_id == tenant_id,
+        ))
+        if archived is None:
+            return False
+        for statement in move(models.projects_archive, models.Project.__table__,
+                              models.projects_archive.c.id == project_id):
+            await db.execute(statement)
+
+    members = models.project_members_archive.c
+    for statement in move(models.project_members_archive, models.ProjectMembers.__table__,
+                          and_(members.project_id == project_id, members.user_id.in_(select(models.User.id)))):
+        await db.execute(statement)
+    # Memberships of users deleted since
+    await db.execute(delete(models.project_members_archive).where(members.project_id == project_id))
+
+    tasks = models.tasks_archive.c.project_id == project_id
+    await db.execute(unassign_departed(tasks))
+    for statement in move(models.tasks_archive, models.Task.__table__, tasks):
+        await db.execute(statement)
+
+    await db.execute(drop_tombstones("project", [project_id]))
+    await db.execute(drop_tombstones("task", select(models.Task.id).where(models.Task.project_id == project_id)))
+    await db.execute(drop_tombstones(
+        "member", select(models.ProjectMembers.id).where(models.ProjectMembers.project_id == project_id)
+    ))
+
+    await db.execute(
+        update(models.Project).where(models.Project.id == project_id)
+        .values(is_deleted=False, deleted_at=None, version=models.Project.version + 1, change_seq=seq)
+        .execution_options(synchronize_session=False)
+    )
+    # Clients that dropped these rows with the project need them again
+    await db.execute(
+        update(models.Task).where(models.Task.project_id == project_id).values(change_seq=seq)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(models.ProjectMembers).where(models.ProjectMembers.project_id == project_id).values(change_seq=seq)
+        .execution_options(synchronize_session=False)
+    )
+    for statement in task_counters.recount(project_id):
+        await db.execute(statement)
+    return True
+
+
+async def restore_task(db, project_id: int, task_id: int):
+    """
+    Move a task back from the archive if it is there. Returns the task,
+    locked, or None if the project has no such task, and whether it came
+    from the archive. Does not commit or undelete.
+    """
+    archived = and_(models.tasks_archive.c.id == task_id, models.tasks_archive.c.project_id == project_id)
+    await db.execute(unassign_departed(archived))
+    copy, remove = move(models.tasks_archive, models.Task.__table__, archived)
+    moved = (await db.execute(copy)).rowcount > 0
+    await db.execute(remove)
+    if moved:
+        await db.execute(drop_tombstones("task", [task_id]))
+    task = await db.scalar(
+        select(models.Task)
+        .where(models.Task.id == task_id, models.Task.project_id == project_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return task, moved
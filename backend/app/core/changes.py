@@ -0,0 +1,55 @@
+"""
+Per-tenant change sequence for delta sync (GET /sync).
+
+Every write to a project, task, project membership or file stamps the rows
+it touches with change_seq = next_seq(db, tenant_id). next_seq increments
+tenant.change_seq with UPDATE ... RETURNING, which holds that tenant row's
+lock until the transaction ends. Writers in one tenant therefore get their
+numbers in commit order: once a client has seen sequence n, nothing with a
+number <= n can still commit. A transaction may call next_seq more than
+once; each call just hands out a higher number.
+
+Hard deletes (memberships, files) leave a SyncTombstone with the deleting
+transaction's number. Projects and tasks are soft-deleted, so their rows
+carry is_deleted themselves, until archival moves them out of the live
+tables; it leaves tombstones for them and their memberships then.
+"""
+from sqlalchemy import insert, literal, select, update
+from ..models import models
+
+
+def next_seq_statement(tenant_id: int):
+    return (
+        update(models.Tenant)
+        .where(models.Tenant.id == tenant_id)
+        .values(change_seq=models.Tenant.change_seq + 1)
+        .returning(models.Tenant.change_seq)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def next_seq(db, tenant_id: int) -> int:
+    """Allocate a change sequence number for this tenant. Does not commit."""
+    return await db.scalar(next_seq_statement(tenant_id))
+
+
+def tombstone(tenant_id: int, seq: int, kind: str, object_id: int, project_id: int = None) -> models.SyncTombstone:
+    """A tombstone to db.add() alongside the delete."""
+    return models.SyncTombstone(tenant_id=tenant_id, change_seq=seq, kind=kind,
+                                object_id=object_id, project_id=project_id)
+
+
+def tombstones_from(tenant_id: int, seq: int, kind: str, ids, project_ids, where):
+    """INSERT ... SELECT of tombstones for the rows of ids/project_ids columns matching where."""
+    return insert(models.SyncTombstone).from_select(
+        ["tenant_id", "change_seq", "kind", "object_id", "project_id"],
+        select(literal(tenant_id), literal(seq), literal(kind), ids, project_ids).where(where),
+    )
+
+
+async def tombstone_memberships(db, tenant_id: int, seq: int, user_id: int):
+    """Tombstones for all of a user's memberships, before the user (and so they) are deleted."""
+    await db.execute(tombstones_from(
+        tenant_id, seq, "member", models.ProjectMembers.id, models.ProjectMembers.project_id,
+        models.ProjectMembers.user_id == user_id,
+    ))
@@ -1,19 +1,25 @@
 from fastapi.responses import Response 
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers
 
 MAX_SIZE = 10 * 1024 * 1024
 
-class LimitUploadSizeMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
+class LimitUploadSizeMiddleware:
+    """Pure ASGI middleware: rejects POST bodies declared larger than MAX_SIZE with 413."""
 
-        cl = request.headers.get("content-length")
+    def __init__(self, app):
+        self.app = app
 
-        if request.method == "POST" and cl:
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST":
 
-            if int(cl) > MAX_SIZE:
-                return Response(
+            cl = Headers(scope=scope).get("content-length")
+
+            if cl and int(cl) > MAX_SIZE:
+                response = Response(
                     "File too large (max 10MB)",
                     status_code=413
                 )
+                await response(scope, receive, send)
+                return
         
-        return await call_next(request)
\ No newline at end of file
+        await self.app(scope, receive, send)
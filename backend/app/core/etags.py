@@ -0,0 +1,43 @@
+"""
+Weak ETags and conditional GET for polled list endpoints.
+
+A handler computes its ETag from cheap inputs (a project's version, the
+caller, the query string) before loading any rows. If the client's
+If-None-Match already has it, the handler returns a bare 304 and skips the
+queries and serialization entirely. Cache-Control: no-cache makes browsers
+revalidate on every poll instead of reusing a stale copy.
+"""
+import hashlib
+from fastapi import Request, Response
+
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make(*parts) -> str:
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison against an If-None-Match header."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def conditional(request: Request, response: Response, *parts):
+    """
+    Tag the response with an ETag built from parts, the path and the query
+    string. Returns a 304 Response to send instead when the client already
+    has this version, otherwise None.
+    """
+    etag = make(request.url.path, request.url.query, *parts)
+    if matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return None
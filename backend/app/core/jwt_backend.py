@@ -0,0 +1,140 @@
+"""
+JWT signing backends and the verified-claims cache used by oauth2.
+
+JWT_BACKEND picks the library that signs and checks access tokens:
+    jose   python-jose (default)
+    pyjwt  PyJWT; about 3x jose's HS256 verify rate (see bench_jwt.py)
+Both accept each other's tokens, so switching backends logs nobody out.
+For HS* algorithms the key is SECRET_KEY. For asymmetric ones (EdDSA needs
+pyjwt) tokens are signed with the PEM in JWT_PRIVATE_KEY_FILE and checked
+with JWT_PUBLIC_KEY_FILE; that is slower per verify than HMAC but lets
+other services check tokens without holding the signing key.
+
+TokenCache keeps the claims of tokens that already passed verification,
+keyed by the token's SHA-256 digest, until their exp. Access tokens are
+sent with every request for up to 30 minutes, so most requests skip the
+signature check altogether. Revocation is checked by the caller on every
+request and is not affected by the cache.
+"""
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+
+JWT_BACKEND = os.getenv("JWT_BACKEND", "jose").lower()
+JWT_CACHE_MAX_TOKENS = int(os.getenv("JWT_CACHE_MAX_TOKENS", "10000"))
+
+
+class InvalidToken(Exception):
+    """Bad signature, malformed token or expired claims, whatever the backend."""
+
+
+def _read_key(name: str):
+    path = os.getenv(name)
+    if not path:
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class JoseBackend:
+    name = "jose"
+
+    def __init__(self, algorithm: str, signing_key, verifying_key):
+        from jose import jwt, JWTError
+        self._jwt = jwt
+        self._error = JWTError
+        self.algorithm = algorithm
+        # jose wants PEM keys as text
+        self.signing_key = signing_key.decode() if isinstance(signing_key, bytes) else signing_key
+        self.verifying_key = verifying_key.decode() if isinstance(verifying_key, bytes) else verifying_key
+
+    def encode(self, claims: dict) -> str:
+        return self._jwt.encode(claims, self.signing_key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return self._jwt.decode(token, self.verifying_key, algorithms=[self.algorithm])
+        except self._error as e:
+            raise InvalidToken(str(e)) from e
+
+
+class PyJWTBackend:
+    name = "pyjwt"
+
+    def __init__(self, algorithm: str, signing_key, verifying_key):
+        try:
+            import jwt
+        except ImportError as e:
+            raise RuntimeError("JWT_BACKEND=pyjwt needs PyJWT: pip install 'pyjwt[crypto]'") from e
+        self._jwt = jwt
+        self.algorithm = algorithm
+        self.signing_key = signing_key
+        self.verifying_key = verifying_key
+        if algorithm not in ("HS256", "HS384", "HS512"):
+            # Parse the PEMs once instead of on every call
+            algo = jwt.get_algorithm_by_name(algorithm)
+            self.signing_key = algo.prepare_key(signing_key) if signing_key else None
+            self.verifying_key = algo.prepare_key(verifying_key)
+
+    def encode(self, claims: dict) -> str:
+        return self._jwt.encode(claims, self.signing_key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            # jose doesn't require "sub" to be a string; neither do we
+            return self._jwt.decode(token, self.verifying_key, algorithms=[self.algorithm],
+                                    options={"verify_sub": False})
+        except self._jwt.PyJWTError as e:
+            raise InvalidToken(str(e)) from e
+
+
+BACKENDS = {"jose": JoseBackend, "pyjwt": PyJWTBackend}
+
+
+def make_backend(name: str = JWT_BACKEND, algorithm: str = None, secret_key: str = None):
+    if name not in BACKENDS:
+        raise RuntimeError(f"Unknown JWT_BACKEND {name!r}, expected one of {', '.join(BACKENDS)}")
+    algorithm = algorithm or os.getenv("ALGORITHM") or "HS256"
+    if algorithm.startswith("HS"):
+        signing_key = verifying_key = secret_key if secret_key is not None else os.getenv("SECRET_KEY")
+    else:
+        signing_key = _read_key("JWT_PRIVATE_KEY_FILE")
+        verifying_key = _read_key("JWT_PUBLIC_KEY_FILE")
+        if verifying_key is None:
+            raise RuntimeError(f"ALGORITHM={algorithm} needs JWT_PUBLIC_KEY_FILE")
+    return BACKENDS[name](algorithm, signing_key, verifying_key)
+
+
+class TokenCache:
+    def __init__(self, max_tokens: int = JWT_CACHE_MAX_TOKENS):
+        self.max_tokens = max_tokens
+        # sha256(token) -> (exp, claims)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token: str, decode) -> dict:
+        """Claims for token, calling decode(token) only when they aren't cached."""
+        if self.max_tokens <= 0:
+            return decode(token)
+
+        key = hashlib.sha256(token.encode()).digest()
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return entry[1]
+            del self.entries[key]
+
+        self.misses += 1
+        claims = decode(token)
+        exp = claims.get("exp")
+        # Tokens without a numeric exp never expire; don't pin them in memory
+        if isinstance(exp, (int, float)):
+            self.entries[key] = (exp, claims)
+            while len(self.entries) > self.max_tokens:
+                self.entries.popitem(last=False)
+        return claims
@@ -0,0 +1,170 @@
+"""
+Housekeeping for the logs table.
+
+On Postgres, logs is range-partitioned by day (migration 0004). Each run:
+  - creates the partitions for today and the next LOG_PARTITIONS_AHEAD days
+  - drops partitions older than LOG_RETENTION_DAYS
+  - rebuilds hourly request/error/p95 rollups from the last rolled-up hour on
+
+Other databases only get retention (a plain DELETE); rollups need Postgres.
+Every worker runs the loop, but an advisory lock lets only one do the work.
+"""
+import asyncio
+import os
+import re
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import delete, text
+from ..database import async_engine
+from ..models import models
+
+
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "30"))
+LOG_ROLLUP_RETENTION_DAYS = int(os.getenv("LOG_ROLLUP_RETENTION_DAYS", "400"))
+LOG_PARTITIONS_AHEAD = int(os.getenv("LOG_PARTITIONS_AHEAD", "7"))
+# 0 disables the in-app loop (run maintain_logs.py from cron instead)
+LOG_MAINTENANCE_SECONDS = int(os.getenv("LOG_MAINTENANCE_SECONDS", "600"))
+
+ADVISORY_LOCK_KEY = 804_221_002
+
+PARTITION_NAME = re.compile(r"^logs_p(\d{8})$")
+
+
+def partition_name(day: date) -> str:
+    return f"logs_p{day:%Y%m%d}"
+
+
+def is_partitioned(conn) -> bool:
+    return conn.execute(text(
+        "SELECT relkind FROM pg_class WHERE oid = to_regclass('logs')"
+    )).scalar() == "p"
+
+
+def create_partition(conn, day: date):
+    """
+    Create the partition for one UTC day.
+
+    If maintenance was down when the day began, its rows went to
+    logs_default, and Postgres won't create a partition for a range the
+    default partition has rows in. The default partition is then detached
+    while the new one is created and the rows are moved across.
+    """
+    name = partition_name(day)
+    bounds = {
+        "start": datetime.combine(day, datetime.min.time(), timezone.utc),
+        "end": datetime.combine(day + timedelta(days=1), datetime.min.time(), timezone.utc),
+    }
+    in_default = conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM logs_default WHERE created_at >= :start AND created_at < :end)"
+    ), bounds).scalar()
+
+    if in_default:
+        conn.execute(text("ALTER TABLE logs DETACH PARTITION logs_default"))
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF logs "
+        f"FOR VALUES FROM ('{day} 00:00+00') TO ('{day + timedelta(days=1)} 00:00+00')"
+    ))
+    if in_default:
+        conn.execute(text(
+            "INSERT INTO logs SELECT * FROM logs_default WHERE created_at >= :start AND created_at < :end"
+        ), bounds)
+        conn.execute(text("DELETE FROM logs_default WHERE created_at >= :start AND created_at < :end"), bounds)
+        conn.execute(text("ALTER TABLE logs ATTACH PARTITION logs_default DEFAULT"))
+        print(f"Moved {day} logs out of logs_default into {name}")
+
+
+def ensure_partitions(conn, start: date, end: date):
+    """Create daily partitions for start..end inclusive (UTC days) that don't exist yet."""
+    day = start
+    while day <= end:
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": partition_name(day)}).scalar() is None:
+            create_partition(conn, day)
+        day += timedelta(days=1)
+
+
+def drop_expired_partitions(conn, cutoff: date) -> list:
+    """Drop daily partitions that end on or before cutoff; returns their names."""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('logs')"
+    )).scalars().all()
+
+    dropped = []
+    for name in sorted(names):
+        match = PARTITION_NAME.match(name)
+        if match and datetime.strptime(match.group(1), "%Y%m%d").date() < cutoff:
+            conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+
+    # Anything that fell into the default partition ages out the same way
+    conn.execute(
+        text("DELETE FROM logs_default WHERE created_at < :cutoff"),
+        {"cutoff": datetime.combine(cutoff, datetime.min.time(), timezone.utc)},
+    )
+    return dropped
+
+
+ROLLUP = text("""
+    INSERT INTO log_rollups_hourly (hour, tenant_id, route, requests, errors, p95_ms)
+    SELECT date_trunc('hour', created_at),
+           COALESCE(tenant_id, 0),
+           route,
+           count(*),
+           count(*) FILTER (WHERE status_code >= 500),
+           percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms)
+    FROM logs
+    WHERE category = 'SYSTEM' AND route IS NOT NULL AND created_at >= :since
+    GROUP BY 1, 2, 3
+    ON CONFLICT (hour, tenant_id, route) DO UPDATE
+        SET requests = excluded.requests,
+            errors = excluded.errors,
+            p95_ms = excluded.p95_ms
+""")
+
+
+def rollup(conn, retention_cutoff: datetime):
+    # The last rolled-up hour may have been partial, so it is rebuilt too
+    since = conn.execute(text("SELECT max(hour) FROM log_rollups_hourly")).scalar()
+    conn.execute(ROLLUP, {"since": since or retention_cutoff})
+    conn.execute(
+        delete(models.LogRollup).where(
+            models.LogRollup.hour < datetime.now(timezone.utc) - timedelta(days=LOG_ROLLUP_RETENTION_DAYS)
+        )
+    )
+
+
+def maintain(conn) -> dict:
+    """One maintenance pass on a sync connection (inside a transaction)."""
+    today = datetime.now(timezone.utc).date()
+    cutoff = today - timedelta(days=LOG_RETENTION_DAYS)
+
+    if conn.dialect.name != "postgresql":
+        result = conn.execute(delete(models.Log).where(
+            models.Log.created_at < datetime.combine(cutoff, datetime.min.time(), timezone.utc)
+        ))
+        return {"deleted": result.rowcount}
+
+    if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY}).scalar():
+        return {"skipped": True}
+
+    if not is_partitioned(conn):
+        return {"skipped": True, "reason": "logs is not partitioned; run python migrate.py"}
+
+    ensure_partitions(conn, today, today + timedelta(days=LOG_PARTITIONS_AHEAD))
+    dropped = drop_expired_partitions(conn, cutoff)
+    rollup(conn, datetime.combine(cutoff, datetime.min.time(), timezone.utc))
+    return {"dropped": dropped}
+
+
+async def run_once(bind=async_engine) -> dict:
+    async with bind.begin() as conn:
+        return await conn.run_sync(maintain)
+
+
+async def run_forever(interval: float = LOG_MAINTENANCE_SECONDS):
+    while True:
+        try:
+            await run_once()
+        except Exception as e:
+            print(f"Log maintenance error: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,115 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+from sqlalchemy import insert
+from ..database import async_engine
+from ..models import models
+
+
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "500"))
+LOG_FLUSH_MS = int(os.getenv("LOG_FLUSH_MS", "250"))
+
+
+class LogWriter:
+    """
+    Buffers models.Log rows in memory and writes them in batches.
+
+    submit() never waits on the database: records go onto a bounded queue and
+    a background task flushes them as one multi-row INSERT every
+    `batch_size` records or `flush_interval` seconds, whichever comes first.
+    When the queue is full new records are dropped and counted rather than
+    slowing requests down.
+    """
+
+    def __init__(self, max_queue: int = LOG_QUEUE_SIZE, batch_size: int = LOG_BATCH_SIZE,
+                 flush_interval: float = LOG_FLUSH_MS / 1000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = None
+
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def submit(self, **fields):
+        fields.setdefault("created_at", datetime.now(timezone.utc))
+        try:
+            self.queue.put_nowait(fields)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return
+        self.submitted += 1
+        if self.queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still queued, then stop the background task."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            while not self.queue.empty():
+                await self._flush(self._take(self.batch_size))
+
+            if self._stopping:
+                return
+
+    def _take(self, limit: int) -> list:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _flush(self, batch: list):
+        # Rows may carry different optional keys; give them all the same shape
+        # so they fit a single multi-row VALUES clause
+        columns = set().union(*batch)
+        rows = [{column: record.get(column) for column in columns} for record in batch]
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(insert(models.Log).values(rows))
+        except Exception as e:
+            self.failed += len(rows)
+            print(f"Logging error: {e}")
+            return
+        self.written += len(rows)
+        self.batches += 1
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "max_queue": self.queue.maxsize,
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+
+log_writer = LogWriter()
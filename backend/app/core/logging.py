@@ -1,51 +1,64 @@
 import time
-from collections import defaultdict
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
-from sqlalchemy.orm import Session
-from ..database import SessionLocal
-from ..models import models
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
-from app.database import SessionLocal
-from app.models import models
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from fastapi import HTTPException
+from . import oauth2
+from .log_writer import log_writer
+from .metrics import HTTP_REQUEST_DURATION
+from .rate_limit import limiter
+
+
+def request_identity(scope):
+    """
+    Rate-limit identity for a request, resolved before routing.
+
+    Authentication dependencies haven't run yet, so the bearer token's
+    claims are read directly (signature checked, no DB) to key limits by
+    user and tenant; anonymous or invalid tokens fall back to the client IP.
+    """
+    authorization = Headers(scope=scope).get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            token_data = oauth2.verify_access_token(token, HTTPException(status_code=401))
+            return f"user:{token_data.user_id}", token_data.tenant_id
+        except HTTPException:
+            pass
 
-RATE_LIMIT= 100
-WINDOW = 60
+    client = scope.get("client")
+    return f"ip:{client[0] if client else None}", None
 
-requests = defaultdict(list)
 
-def is_rate_limited(key: str):
-    now = time.time()
-    requests[key] = [t for t in requests[key] if now - t < WINDOW ]
 
-    if len(requests[key]) >= RATE_LIMIT:
-        return True
-    
-    requests[key].append(now)
-    return False
+class LoggingMiddleware:
+    """Pure ASGI middleware: records method, path, status and duration of every request."""
 
+    def __init__(self, app):
+        self.app = app
 
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
         start_time = time.time()
-        response = None
+        status_code = 500
+        # get_current_user stores the user here via request.state
+        state = scope.setdefault("state", {})
 
-        db: Session = SessionLocal()
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
         try:
-            response = await call_next(request)
-            status_code = response.status_code
-
-        except Exception as exc:
-            status_code = 500
-            raise exc
-
+            await self.app(scope, receive, send_wrapper)
         finally:
-            process_time = round(time.time() - start_time, 3)
+            elapsed = time.time() - start_time
+            process_time = round(elapsed, 3)
 
-            user = getattr(request.state, "user", None)
+            user = state.get("user")
 
             # Safely capture user ID and tenant ID BEFORE any potential session closure
             user_id = None
@@ -58,51 +71,56 @@ class LoggingMiddleware(BaseHTTPMiddleware):
                     # If already detached, we can't do much here 
                     pass
 
-            try:
-                log = models.Log(
-                    tenant_id=tenant_id,
-                    user_id=user_id,
-                    action=f"{request.method} {request.url.path}",
-                    category="SYSTEM",
-                    message=f"Status {status_code} | {process_time}s",
-                    ip_address=request.client.host if request.client else None,
-                    user_agent=request.headers.get("user-agent")
-                )
-
-                db.add(log)
-                db.commit()
-            except Exception as e:
-                print(f"Logging error: {e}")
-                db.rollback()
-            finally:
-                db.close()
-
-        return response
-
-
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        print("RateLimitMiddleware HIT")
-        user = getattr(request.state, "user", None)
-        key = f"user:{user.id}" if user else f"ip:{request.client.host}"
-
-        if is_rate_limited(key):
-            db = SessionLocal()
-            try:
-                db.add(models.Log(
-                    category="SECURITY",
-                    action="RATE_LIMIT_EXCEEDED",
-                    message=f"Key: {key}"
-                ))
-                db.commit()
-            finally:
-                db.close()
-
-            raise HTTPException(
+            client = scope.get("client")
+            # Set by the router once a route matches; None for 404s
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                elapsed, scope["method"], route.path if route else "unmatched", str(status_code)
+            )
+            log_writer.submit(
+                tenant_id=tenant_id,
+                user_id=user_id,
+                action=f"{scope['method']} {scope['path']}",
+                category="SYSTEM",
+                message=f"Status {status_code} | {process_time}s",
+                route=f"{scope['method']} {route.path}" if route else None,
+                status_code=status_code,
+                duration_ms=round(elapsed * 1000, 2),
+                ip_address=client[0] if client else None,
+                user_agent=Headers(scope=scope).get("user-agent")
+            )
+
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware: answers 429 once a client exceeds its per-route, per-user or per-tenant limit."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        key, tenant_id = request_identity(scope)
+        retry_after = await limiter.check(key, tenant_id, scope["path"])
+
+        if retry_after is not None:
+            log_writer.submit(
+                tenant_id=tenant_id,
+                category="SECURITY",
+                action="RATE_LIMIT_EXCEEDED",
+                message=f"Key: {key}",
+                status_code=429,
+            )
+
+            response = JSONResponse(
+                {"detail": "Too many requests"},
                 status_code=429,
-                detail="Too many requests"
+                headers={"Retry-After": str(max(1, round(retry_after)))},
             )
+            await response(scope, receive, send)
+            return
 
-        response = await call_next(request)
-        return response
+        await self.app(scope, receive, send)
@@ -0,0 +1,182 @@
+"""
+In-process metrics in the Prometheus text format, served at /metrics.
+
+Updates are plain dict/list increments with no locks: everything that
+records a metric runs on the event loop thread. Values are per worker
+process; Prometheus sums them across scrape targets.
+"""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from .. import database
+from .log_writer import log_writer
+from .user_cache import user_cache
+from . import utils, oauth2
+from .project_access import project_access_cache
+
+
+# Prometheus client defaults, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self.values = {}
+
+    def observe(self, value: float, *labels):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """Observe the duration of the block, with an extra outcome label ("ok" or "error")."""
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            self.observe(time.perf_counter() - start, *labels, outcome)
+
+    def samples(self):
+        for labels, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield (f"{self.name}_bucket",
+                       format_labels(self.labelnames + ("le",), labels + (le,)), cumulative)
+            yield f"{self.name}_count", format_labels(self.labelnames, labels), cumulative
+            yield f"{self.name}_sum", format_labels(self.labelnames, labels), series[-1]
+
+
+class CallbackMetric:
+    """Gauge (or counter) read from a function at scrape time."""
+
+    def __init__(self, name: str, help: str, func, type: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.func = func
+        self.type = type
+
+    def samples(self):
+        yield self.name, "", self.func()
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name, help, func, type="gauge"):
+        return self.register(CallbackMetric(name, help, func, type))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template, method and status",
+    ("method", "route", "status"),
+)
+
+S3_REQUEST_DURATION = registry.histogram(
+    "s3_request_duration_seconds",
+    "S3 call latency by operation and outcome",
+    ("operation", "outcome"),
+)
+
+
+def pool_metric(name: str, field: str, help: str, type: str = "gauge"):
+    registry.callback(name, help, lambda: database.pool_stats()[field], type)
+
+
+pool_metric("db_pool_size", "pool_size", "Configured pool size")
+pool_metric("db_pool_checked_out", "checked_out", "Connections currently checked out of the API pool")
+pool_metric("db_pool_overflow", "overflow", "Overflow connections open beyond the pool size")
+pool_metric("db_pool_checkouts_total", "checkouts", "Connection checkouts", "counter")
+pool_metric("db_pool_timeouts_total", "timeouts", "Checkouts that timed out waiting for a connection", "counter")
+pool_metric("db_pool_wait_seconds_total", "wait_seconds_total", "Time spent waiting for a connection", "counter")
+pool_metric("db_pool_connects_total", "connects", "New connections opened by the pool", "counter")
+pool_metric("db_pool_connect_seconds_total", "connect_seconds_total", "Time spent opening new connections", "counter")
+
+registry.callback("log_writer_queued", "Request logs waiting to be written", lambda: log_writer.queue.qsize())
+registry.callback("log_writer_dropped_total", "Request logs dropped because the queue was full",
+                  lambda: log_writer.dropped, "counter")
+
+registry.callback("user_cache_hits_total", "get_current_user lookups served from the user cache",
+                  lambda: user_cache.hits, "counter")
+registry.callback("user_cache_misses_total", "get_current_user lookups that queried the database",
+                  lambda: user_cache.misses, "counter")
+
+registry.callback("password_hash_in_flight", "bcrypt jobs running or queued on the password pool",
+                  lambda: utils.password_jobs["in_flight"])
+registry.callback("password_hash_rejected_total", "bcrypt jobs refused with 503 because the pool was full",
+                  lambda: utils.password_jobs["rejected"], "counter")
+
+registry.callback("project_access_cache_hits_total", "Project access checks answered from cache",
+                  lambda: project_access_cache.hits, "counter")
+registry.callback("project_access_cache_misses_total", "Project access checks that queried the database",
+                  lambda: project_access_cache.misses, "counter")
+
+registry.callback("jwt_cache_hits_total", "Access tokens accepted from the verified-claims cache",
+                  lambda: oauth2.token_cache.hits, "counter")
+registry.callback("jwt_cache_misses_total", "Access tokens whose signature was checked",
+                  lambda: oauth2.token_cache.misses, "counter")
@@ -1,35 +1,62 @@
 from datetime import datetime, timedelta, timezone
-from jose import jwt, JWTError
 from .. import database
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import HTTPException, Depends, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from ..schema import schemas
 from ..models import models
+from .user_cache import user_cache
+from .revocation import RevocationList
+from .jwt_backend import InvalidToken, TokenCache, make_backend
 import os
+import uuid
 
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login", auto_error=False)
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Opt-in: get_principal trusts the token's claims instead of loading the user
+STATELESS_AUTH = os.getenv("STATELESS_AUTH", "false").lower() in ("1", "true", "yes")
+
+revocations = RevocationList(timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+
+jwt_backend = make_backend(algorithm=ALGORITHM, secret_key=SECRET_KEY)
+token_cache = TokenCache()
+
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
 
-    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # Fractional iat, so a revocation can tell tokens from the same second apart
+    to_encode.update({"exp": expire, "iat": now.timestamp(), "jti": uuid.uuid4().hex})
 
-    encode_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encode_jwt = jwt_backend.encode(to_encode)
 
     return encode_jwt
 
+def create_user_access_token(user: models.User) -> str:
+    """Access token carrying the claims get_principal needs."""
+    return create_access_token(data={
+        "sub": str(user.id),
+        "tenant_id": user.tenant_id,
+        "role": user.role,
+        "is_active": bool(user.is_active),
+    })
+
+
 def verify_access_token(token: str, credentials_exception):
     
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_cache.verify(token, jwt_backend.decode)
 
         user_id: str = payload.get('sub')
         tenant_id: int = payload.get('tenant_id')
@@ -37,13 +64,18 @@ def verify_access_token(token: str, credentials_exception):
             raise credentials_exception
         
         token_data = schemas.TokenData(user_id= int(user_id),
-                               tenant_id=tenant_id) 
-    except JWTError:
+                               tenant_id=tenant_id,
+                               role=payload.get("role"),
+                               is_active=payload.get("is_active"),
+                               jti=payload.get("jti"),
+                               iat=payload.get("iat"),
+                               exp=payload.get("exp"))
+    except InvalidToken:
             raise credentials_exception
     return token_data
 
-def get_current_user(request: Request,
-                    db: Session = Depends(database.get_db),
+async def get_current_user(request: Request,
+                    db: AsyncSession = Depends(database.get_db),
                     token: str = Depends(oauth2_scheme)):
     
     credentials_exception = HTTPException( status_code=401, 
@@ -53,14 +85,70 @@ def get_current_user(request: Request,
 
     token_data = verify_access_token(token, credentials_exception)
 
-    from sqlalchemy.orm import joinedload
-    user = db.query(models.User).options(joinedload(models.User.tenant)).filter(models.User.id == token_data.user_id, models.User.tenant_id == token_data.tenant_id).first()
+    user = await user_cache.get(db, token_data.user_id, token_data.tenant_id)
+    if user is None:
+        user = await db.scalar(
+            select(models.User)
+            .options(joinedload(models.User.tenant))
+            .where(models.User.id == token_data.user_id, models.User.tenant_id == token_data.tenant_id)
+        )
+        if user is not None:
+            user_cache.put(user)
 
     request.state.user = user
 
     if user is None:
          raise credentials_exception
 
+    # Lets the primary session pin this user's next reads after a write
+    db.info["user_id"] = user.id
+
     return user
-    
-    
\ No newline at end of file
+
+
+class Principal:
+    """The caller as described by their access token; no database row behind it."""
+
+    __slots__ = ("id", "tenant_id", "role", "is_active")
+
+    def __init__(self, id: int, tenant_id: int, role: str, is_active: bool):
+        self.id = id
+        self.tenant_id = tenant_id
+        self.role = role
+        self.is_active = is_active
+
+
+async def get_principal(request: Request,
+                        db: AsyncSession = Depends(database.get_db),
+                        token: str = Depends(oauth2_scheme)):
+    """
+    For handlers that only read id, tenant_id, role and is_active.
+
+    With STATELESS_AUTH the caller comes straight from the token claims,
+    checked against the revocation list, without touching the database.
+    Otherwise (or for tokens without role claims) this is get_current_user.
+    """
+    if not STATELESS_AUTH:
+        return await get_current_user(request, db, token)
+
+    credentials_exception = HTTPException(status_code=401,
+        detail="Invalid Credentials",
+        headers={'WWW-Authenticate': 'Bearer'}
+    )
+
+    token_data = verify_access_token(token, credentials_exception)
+    if token_data.role is None or token_data.jti is None or token_data.iat is None:
+        return await get_current_user(request, db, token)
+
+    if revocations.is_revoked(token_data.jti, token_data.user_id, token_data.iat):
+        raise credentials_exception
+
+    principal = Principal(
+        id=token_data.user_id,
+        tenant_id=token_data.tenant_id,
+        role=token_data.role,
+        is_active=bool(token_data.is_active),
+    )
+    request.state.user = principal
+    db.info["user_id"] = principal.id
+    return principal
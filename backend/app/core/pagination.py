@@ -0,0 +1,142 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+A Keyset orders a query by a unique sort key, newest first unless told
+otherwise, e.g. (created_at, id). Each page fetches one extra row to see whether there is
+more; if there is, the sort key of the page's last row is returned as an
+opaque cursor in the X-Next-Cursor response header. Passing it back as
+?cursor= continues with a WHERE (created_at, id) < (...) seek, which an
+index on the tenant/project column plus the sort key serves without
+scanning the rows of earlier pages, however deep the page.
+
+Lists that returned every row before pagination existed (tasks, files,
+users) take OptionalPageParams instead: they stay unpaginated unless the
+caller passes limit or cursor.
+
+The leading column may be nullable (e.g. a due date). NULLs then sort as
+if larger than any value, which is how a Postgres index orders them, and
+the seek adds the IS NULL cases a tuple comparison would drop.
+"""
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import DateTime, literal, or_, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class seek_value(FunctionElement):
+    """A datetime sort-key value as the seek compares it."""
+    inherit_cache = True
+
+
+@compiles(seek_value)
+def _seek_value(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+@compiles(seek_value, "sqlite")
+def _seek_value_sqlite(element, compiler, **kw):
+    # SQLite keeps datetimes as text in two shapes ("...:05" from CURRENT_TIMESTAMP,
+    # "...:05.000000" from Python) that don't compare as text; compare them as numbers
+    return f"julianday({compiler.process(element.clauses, **kw)})"
+
+
+class PageParams:
+    """limit/cursor query parameters, as a dependency."""
+
+    def __init__(self,
+                 limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                 cursor: str = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header")):
+        self.limit = limit
+        self.cursor = cursor
+
+
+class OptionalPageParams(PageParams):
+    """limit/cursor query parameters; without either, limit is None and every row is returned."""
+
+    def __init__(self,
+                 limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE, description=f"Page size; {DEFAULT_PAGE_SIZE} when only cursor is given"),
+                 cursor: str = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header")):
+        if limit is None and cursor is not None:
+            limit = DEFAULT_PAGE_SIZE
+        super().__init__(limit, cursor)
+
+
+class Keyset:
+    def __init__(self, *columns, descending: bool = True, nullable: bool = False):
+        self.columns = columns
+        self.descending = descending
+        self.nullable = nullable
+        self.sort_key = [seek_value(column) if isinstance(column.type, DateTime) else column for column in columns]
+
+    def encode(self, row) -> str:
+        values = []
+        for column in self.columns:
+            value = getattr(row, column.key)
+            values.append(value.isoformat() if isinstance(value, datetime) else value)
+        return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+    def decode(self, cursor: str) -> list:
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            if not isinstance(values, list) or len(values) != len(self.columns):
+                raise ValueError
+            return [
+                datetime.fromisoformat(value) if isinstance(column.type, DateTime) and value is not None else value
+                for column, value in zip(self.columns, values)
+            ]
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    def seek(self, cursor: str):
+        """Condition for the rows after the cursor's row."""
+        decoded = self.decode(cursor)
+        values = [
+            seek_value(literal(value, column.type)) if isinstance(column.type, DateTime) else value
+            for column, value in zip(self.columns, decoded)
+        ]
+        if not self.nullable:
+            return self._after(self.sort_key, values)
+        first = self.columns[0]
+        if decoded[0] is None:
+            among_nulls = first.is_(None) & self._after(self.sort_key[1:], values[1:])
+            return or_(first.isnot(None), among_nulls) if self.descending else among_nulls
+        after = self._after(self.sort_key, values)
+        return after if self.descending else or_(after, first.is_(None))
+
+    def _after(self, keys, values):
+        if self.descending:
+            return tuple_(*keys) < tuple_(*values)
+        return tuple_(*keys) > tuple_(*values)
+
+    def order(self) -> list:
+        """ORDER BY clauses for the key."""
+        order = [key.desc() if self.descending else key.asc() for key in self.sort_key]
+        if self.nullable:
+            order[0] = order[0].nulls_first() if self.descending else order[0].nulls_last()
+        return order
+
+    def apply(self, query, page: PageParams):
+        """Order query by the key and seek past page.cursor; fetches limit + 1 rows."""
+        if page.cursor:
+            query = query.where(self.seek(page.cursor))
+        query = query.order_by(*self.order())
+        if page.limit is None:
+            return query
+        return query.limit(page.limit + 1)
+
+    def page(self, rows, page: PageParams, response: Response, key=lambda row: row) -> list:
+        """Trim the look-ahead row and set the next cursor header when there is one."""
+        rows = list(rows)
+        if page.limit is not None and len(rows) > page.limit:
+            rows = rows[:page.limit]
+            response.headers[NEXT_CURSOR_HEADER] = self.encode(key(rows[-1]))
+        return rows
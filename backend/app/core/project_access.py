@@ -0,0 +1,97 @@
+"""
+Per-worker cache of project access decisions for require_project_access.
+
+Maps (user_id, project_id) to the caller's membership role (None when the
+project is in their tenant but they aren't a member), for
+PROJECT_ACCESS_TTL seconds. The caller's tenant role ("admin") is not
+cached; it is checked on every request. Adding or removing a member and
+deleting a project invalidate the affected entries on this worker. Other
+workers catch up within the TTL.
+
+Only the role is cached, not the project: on a hit require_project_access
+still checks with one EXISTS that the project is live and in the tenant,
+and ProjectAccess.load_project filters the same way when it loads it.
+"""
+import os
+import time
+from collections import OrderedDict
+from fastapi import HTTPException, status
+from sqlalchemy import inspect, select
+from ..models import models
+
+
+PROJECT_ACCESS_TTL = float(os.getenv("PROJECT_ACCESS_TTL", "10"))
+PROJECT_ACCESS_MAX_ENTRIES = int(os.getenv("PROJECT_ACCESS_MAX_ENTRIES", "10000"))
+
+
+class ProjectAccess:
+    """What require_project_access hands to the handler."""
+
+    def __init__(self, project_id: int, tenant_id: int, role, project=None):
+        self.project_id = project_id
+        self.tenant_id = tenant_id
+        # Caller's membership role, or None for admins who aren't members
+        self.role = role
+        self.project = project
+
+    async def load_project(self, db) -> models.Project:
+        """The project, loading it only if the access check was answered from cache. 404 if it's gone."""
+        if self.project is None:
+            self.project = await db.scalar(select(models.Project).where(
+                models.Project.id == self.project_id,
+                models.Project.tenant_id == self.tenant_id,
+                models.Project.is_deleted.is_(False),
+            ))
+            if self.project is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Project not found"
+                )
+        return self.project
+
+    async def load_version(self, db) -> int:
+        """The project's change version as db sees it, with at most a one-column lookup."""
+        # A project loaded on the primary may be ahead of the replica db reads from
+        if self.project is not None and inspect(self.project).session is db.sync_session:
+            return self.project.version
+        return await db.scalar(select(models.Project.version).where(models.Project.id == self.project_id))
+
+
+class ProjectAccessCache:
+    def __init__(self, ttl: float = PROJECT_ACCESS_TTL, max_entries: int = PROJECT_ACCESS_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # (user_id, project_id) -> (expires_at, role or None)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, project_id: int):
+        """(True, role) on a hit, where role may be None; (False, None) on a miss."""
+        key = (user_id, project_id)
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return True, entry[1]
+
+    def put(self, user_id: int, project_id: int, role):
+        if self.ttl <= 0:
+            return
+        key = (user_id, project_id)
+        self.entries[key] = (time.monotonic() + self.ttl, role)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, user_id: int, project_id: int):
+        self.entries.pop((user_id, project_id), None)
+
+    def invalidate_project(self, project_id: int):
+        for key in [key for key in self.entries if key[1] == project_id]:
+            del self.entries[key]
+
+
+project_access_cache = ProjectAccessCache()
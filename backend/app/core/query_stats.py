@@ -0,0 +1,136 @@
+"""
+Per-request SQL statistics.
+
+Cursor events on the API engines count statements and DB time into a
+QueryStats object held in a context variable. SQLAlchemy's async layer runs
+the sync engine inside a greenlet that shares the calling task's context, so
+the events see the request that issued the query.
+
+QueryStatsMiddleware adds the totals to every response as
+    X-DB-Queries: 7
+    Server-Timing: db;dur=12.4;desc="7 queries"
+and logs a warning when a request goes over DB_QUERY_BUDGET statements or
+runs one statement shape more than DB_REPEATED_QUERY_LIMIT times (the usual
+sign of an N+1 loop).
+
+The headers go out with the response start, so they only count what ran
+before it. A streamed body (exports, anything on open_read_session) runs
+its queries afterwards; the warnings are checked once the body has been
+sent and cover those too.
+"""
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from .. import database
+
+
+DB_QUERY_STATS = os.getenv("DB_QUERY_STATS", "true").lower() in ("1", "true", "yes")
+DB_QUERY_BUDGET = int(os.getenv("DB_QUERY_BUDGET", "20"))
+DB_REPEATED_QUERY_LIMIT = int(os.getenv("DB_REPEATED_QUERY_LIMIT", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # Count when the headers were sent; queries after it came from the body
+        self.headers_count = None
+        # Statements are parameterized, so the SQL text is the query shape
+        self.shapes = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement] += 1
+
+    def repeated(self, limit: int):
+        return [(statement, n) for statement, n in self.shapes.most_common() if n > limit]
+
+
+current_stats: ContextVar = ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _finish(conn, statement):
+    start = conn.info["query_start"].pop()
+    stats = current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _finish(conn, statement)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; pop its start
+    # here so later statements on the connection don't take it as theirs
+    conn = exception_context.connection
+    if conn is not None and exception_context.execution_context is not None and conn.info.get("query_start"):
+        _finish(conn, exception_context.statement)
+
+
+def instrument(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+if DB_QUERY_STATS:
+    instrument(database.async_engine.sync_engine)
+    if database.replica_engine is not None:
+        instrument(database.replica_engine.sync_engine)
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware: reports per-request query counts and DB time."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not DB_QUERY_STATS:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                stats.headers_count = stats.count
+                headers = MutableHeaders(scope=message)
+                headers.append("X-DB-Queries", str(stats.count))
+                headers.append("Server-Timing", f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"')
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_stats.reset(token)
+            report(scope, stats)
+
+
+def report(scope, stats: QueryStats):
+    route = scope.get("route")
+    where = f"{scope['method']} {route.path if route else scope['path']}"
+
+    if stats.count > DB_QUERY_BUDGET:
+        streamed = ""
+        if stats.headers_count is not None and stats.count > stats.headers_count:
+            streamed = f", {stats.count - stats.headers_count} while streaming the body"
+        logger.warning("%s ran %d queries (%.1fms%s), budget is %d",
+                       where, stats.count, stats.seconds * 1000, streamed, DB_QUERY_BUDGET)
+
+    for statement, n in stats.repeated(DB_REPEATED_QUERY_LIMIT):
+        shape = " ".join(statement.split())[:200]
+        logger.warning("Possible N+1 in %s: ran %dx: %s", where, n, shape)
@@ -0,0 +1,172 @@
+"""
+GCRA (generic cell rate algorithm) rate limiting.
+
+Each key stores a single number, its "theoretical arrival time" (TAT), so
+memory per key is constant no matter how high the limit is. A request is
+allowed when TAT - now <= burst tolerance, and then pushes TAT forward by
+one emission interval (period / rate).
+"""
+import os
+import time
+from collections import OrderedDict
+from sqlalchemy import text
+from ..database import async_engine
+
+
+class Limit:
+    def __init__(self, rate: int, period: float, burst: int = None):
+        self.rate = rate
+        self.period = period
+        self.burst = burst or rate
+        # Seconds "paid" per request, and how far ahead of now TAT may run
+        self.interval = period / rate
+        self.tolerance = self.interval * (self.burst - 1)
+
+    def __repr__(self):
+        return f"Limit({self.rate}/{self.period}s, burst={self.burst})"
+
+
+class MemoryBackend:
+    """Per-process GCRA state with LRU eviction of idle keys."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self.tats = OrderedDict()
+
+    async def hit(self, key: str, limit: Limit):
+        now = time.monotonic()
+        tat = max(self.tats.get(key, now), now)
+
+        if tat - now > limit.tolerance:
+            return tat - now - limit.tolerance
+
+        self.tats[key] = tat + limit.interval
+        self.tats.move_to_end(key)
+        if len(self.tats) > self.max_keys:
+            self.tats.popitem(last=False)
+        return None
+
+    async def refund(self, charges: list):
+        """Undo allowed hits: (key, limit) pairs."""
+        for key, limit in charges:
+            if key in self.tats:
+                self.tats[key] -= limit.interval
+
+
+class PostgresBackend:
+    """
+    GCRA state in the rate_limit_buckets table, shared by every worker.
+
+    One upsert per check: the conflict branch only advances TAT when the
+    request is allowed, so "no row returned" means limited. Time comes from
+    the database clock so workers on different hosts agree.
+    """
+
+    HIT = text("""
+        WITH now AS (SELECT extract(epoch FROM clock_timestamp())::float8 AS t)
+        INSERT INTO rate_limit_buckets AS b (key, tat)
+        SELECT :key, now.t + CAST(:interval AS float8) FROM now
+        ON CONFLICT (key) DO UPDATE
+            SET tat = GREATEST(b.tat, (SELECT t FROM now)) + CAST(:interval AS float8)
+            WHERE GREATEST(b.tat, (SELECT t FROM now)) - (SELECT t FROM now) <= CAST(:tolerance AS float8)
+        RETURNING tat
+    """)
+
+    REFUND = text("UPDATE rate_limit_buckets SET tat = tat - CAST(:interval AS float8) WHERE key = :key")
+
+    PURGE = text("DELETE FROM rate_limit_buckets WHERE tat < extract(epoch FROM clock_timestamp())::float8")
+
+    # Drop expired buckets roughly once every this many checks
+    PURGE_EVERY = 10_000
+
+    def __init__(self, bind=async_engine):
+        self.bind = bind
+        self.calls = 0
+
+    async def hit(self, key: str, limit: Limit):
+        self.calls += 1
+        async with self.bind.begin() as conn:
+            allowed = (await conn.execute(self.HIT, {
+                "key": key,
+                "interval": limit.interval,
+                "tolerance": limit.tolerance,
+            })).first()
+            if self.calls % self.PURGE_EVERY == 0:
+                await conn.execute(self.PURGE)
+        return None if allowed else limit.interval
+
+    async def refund(self, charges: list):
+        """Undo allowed hits: (key, limit) pairs."""
+        async with self.bind.begin() as conn:
+            await conn.execute(self.REFUND, [{"key": key, "interval": limit.interval} for key, limit in charges])
+
+
+BACKENDS = {
+    "memory": lambda: MemoryBackend(int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))),
+    "postgres": PostgresBackend,
+}
+
+
+class RateLimiter:
+    """
+    Applies, in order: a per-route limit (if the path matches one), a
+    per-user (or per-IP when anonymous) limit and a per-tenant limit.
+    A request is only charged when every limit allows it; when a later
+    limit rejects it, the earlier ones are refunded.
+    """
+
+    def __init__(self, backend, default: Limit, tenant: Limit, routes: dict):
+        self.backend = backend
+        self.default = default
+        self.tenant = tenant
+        # Longest prefix first so "/auth/login" wins over "/auth"
+        self.routes = sorted(routes.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def route_limit(self, path: str):
+        for prefix, limit in self.routes:
+            if path.startswith(prefix):
+                return prefix, limit
+        return None, None
+
+    def buckets(self, identity: str, tenant_id, path: str) -> list:
+        """(key, limit) pairs a request is charged against, in order."""
+        buckets = []
+        prefix, limit = self.route_limit(path)
+        if limit is not None:
+            buckets.append((f"route:{prefix}:{identity}", limit))
+        buckets.append((identity, self.default))
+        if tenant_id is not None:
+            buckets.append((f"tenant:{tenant_id}", self.tenant))
+        return buckets
+
+    async def check(self, identity: str, tenant_id, path: str):
+        """Return None when allowed, else the suggested Retry-After in seconds."""
+        charged = []
+        for key, limit in self.buckets(identity, tenant_id, path):
+            retry_after = await self.backend.hit(key, limit)
+            if retry_after is not None:
+                if charged:
+                    await self.backend.refund(charged)
+                return retry_after
+            charged.append((key, limit))
+        return None
+
+
+RATE_LIMIT = int(os.getenv("RATE_LIMIT", "100"))
+RATE_LIMIT_WINDOW = float(os.getenv("RATE_LIMIT_WINDOW", "60"))
+TENANT_RATE_LIMIT = int(os.getenv("TENANT_RATE_LIMIT", "1000"))
+
+# Tighter limits for expensive or abuse-prone endpoints (per user / IP)
+ROUTE_LIMITS = {
+    "/auth/login": Limit(10, 60),
+    "/auth/admin": Limit(5, 60),
+    "/invite/accept": Limit(10, 60),
+    "/files/upload": Limit(30, 60),
+}
+
+limiter = RateLimiter(
+    backend=BACKENDS[os.getenv("RATE_LIMIT_BACKEND", "memory")](),
+    default=Limit(RATE_LIMIT, RATE_LIMIT_WINDOW),
+    tenant=Limit(TENANT_RATE_LIMIT, RATE_LIMIT_WINDOW),
+    routes=ROUTE_LIMITS,
+)
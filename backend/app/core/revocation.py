@@ -0,0 +1,82 @@
+"""
+Access-token revocation list for stateless auth.
+
+Revocations are written to token_revocations and applied to this worker
+straight away; every worker also reloads the whole (small) table every
+REVOCATION_REFRESH_SECONDS, so another worker's logout or role change takes
+effect there within that interval. Rows are kept only as long as the tokens
+they cover could still be valid and are purged on the next revocation.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, select
+from ..database import AsyncSessionLocal
+from ..models import models
+
+
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "5"))
+
+
+class RevocationList:
+    def __init__(self, token_lifetime: timedelta):
+        # No access token lives longer than this, so neither do revocations
+        self.token_lifetime = token_lifetime
+        # Revoked jtis, and user_id -> epoch seconds up to which their tokens are invalid
+        self.jtis = set()
+        self.users = {}
+        self.loaded_at = None
+
+    def is_revoked(self, jti: str, user_id: int, issued_at: float) -> bool:
+        if jti in self.jtis:
+            return True
+        revoked_at = self.users.get(user_id)
+        # iat has sub-second precision (create_access_token), so a relogin
+        # right after the revocation is issued after it
+        return revoked_at is not None and issued_at <= revoked_at
+
+    def _apply(self, key: str, revoked_at: datetime):
+        kind, _, value = key.partition(":")
+        if kind == "jti":
+            self.jtis.add(value)
+        elif kind == "user":
+            self.users[int(value)] = max(self.users.get(int(value), 0), revoked_at.timestamp())
+
+    async def _revoke(self, db, key: str, expires_at: datetime):
+        now = datetime.now(timezone.utc)
+        await db.merge(models.TokenRevocation(key=key, revoked_at=now, expires_at=expires_at))
+        await db.execute(delete(models.TokenRevocation).where(models.TokenRevocation.expires_at < now))
+        await db.commit()
+        self._apply(key, now)
+
+    async def revoke_token(self, db, jti: str, expires_at: datetime):
+        """Revoke a single access token (logout)."""
+        await self._revoke(db, f"jti:{jti}", expires_at)
+
+    async def revoke_user(self, db, user_id: int):
+        """Revoke every access token issued to a user so far (role change, deletion)."""
+        await self._revoke(db, f"user:{user_id}", datetime.now(timezone.utc) + self.token_lifetime)
+
+    async def refresh(self):
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(models.TokenRevocation.key, models.TokenRevocation.revoked_at)
+                .where(models.TokenRevocation.expires_at >= datetime.now(timezone.utc))
+            )).all()
+
+        # Build fresh sets so purged rows drop out of memory too
+        self.jtis, self.users = set(), {}
+        for key, revoked_at in rows:
+            if revoked_at.tzinfo is None:
+                revoked_at = revoked_at.replace(tzinfo=timezone.utc)
+            self._apply(key, revoked_at)
+        self.loaded_at = datetime.now(timezone.utc)
+
+    async def run_forever(self, interval: float = REVOCATION_REFRESH_SECONDS):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Revocation refresh error: {e}")
+            await asyncio.sleep(interval)
+
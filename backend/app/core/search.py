@@ -0,0 +1,111 @@
+"""
+Project and task search.
+
+On Postgres, migration 0009 gives projects and tasks a generated
+search_vector (name/title weighted over description) with a GIN index, and
+trigram GIN indexes on projects.name and tasks.title. A term matches when
+the full-text query hits the vector, or when the name/title is a trigram
+match (typos) or contains the term (substrings); both of those run on the
+trigram index. Results are ranked by ts_rank_cd plus trigram similarity.
+
+Other databases (SQLite in development) fall back to a case-insensitive
+substring match on name/title and description, unranked.
+
+Search results are paged with a keyset on (rank, kind, id), so the cursor
+carries the rank of the last row and the next page seeks past it. Each of
+the project and task branches seeks and takes its own best limit + 1 rows
+before the union, so only those are sorted together. Ranking still has to
+score every match of a branch, so the cost grows with the number of
+matches rather than the page size (see bench_search.py).
+"""
+from sqlalchemy import Float, String, and_, func, literal, literal_column, or_, select, union_all
+from ..models import models
+from .pagination import Keyset
+
+
+# Must match the configuration the generated columns were built with
+SEARCH_CONFIG = "english"
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def match(dialect: str, vector: str, title, description, term: str):
+    """(where clause, rank expression) for one table's search columns."""
+    contains = f"%{_escape_like(term)}%"
+    if dialect != "postgresql":
+        return or_(title.ilike(contains, escape="\\"), description.ilike(contains, escape="\\")), literal(0.0, Float)
+
+    vector = literal_column(vector)
+    query = func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), term)
+    where = or_(vector.op("@@")(query), title.op("%")(term), title.ilike(contains, escape="\\"))
+    rank = func.ts_rank_cd(vector, query) + func.similarity(title, term)
+    return where, rank.cast(Float)
+
+
+def project_match(dialect: str, term: str):
+    return match(dialect, "projects.search_vector", models.Project.name, models.Project.description, term)
+
+
+def task_match(dialect: str, term: str):
+    return match(dialect, "tasks.search_vector", models.Task.title, models.Task.description, term)
+
+
+def visible_projects(user):
+    """Live projects in the user's tenant that they may read."""
+    conditions = [models.Project.tenant_id == user.tenant_id, models.Project.is_deleted.is_(False)]
+    if user.role != "admin":
+        conditions.append(models.Project.id.in_(
+            select(models.ProjectMembers.project_id).where(models.ProjectMembers.user_id == user.id)
+        ))
+    return and_(*conditions)
+
+
+def search_branches(dialect: str, user, term: str) -> list:
+    """Matching projects and matching tasks, each as (kind, id, project_id, title, rank) rows."""
+    project_where, project_rank = project_match(dialect, term)
+    task_where, task_rank = task_match(dialect, term)
+
+    projects = select(
+        literal("project", String).label("kind"),
+        models.Project.id.label("id"),
+        models.Project.id.label("project_id"),
+        models.Project.name.label("title"),
+        project_rank.label("rank"),
+    ).where(visible_projects(user), project_where)
+
+    tasks = select(
+        literal("task", String).label("kind"),
+        models.Task.id.label("id"),
+        models.Task.project_id.label("project_id"),
+        models.Task.title.label("title"),
+        task_rank.label("rank"),
+    ).join(models.Project, models.Project.id == models.Task.project_id).where(
+        models.Task.tenant_id == user.tenant_id,
+        models.Task.is_deleted.is_(False),
+        visible_projects(user),
+        task_where,
+    )
+
+    return [projects, tasks]
+
+
+def ranked(query, page):
+    """query's rows past page.cursor, best first, at most page.limit + 1."""
+    rows = query.subquery()
+    return Keyset(rows.c.rank, rows.c.kind, rows.c.id).apply(select(rows), page)
+
+
+def search_query(dialect: str, user, term: str, page):
+    """Union of each branch's best rows past the cursor."""
+    branches = [select(ranked(branch, page).subquery()) for branch in search_branches(dialect, user, term)]
+    return union_all(*branches).subquery("results")
+
+
+async def search(db, user, term: str, page, response) -> list:
+    """One page of results, best first; sets the next cursor header on response."""
+    results = search_query(db.bind.dialect.name, user, term, page)
+    keyset = Keyset(results.c.rank, results.c.kind, results.c.id)
+    rows = (await db.execute(keyset.apply(select(results), page))).all()
+    return keyset.page(rows, page, response)
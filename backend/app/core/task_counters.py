@@ -0,0 +1,104 @@
+"""
+Per-project task counters and change version.
+
+projects.total_tasks and projects.done_tasks count a project's live
+(not soft-deleted) tasks and the done ones among them; progress is derived
+from the two. Task writes call adjust() in their own transaction with the
+change they made, which is a single atomic UPDATE ... SET n = n + delta, so
+concurrent writers never lose an increment. The task row itself must be
+locked (SELECT ... FOR UPDATE) before its old status is read, or two
+requests flipping the same task would both count the flip.
+
+projects.version goes up by one on every write to a project, its tasks or
+its members: adjust() bumps it along with the counters, touch() on its own.
+List endpoints derive their ETags from it (see core.etags). Both also stamp
+the project with the write's change sequence number (see core.changes).
+
+recount() rebuilds the counters from the tasks table for projects that have
+drifted (manual SQL, bugs); see repair_task_counters.py.
+"""
+from sqlalchemy import case, func, or_, select, update
+from ..models import models
+
+
+def counts(status: str, is_deleted: bool):
+    """(total, done) a single task in this state contributes."""
+    if is_deleted:
+        return 0, 0
+    return 1, int(status == "done")
+
+
+def progress_of(total, done):
+    """Integer percentage; works on plain ints and on column expressions."""
+    return case((total > 0, done * 100 // total), else_=0)
+
+
+async def adjust(db, project_id: int, total: int = 0, done: int = 0, *, seq: int):
+    """Apply a change in task counts to a project and bump its version. Does not commit."""
+    if not total and not done:
+        await touch(db, project_id, seq=seq)
+        return
+    new_total = models.Project.total_tasks + total
+    new_done = models.Project.done_tasks + done
+    await db.execute(
+        update(models.Project)
+        .where(models.Project.id == project_id)
+        .values(total_tasks=new_total, done_tasks=new_done, progress=progress_of(new_total, new_done),
+                version=models.Project.version + 1, change_seq=seq)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def touch(db, project_id: int, *, seq: int):
+    """Bump a project's version after a write that doesn't change task counts. Does not commit."""
+    await db.execute(
+        update(models.Project)
+        .where(models.Project.id == project_id)
+        .values(version=models.Project.version + 1, change_seq=seq)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def touch_member_projects(db, user_id: int, *, seq: int):
+    """Bump every project a user belongs to, and their memberships; their name and role show in member lists."""
+    await db.execute(
+        update(models.Project)
+        .where(models.Project.id.in_(
+            select(models.ProjectMembers.project_id).where(models.ProjectMembers.user_id == user_id)
+        ))
+        .values(version=models.Project.version + 1, change_seq=seq)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(models.ProjectMembers)
+        .where(models.ProjectMembers.user_id == user_id)
+        .values(change_seq=seq)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def task_changed(db, project_id: int, before, after, *, seq: int):
+    """Adjust for a task going from before to after, each a (status, is_deleted) pair or None."""
+    old_total, old_done = counts(*before) if before else (0, 0)
+    new_total, new_done = counts(*after) if after else (0, 0)
+    await adjust(db, project_id, new_total - old_total, new_done - old_done, seq=seq)
+
+
+def recount(project_id: int = None):
+    """Statements that repair drifted counters, then progress; run in order."""
+    live = (models.Task.project_id == models.Project.id, models.Task.is_deleted.is_(False))
+    total = select(func.count(models.Task.id)).where(*live).scalar_subquery()
+    done = select(func.count(models.Task.id)).where(*live, models.Task.status == "done").scalar_subquery()
+    progress = progress_of(models.Project.total_tasks, models.Project.done_tasks)
+
+    scope = [models.Project.id == project_id] if project_id is not None else []
+    return [
+        update(models.Project)
+        .where(*scope, or_(models.Project.total_tasks != total, models.Project.done_tasks != done))
+        .values(total_tasks=total, done_tasks=done)
+        .execution_options(synchronize_session=False),
+        update(models.Project)
+        .where(*scope, or_(models.Project.progress.is_(None), models.Project.progress != progress))
+        .values(progress=progress)
+        .execution_options(synchronize_session=False),
+    ]
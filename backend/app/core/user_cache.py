@@ -0,0 +1,122 @@
+"""
+Short-lived cache of authenticated users for get_current_user.
+
+Entries are detached snapshots of a User and its Tenant, keyed by
+(user_id, tenant_id). A hit is merged into the request's session with
+load=False, which emits no SQL. Entries expire after USER_CACHE_TTL seconds
+and the least recently used are evicted past USER_CACHE_MAX_USERS.
+
+Code that changes a user's role, status or existence must call
+invalidate() after committing. With USER_CACHE_NOTIFY on Postgres the
+invalidation is also broadcast to the other workers over LISTEN/NOTIFY;
+without it they catch up when their entry's TTL runs out.
+"""
+import os
+import time
+from collections import OrderedDict
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from .. import database
+from ..models import models
+
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+USER_CACHE_MAX_USERS = int(os.getenv("USER_CACHE_MAX_USERS", "10000"))
+USER_CACHE_NOTIFY = os.getenv("USER_CACHE_NOTIFY", "false").lower() in ("1", "true", "yes")
+
+CHANNEL = "user_cache_invalidate"
+
+
+def snapshot(instance):
+    """Detached, clean copy of a loaded instance's column attributes."""
+    mapper = inspect(instance).mapper
+    copy = mapper.class_(**{attr.key: getattr(instance, attr.key) for attr in mapper.column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+class UserCache:
+    def __init__(self, ttl: float = USER_CACHE_TTL, max_users: int = USER_CACHE_MAX_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        # (user_id, tenant_id) -> (expires_at, detached User)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._listener = None
+
+    async def get(self, db, user_id: int, tenant_id: int):
+        """The cached user merged into db, or None on a miss."""
+        if self.ttl <= 0:
+            return None
+
+        key = (user_id, tenant_id)
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return await db.merge(entry[1], load=False)
+
+    def put(self, user: models.User):
+        if self.ttl <= 0:
+            return
+
+        cached = snapshot(user)
+        # No history or backref events, so both objects stay clean for merge(load=False)
+        set_committed_value(cached, "tenant", snapshot(user.tenant) if user.tenant is not None else None)
+
+        key = (user.id, user.tenant_id)
+        self.entries[key] = (time.monotonic() + self.ttl, cached)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_users:
+            self.entries.popitem(last=False)
+
+    def drop(self, user_id: int, tenant_id: int):
+        if self.entries.pop((user_id, tenant_id), None) is not None:
+            self.invalidations += 1
+
+    async def invalidate(self, db, user_id: int, tenant_id: int):
+        """Forget a user here and, when enabled, on every other worker. Call after commit."""
+        self.drop(user_id, tenant_id)
+        if USER_CACHE_NOTIFY and db.bind.dialect.name == "postgresql":
+            await db.execute(text("SELECT pg_notify(:channel, :payload)"),
+                             {"channel": CHANNEL, "payload": f"{user_id}:{tenant_id}"})
+            await db.commit()
+
+    def _on_notify(self, connection, pid, channel, payload):
+        user_id, tenant_id = payload.split(":")
+        self.drop(int(user_id), int(tenant_id))
+
+    async def start(self):
+        """Listen for invalidations from other workers (Postgres + USER_CACHE_NOTIFY only)."""
+        if not USER_CACHE_NOTIFY or database.async_engine.dialect.name != "postgresql":
+            return
+        # A dedicated connection held for the life of the worker
+        self._listener = await database.async_engine.connect()
+        raw = await self._listener.get_raw_connection()
+        await raw.driver_connection.add_listener(CHANNEL, self._on_notify)
+
+    async def stop(self):
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_users": self.max_users,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+user_cache = UserCache()
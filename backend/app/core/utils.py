@@ -1,14 +1,38 @@
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import asyncio
+import hashlib
+import os
 import secrets
-from sqlalchemy.orm import Session
+import uuid
+from sqlalchemy import select, and_, exists
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core import oauth2
 from ..database import get_db
 from ..models import models
+from .project_access import ProjectAccess, project_access_cache
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Changing BCRYPT_ROUNDS rehashes each user's password at their next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a few threads keep it off the event loop. Work
+# beyond workers + queue is refused with a 503 instead of piling up.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+
+password_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+password_jobs = {"in_flight": 0, "rejected": 0}
 
 
 def hash(password: str):
@@ -19,93 +43,133 @@ def verify(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def run_password_job(func, *args):
+    if password_jobs["in_flight"] >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE:
+        password_jobs["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ins in progress, try again shortly",
+            headers={"Retry-After": "1"}
+        )
+
+    password_jobs["in_flight"] += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(password_pool, func, *args)
+    finally:
+        password_jobs["in_flight"] -= 1
+
+
+async def hash_password(password: str) -> str:
+    """hash() on the password pool."""
+    return await run_password_job(pwd_context.hash, password)
+
+
+async def verify_password(plain_password, hashed_password):
+    """
+    verify() on the password pool. Returns (valid, new_hash); new_hash is set
+    when the stored hash uses outdated parameters and should be saved.
+    """
+    return await run_password_job(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+REFRESH_TOKEN_EXPIRE_DAYS = 7
+
+
 def create_refresh_token():
     return secrets.token_urlsafe(64)
 
 
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(db: AsyncSession, user_id: int, family_id: str = None) -> str:
+    """
+    Add a refresh token row (committed by the caller) and return the raw token.
+    Without family_id this starts a new family, i.e. a new login.
+    """
+    token = create_refresh_token()
+    db.add(models.RefreshToken(
+        token_hash=hash_refresh_token(token),
+        family_id=family_id or uuid.uuid4().hex,
+        user_id=user_id,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    ))
+    return token
+
+
 
 def require_project_access(required_roles: list = None, allow_admin: bool = True):
     """
     Check if user has access to a project.
     If allow_admin=True, admins can access any project in their tenant.
+
+    Returns a ProjectAccess; the project and the caller's membership come
+    from one joined query, or the role from project_access_cache plus a
+    check that the project still exists.
     """
-    def checker(
+    async def checker(
         project_id: int,
-        db: Session = Depends(get_db),
-        current_user: models.User = Depends(oauth2.get_current_user),
+        db: AsyncSession = Depends(get_db),
+        current_user: models.User = Depends(oauth2.get_principal),
     ):
-        # First check if project exists and belongs to tenant
-        project = db.query(models.Project).filter(
-            models.Project.id == project_id,
-            models.Project.tenant_id == current_user.tenant_id,
-            models.Project.is_deleted.is_(False),
-        ).first()
-
-        if not project:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Project not found"
-            )
+        project = None
+        hit, role = project_access_cache.get(current_user.id, project_id)
+
+        if hit:
+            # Only the role is cached; the project may have been deleted since
+            live = await db.scalar(select(exists().where(
+                models.Project.id == project_id,
+                models.Project.tenant_id == current_user.tenant_id,
+                models.Project.is_deleted.is_(False),
+            )))
+            if not live:
+                project_access_cache.invalidate(current_user.id, project_id)
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Project not found"
+                )
+        else:
+            row = (await db.execute(
+                select(models.Project, models.ProjectMembers.role)
+                .outerjoin(models.ProjectMembers, and_(
+                    models.ProjectMembers.project_id == models.Project.id,
+                    models.ProjectMembers.user_id == current_user.id,
+                ))
+                .where(
+                    models.Project.id == project_id,
+                    models.Project.tenant_id == current_user.tenant_id,
+                    models.Project.is_deleted.is_(False),
+                )
+            )).first()
+
+            if not row:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Project not found"
+                )
+
+            project, role = row
+            project_access_cache.put(current_user.id, project_id, role)
+
+        access = ProjectAccess(project_id, current_user.tenant_id, role, project)
 
         # If user is admin and we allow admin access, grant permission
         if allow_admin and current_user.role == "admin":
-            return project
+            return access
 
-        # Otherwise check project membership
-        member = db.query(models.ProjectMembers).filter(
-            models.ProjectMembers.project_id == project_id,
-            models.ProjectMembers.user_id == current_user.id,
-        ).first()
-
-        if not member:
+        if role is None:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You do not have access to this project",
             )
 
-        if required_roles and member.role not in required_roles:
+        if required_roles and role not in required_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You do not have required role for this action",
             )
 
-        return member
+        return access
 
     return checker
-
-
-
-def update_project_progress(db: Session, project_id: int):
-    # 1️⃣ Ensure project is active
-    project = db.query(models.Project).filter(
-        models.Project.id == project_id,
-        models.Project.is_deleted.is_(False)
-    ).first()
-
-    if not project:
-        return
-
-    # 2️⃣ Count tasks
-    total_tasks = db.query(models.Task).filter(
-        models.Task.project_id == project_id,
-        models.Task.is_deleted.is_(False)
-    ).count()
-
-    if total_tasks == 0:
-        progress = 0
-    else:
-        completed_tasks = db.query(models.Task).filter(
-            models.Task.project_id == project_id,
-            models.Task.status == "done",
-            models.Task.is_deleted.is_(False)
-        ).count()
-
-        progress = int((completed_tasks / total_tasks) * 100)
-
-    # 3️⃣ Update project
-    project.progress = progress
-
-    # 4️⃣ Commit once
-    db.commit()
-
-
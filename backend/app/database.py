@@ -1,6 +1,13 @@
-from sqlalchemy import create_engine
+import time
+from collections import OrderedDict
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
 from dotenv import load_dotenv
 load_dotenv()
@@ -8,15 +15,223 @@ load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Async drivers used by the API for each sync driver we support
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto the matching async driver."""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)).render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(SQLALCHEMY_DATABASE_URL)
+
+# Optional streaming replica for read-only endpoints; reads use the primary when unset
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+
+# After a user writes, their reads stay on the primary this long so replica
+# lag can't hide their own changes
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_YOUR_WRITES_MAX_USERS = 10000
+
+# Clients can force a primary read for one request with this header
+READ_CONSISTENCY_HEADER = "x-read-consistency"
+
+# Pool sizing is per process: with N uvicorn workers the database sees up to
+# N * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections from the API
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool that records how long checkouts wait for a
+    connection, and separately how long opening new (overflow) connections
+    takes, so connect latency doesn't show up as queueing.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.connects = 0
+        self.connect_seconds_total = 0.0
+        self.connect_seconds_max = 0.0
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        record = None
+        try:
+            record = super()._create_connection()
+            return record
+        finally:
+            took = time.perf_counter() - start
+            self.connects += 1
+            self.connect_seconds_total += took
+            if took > self.connect_seconds_max:
+                self.connect_seconds_max = took
+            if record is not None:
+                # Picked up by _do_get, which runs this for overflow checkouts
+                record.connect_seconds = took
+
+    def _do_get(self):
+        start = time.perf_counter()
+        record = None
+        try:
+            record = super()._do_get()
+            return record
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            if record is not None:
+                waited -= record.__dict__.pop("connect_seconds", 0.0)
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            if waited > self.wait_seconds_max:
+                self.wait_seconds_max = waited
+
+
+# Sync engine: only for scripts (check_db.py, migrations) – never used inside a request
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **POOL_OPTIONS)
 
 SessionLocal = sessionmaker(bind=engine)
 
+# Async engine: used by every router and middleware
+async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=InstrumentedQueuePool, **POOL_OPTIONS)
+
+
+class PrimarySession(Session):
+    """Session bound to the primary; remembers which users wrote through it."""
+
+
+class ReadSession(Session):
+    """Replica session that falls back to the primary for read-your-writes."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if "use_primary" not in self.info:
+            # Decided once, on first use, so the whole request reads from one place
+            request = self.info.get("request")
+            self.info["use_primary"] = request is not None and must_read_primary(request)
+        if self.info["use_primary"]:
+            return async_engine.sync_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+# expire_on_commit=False so loaded attributes stay readable after commit
+# without an implicit (and in async, illegal) lazy refresh
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False, sync_session_class=PrimarySession)
+
+replica_engine = (
+    create_async_engine(to_async_url(REPLICA_DATABASE_URL), poolclass=InstrumentedQueuePool, **POOL_OPTIONS)
+    if REPLICA_DATABASE_URL else None
+)
+
+ReadSessionLocal = (
+    async_sessionmaker(bind=replica_engine, expire_on_commit=False, sync_session_class=ReadSession)
+    if replica_engine is not None else None
+)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+# user_id -> monotonic time of their last committed write (this worker only)
+recent_writers = OrderedDict()
+
+
+@event.listens_for(PrimarySession, "after_flush")
+def _flag_flush_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(PrimarySession, "do_orm_execute")
+def _flag_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def _remember_writer(session):
+    if not session.info.pop("wrote", False):
+        return
+    user_id = session.info.get("user_id")
+    if user_id is None:
+        return
+    recent_writers[user_id] = time.monotonic()
+    recent_writers.move_to_end(user_id)
+    while len(recent_writers) > READ_YOUR_WRITES_MAX_USERS:
+        recent_writers.popitem(last=False)
+
+
+def must_read_primary(request: Request) -> bool:
+    if request.headers.get(READ_CONSISTENCY_HEADER, "").lower() == "primary":
+        return True
+    user = getattr(request.state, "user", None)
+    if user is None:
+        return False
+    wrote_at = recent_writers.get(user.id)
+    return wrote_at is not None and time.monotonic() - wrote_at < READ_YOUR_WRITES_SECONDS
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def open_read_session(request: Request = None):
+    """
+    A new read session, for work that outlives the request's own session,
+    such as a streamed response body. Use as "async with".
+    """
+    if ReadSessionLocal is None:
+        return AsyncSessionLocal()
+    return ReadSessionLocal(info={"request": request})
+
+
+async def get_read_db(request: Request, db=Depends(get_db)):
+    """Session for read-only handlers: the replica when configured, else the primary."""
+    if ReadSessionLocal is None:
+        yield db
+        return
+
+    async with ReadSessionLocal(info={"request": request}) as read_db:
+        yield read_db
+
+
+def pool_stats(bind=async_engine) -> dict:
+    """Snapshot of the API connection pool for this worker."""
+    pool = bind.pool
+    checkouts = getattr(pool, "checkouts", 0)
+    wait_total = getattr(pool, "wait_seconds_total", 0.0)
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": checkouts,
+        "timeouts": getattr(pool, "timeouts", 0),
+        "wait_seconds_total": round(wait_total, 6),
+        "wait_seconds_avg": round(wait_total / checkouts, 6) if checkouts else 0.0,
+        "wait_seconds_max": round(getattr(pool, "wait_seconds_max", 0.0), 6),
+        "connects": getattr(pool, "connects", 0),
+        "connect_seconds_total": round(getattr(pool, "connect_seconds_total", 0.0), 6),
+        "connect_seconds_max": round(getattr(pool, "connect_seconds_max", 0.0), 6),
+    }
@@ -1,15 +1,39 @@
-from .core import logging, config
-from fastapi import FastAPI
-from .database import engine
-from .models import models
+import asyncio
+import os
+import secrets
+from contextlib import asynccontextmanager
+from .core import logging, config, log_maintenance, archive, query_stats, oauth2
+from .core.log_writer import log_writer
+from .core.user_cache import user_cache
+from .core.metrics import registry
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from .routers import user, auth, me, projects, invite, messaging, files, activity, analytics
+from .routers import user, auth, me, projects, invite, messaging, files, activity, analytics, admin, sync, export
 
 
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await log_writer.start()
+    await user_cache.start()
+    tasks = []
+    if log_maintenance.LOG_MAINTENANCE_SECONDS > 0:
+        tasks.append(asyncio.create_task(log_maintenance.run_forever()))
+    if archive.ARCHIVE_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(archive.run_forever()))
+    if oauth2.STATELESS_AUTH:
+        tasks.append(asyncio.create_task(oauth2.revocations.run_forever()))
+    yield
+    for task in tasks:
+        task.cancel()
+    await user_cache.stop()
+    # Flush buffered request logs before the worker exits
+    await log_writer.stop()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(query_stats.QueryStatsMiddleware)
 app.add_middleware(logging.LoggingMiddleware)
 app.add_middleware(logging.RateLimitMiddleware)
 app.add_middleware(config.LimitUploadSizeMiddleware)
@@ -20,6 +44,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 
@@ -29,6 +54,19 @@ app.add_middleware(
 def home():
     return "Hello Here resides my Saas"
 
+
+# When set, scrapers must send "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+@app.get('/metrics', include_in_schema=False)
+async def metrics(request: Request):
+    if METRICS_TOKEN and not secrets.compare_digest(
+        request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(user.router)
 app.include_router(auth.router)
 app.include_router(me.router)
@@ -37,4 +75,7 @@ app.include_router(invite.router)
 app.include_router(messaging.router)
 app.include_router(files.router)
 app.include_router(activity.router)
-app.include_router(analytics.router)
\ No newline at end of file
+app.include_router(analytics.router)
+app.include_router(admin.router)
+app.include_router(sync.router)
+app.include_router(export.router)
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+Minimal versioned migrations.
+
+Each module in app/migrations/versions defines:
+    version      - unique, increasing int
+    description  - one line shown by `python migrate.py status`
+    upgrade(conn) - DDL to run inside a transaction
+
+Applied versions are recorded in the schema_migrations table. The baseline
+creates tables from the current models, so later migrations must be
+idempotent (IF NOT EXISTS / checkfirst) to be safe on fresh databases.
+"""
+import importlib
+import pkgutil
+from sqlalchemy import Column, Integer, String, DateTime, MetaData, Table, func, select, text
+from ..database import engine
+from . import versions
+
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+# Arbitrary key so two deploys can't run migrations at the same time
+ADVISORY_LOCK_KEY = 804_221_001
+
+
+def load_migrations():
+    modules = [
+        importlib.import_module(f"{versions.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(versions.__path__)
+    ]
+    modules.sort(key=lambda m: m.version)
+
+    seen = set()
+    for module in modules:
+        if module.version in seen:
+            raise RuntimeError(f"Duplicate migration version {module.version}")
+        seen.add(module.version)
+    return modules
+
+
+def applied_versions(conn) -> set:
+    schema_migrations.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def status(bind=engine):
+    with bind.begin() as conn:
+        done = applied_versions(conn)
+    return [(m.version, m.description, m.version in done) for m in load_migrations()]
+
+
+def upgrade(bind=engine, target: int = None):
+    """Apply pending migrations in order, each in its own transaction."""
+    applied = []
+    is_postgres = bind.dialect.name == "postgresql"
+
+    with bind.connect() as lock_conn:
+        if is_postgres:
+            lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        try:
+            for module in load_migrations():
+                if target is not None and module.version > target:
+                    break
+                with bind.begin() as conn:
+                    if module.version in applied_versions(conn):
+                        continue
+                    module.upgrade(conn)
+                    conn.execute(schema_migrations.insert().values(
+                        version=module.version,
+                        description=module.description,
+                    ))
+                applied.append(module.version)
+        finally:
+            if is_postgres:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+                lock_conn.commit()
+
+    return applied
@@ -0,0 +1,8 @@
+from ...models import models
+
+version = 1
+description = "Baseline schema (tables previously created by create_all at startup)"
+
+
+def upgrade(conn):
+    models.Base.metadata.create_all(conn)
@@ -0,0 +1,29 @@
+from sqlalchemy.schema import CreateIndex
+from ...models import models
+
+version = 2
+description = "Composite and partial indexes for task, message, log and membership queries"
+
+INDEXES = {
+    "tasks": [
+        "ix_tasks_project_status_live",
+        "ix_tasks_tenant_assignee_status_live",
+        "ix_tasks_project_due_open",
+    ],
+    "projects": ["ix_projects_tenant_status_live"],
+    "messages": [
+        "ix_messages_conversation_created",
+        "ix_messages_conversation_unread",
+    ],
+    "logs": ["ix_logs_tenant_category_created"],
+    "project_members": ["ix_project_members_user_project"],
+    "conversation_participants": ["ix_conversation_participants_user_conversation"],
+}
+
+
+def upgrade(conn):
+    for table_name, index_names in INDEXES.items():
+        table = models.Base.metadata.tables[table_name]
+        by_name = {index.name: index for index in table.indexes}
+        for name in index_names:
+            conn.execute(CreateIndex(by_name[name], if_not_exists=True))
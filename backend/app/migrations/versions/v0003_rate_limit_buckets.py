@@ -0,0 +1,12 @@
+from sqlalchemy import text
+from ...models import models
+
+version = 3
+description = "Shared rate-limit state (rate_limit_buckets)"
+
+
+def upgrade(conn):
+    models.RateLimitBucket.__table__.create(conn, checkfirst=True)
+    if conn.dialect.name == "postgresql":
+        # Throwaway state: skip WAL, it's rebuilt within one window after a crash
+        conn.execute(text("ALTER TABLE rate_limit_buckets SET UNLOGGED"))
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import inspect, text
+from ...core import log_maintenance
+from ...models import models
+
+version = 4
+description = "Log route/status/duration columns, daily log partitions (Postgres), hourly rollups"
+
+NEW_COLUMNS = ["route", "status_code", "duration_ms"]
+
+
+def add_missing_columns(conn):
+    existing = {column["name"] for column in inspect(conn).get_columns("logs")}
+    for name in NEW_COLUMNS:
+        if name not in existing:
+            column_type = models.Log.__table__.c[name].type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE logs ADD COLUMN {name} {column_type}"))
+
+
+def partition_logs(conn):
+    """
+    Swap logs for a table range-partitioned by created_at.
+
+    Rows older than the retention window are not carried over. The primary
+    key has to include the partition key, so it becomes (id, created_at).
+    """
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence('logs', 'id')")).scalar()
+    today = datetime.now(timezone.utc).date()
+    first_day = today - timedelta(days=log_maintenance.LOG_RETENTION_DAYS)
+
+    conn.execute(text("ALTER TABLE logs RENAME TO logs_unpartitioned"))
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+    conn.execute(text(
+        "CREATE TABLE logs (LIKE logs_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (created_at)"
+    ))
+    conn.execute(text("ALTER TABLE logs ALTER COLUMN created_at SET NOT NULL"))
+    conn.execute(text("CREATE TABLE logs_default PARTITION OF logs DEFAULT"))
+    log_maintenance.ensure_partitions(conn, first_day, today + timedelta(days=log_maintenance.LOG_PARTITIONS_AHEAD))
+
+    conn.execute(text(
+        "INSERT INTO logs SELECT * FROM logs_unpartitioned "
+        "WHERE created_at >= :since"
+    ), {"since": datetime.combine(first_day, datetime.min.time(), timezone.utc)})
+    conn.execute(text("DROP TABLE logs_unpartitioned"))
+
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY logs.id"))
+    conn.execute(text("ALTER TABLE logs ADD PRIMARY KEY (id, created_at)"))
+    for index in models.Log.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def upgrade(conn):
+    add_missing_columns(conn)
+    models.LogRollup.__table__.create(conn, checkfirst=True)
+
+    if conn.dialect.name == "postgresql" and not log_maintenance.is_partitioned(conn):
+        partition_logs(conn)
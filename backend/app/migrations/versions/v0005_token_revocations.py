@@ -0,0 +1,8 @@
+from ...models import models
+
+version = 5
+description = "Access-token revocation list for stateless auth (token_revocations)"
+
+
+def upgrade(conn):
+    models.TokenRevocation.__table__.create(conn, checkfirst=True)
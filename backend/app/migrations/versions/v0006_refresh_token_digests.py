@@ -0,0 +1,46 @@
+import hashlib
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import inspect, text
+from ...models import models
+
+version = 6
+description = "Store refresh tokens as SHA-256 digests with rotation families"
+
+
+def upgrade(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns("refresh_tokens")}
+    if "token_hash" in columns:
+        return
+
+    is_postgres = conn.dialect.name == "postgresql"
+    timestamp = "TIMESTAMP WITH TIME ZONE" if is_postgres else "DATETIME"
+
+    conn.execute(text("DELETE FROM refresh_tokens WHERE expires_at < :now"),
+                 {"now": datetime.now(timezone.utc).replace(tzinfo=None)})
+    conn.execute(text("ALTER TABLE refresh_tokens ADD COLUMN token_hash VARCHAR(64)"))
+    conn.execute(text("ALTER TABLE refresh_tokens ADD COLUMN family_id VARCHAR(32)"))
+    conn.execute(text(f"ALTER TABLE refresh_tokens ADD COLUMN revoked_at {timestamp}"))
+    if is_postgres:
+        # Existing values were written as UTC
+        conn.execute(text(
+            "ALTER TABLE refresh_tokens ALTER COLUMN expires_at TYPE TIMESTAMP WITH TIME ZONE "
+            "USING expires_at AT TIME ZONE 'UTC'"
+        ))
+
+    # Existing sessions keep working: each live token becomes its own family
+    rows = conn.execute(text("SELECT id, token FROM refresh_tokens")).all()
+    for row_id, token in rows:
+        conn.execute(
+            text("UPDATE refresh_tokens SET token_hash = :token_hash, family_id = :family_id WHERE id = :id"),
+            {"token_hash": hashlib.sha256(token.encode()).hexdigest(), "family_id": uuid.uuid4().hex, "id": row_id},
+        )
+
+    conn.execute(text("DROP INDEX IF EXISTS ix_refresh_tokens_token"))
+    conn.execute(text("ALTER TABLE refresh_tokens DROP COLUMN token"))
+    if is_postgres:
+        conn.execute(text("ALTER TABLE refresh_tokens ALTER COLUMN token_hash SET NOT NULL"))
+        conn.execute(text("ALTER TABLE refresh_tokens ALTER COLUMN family_id SET NOT NULL"))
+
+    for index in models.RefreshToken.__table__.indexes:
+        index.create(conn, checkfirst=True)
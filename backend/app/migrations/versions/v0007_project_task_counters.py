@@ -0,0 +1,15 @@
+from sqlalchemy import inspect, text
+from ...core import task_counters
+
+version = 7
+description = "Counter columns for live and done tasks per project (total_tasks, done_tasks)"
+
+
+def upgrade(conn):
+    existing = {column["name"] for column in inspect(conn).get_columns("projects")}
+    for name in ("total_tasks", "done_tasks"):
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE projects ADD COLUMN {name} INTEGER NOT NULL DEFAULT 0"))
+
+    for statement in task_counters.recount():
+        conn.execute(statement)
@@ -0,0 +1,20 @@
+from sqlalchemy.schema import CreateIndex
+from ...models import models
+
+version = 8
+description = "Indexes for keyset pagination of projects, tasks, files and users"
+
+INDEXES = {
+    "projects": ["ix_projects_tenant_created_live"],
+    "tasks": ["ix_tasks_project_created_live"],
+    "files": ["ix_files_tenant_uploaded", "ix_files_tenant_shared_uploaded"],
+    "users": ["ix_users_tenant_created_active"],
+}
+
+
+def upgrade(conn):
+    for table_name, index_names in INDEXES.items():
+        table = models.Base.metadata.tables[table_name]
+        by_name = {index.name: index for index in table.indexes}
+        for name in index_names:
+            conn.execute(CreateIndex(by_name[name], if_not_exists=True))
@@ -0,0 +1,33 @@
+from sqlalchemy import text
+from ...core.search import SEARCH_CONFIG
+
+version = 9
+description = "Full-text search vectors and trigram indexes on projects and tasks (Postgres)"
+
+VECTORS = {
+    "projects": ("name", "description"),
+    "tasks": ("title", "description"),
+}
+
+
+def upgrade(conn):
+    # Other databases search with plain substring matching
+    if conn.dialect.name != "postgresql":
+        return
+
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+    for table, (title, body) in VECTORS.items():
+        conn.execute(text(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({title}, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({body}, '')), 'B')) STORED"
+        ))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} "
+            f"USING gin (search_vector) WHERE is_deleted = false"
+        ))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_{title}_trgm ON {table} "
+            f"USING gin ({title} gin_trgm_ops) WHERE is_deleted = false"
+        ))
@@ -0,0 +1,10 @@
+from sqlalchemy import inspect, text
+
+version = 10
+description = "Per-project change version for ETags (projects.version)"
+
+
+def upgrade(conn):
+    existing = {column["name"] for column in inspect(conn).get_columns("projects")}
+    if "version" not in existing:
+        conn.execute(text("ALTER TABLE projects ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
@@ -0,0 +1,32 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from ...models import models
+
+version = 11
+description = "Per-tenant change sequence and tombstones for delta sync"
+
+TABLES = ["tenant", "projects", "tasks", "project_members", "files"]
+
+INDEXES = {
+    "projects": ["ix_projects_tenant_change"],
+    "tasks": ["ix_tasks_tenant_change"],
+    "project_members": ["ix_project_members_project_change"],
+    "files": ["ix_files_tenant_change"],
+}
+
+
+def upgrade(conn):
+    inspector = inspect(conn)
+    for table_name in TABLES:
+        existing = {column["name"] for column in inspector.get_columns(table_name)}
+        if "change_seq" not in existing:
+            # Existing rows start at 0, so a first sync (since nothing) still returns them
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN change_seq BIGINT NOT NULL DEFAULT 0"))
+
+    models.SyncTombstone.__table__.create(conn, checkfirst=True)
+
+    for table_name, index_names in INDEXES.items():
+        table = models.Base.metadata.tables[table_name]
+        by_name = {index.name: index for index in table.indexes}
+        for name in index_names:
+            conn.execute(CreateIndex(by_name[name], if_not_exists=True))
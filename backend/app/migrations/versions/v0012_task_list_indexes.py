@@ -0,0 +1,20 @@
+from sqlalchemy.schema import CreateIndex
+from ...models import models
+
+version = 12
+description = "Indexes for task list filters and sorts"
+
+INDEXES = [
+    "ix_tasks_project_status_created_live",
+    "ix_tasks_project_assignee_created_live",
+    "ix_tasks_project_due_live",
+    "ix_tasks_project_title_live",
+    "ix_tasks_project_priority_live",
+]
+
+
+def upgrade(conn):
+    by_name = {index.name: index for index in models.Task.__table__.indexes}
+    for name in INDEXES:
+        # IF NOT EXISTS rather than checkfirst: SQLite can't reflect the expression index
+        conn.execute(CreateIndex(by_name[name], if_not_exists=True))
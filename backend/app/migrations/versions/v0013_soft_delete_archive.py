@@ -0,0 +1,36 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from ...models import models
+
+version = 13
+description = "deleted_at on projects and tasks, and archive tables for soft-deleted rows"
+
+TABLES = ["projects", "tasks"]
+
+INDEXES = {
+    "projects": ["ix_projects_deleted_at"],
+    "tasks": ["ix_tasks_deleted_at"],
+}
+
+
+def upgrade(conn):
+    inspector = inspect(conn)
+    timestamp = "TIMESTAMP WITH TIME ZONE" if conn.dialect.name == "postgresql" else "DATETIME"
+    for table_name in TABLES:
+        existing = {column["name"] for column in inspector.get_columns(table_name)}
+        if "deleted_at" not in existing:
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN deleted_at {timestamp}"))
+        # Rows deleted before the column existed: the delete was their last update
+        conn.execute(text(
+            f"UPDATE {table_name} SET deleted_at = COALESCE(updated_at, created_at) "
+            f"WHERE is_deleted = true AND deleted_at IS NULL"
+        ))
+
+    for table_name, index_names in INDEXES.items():
+        table = models.Base.metadata.tables[table_name]
+        by_name = {index.name: index for index in table.indexes}
+        for name in index_names:
+            conn.execute(CreateIndex(by_name[name], if_not_exists=True))
+
+    for table in (models.projects_archive, models.tasks_archive, models.project_members_archive):
+        table.create(conn, checkfirst=True)
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Text, UniqueConstraint, BigInteger
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Text, UniqueConstraint, BigInteger, Index, Float, Table, text
 from sqlalchemy.orm import relationship
 from app.database import Base
-from sqlalchemy import func
+from sqlalchemy import func, case, literal_column, type_coerce
 import uuid
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -12,6 +12,8 @@ class Tenant(Base):
     id = Column(Integer, primary_key=True, index=True)
     company_name = Column(String, nullable=False, unique=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Last change sequence number handed out to this tenant's writes (core.changes)
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     users = relationship("User", back_populates="tenant")
     projects = relationship("Project", back_populates="tenant")
@@ -21,6 +23,10 @@ class Tenant(Base):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset pagination of a tenant's users, newest first
+        Index("ix_users_tenant_created_active", "tenant_id", "created_at", "id", postgresql_where=text("is_active = true")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -43,6 +49,9 @@ class ProjectMembers(Base):
     __tablename__ = "project_members"
     __table_args__ = (
         UniqueConstraint("project_id", "user_id", name="uq_project_user"),
+        # "projects I belong to" lookups start from the user
+        Index("ix_project_members_user_project", "user_id", "project_id"),
+        Index("ix_project_members_project_change", "project_id", "change_seq", "id"),
     )
 
     id = Column(Integer, primary_key=True)
@@ -50,19 +59,34 @@ class ProjectMembers(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     role = Column(String, default="viewer")
     joined_at = Column(DateTime(timezone=True), server_default=func.now())
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     project = relationship("Project", back_populates="members")
     user = relationship("User")
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        Index("ix_projects_tenant_status_live", "tenant_id", "status", postgresql_where=text("is_deleted = false")),
+        Index("ix_projects_tenant_created_live", "tenant_id", "created_at", "id", postgresql_where=text("is_deleted = false")),
+        Index("ix_projects_tenant_change", "tenant_id", "change_seq", "id"),
+        Index("ix_projects_deleted_at", "deleted_at", postgresql_where=text("is_deleted = true")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(String, nullable=False)
     progress = Column(Integer, default=0)
+    # Live tasks and done live tasks, kept by core.task_counters
+    total_tasks = Column(Integer, nullable=False, default=0, server_default="0")
+    done_tasks = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped by every project, task and member write; ETags derive from it
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_deleted = Column(Boolean, default=False)
+    # When is_deleted was set; core.archive moves the row out after a retention window
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
     status = Column(String, default="active")
     deadline = Column(DateTime, nullable=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -77,6 +101,20 @@ class Project(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Partial indexes leave soft-deleted rows out entirely
+        Index("ix_tasks_project_status_live", "project_id", "status", postgresql_where=text("is_deleted = false")),
+        Index("ix_tasks_tenant_assignee_status_live", "tenant_id", "assigned_to", "status", postgresql_where=text("is_deleted = false")),
+        Index("ix_tasks_project_due_open", "project_id", "due_date", postgresql_where=text("is_deleted = false AND status <> 'done'")),
+        Index("ix_tasks_project_created_live", "project_id", "created_at", "id", postgresql_where=text("is_deleted = false")),
+        Index("ix_tasks_tenant_change", "tenant_id", "change_seq", "id"),
+        # Task list filters and sorts (core.task_query)
+        Index("ix_tasks_project_status_created_live", "project_id", "status", "created_at", "id", postgresql_where=text("is_deleted = false")),
+        Index("ix_tasks_project_assignee_created_live", "project_id", "assigned_to", "created_at", "id", postgresql_where=text("is_deleted = false")),
+        Index("ix_tasks_project_due_live", "project_id", "due_date", "id", postgresql_where=text("is_deleted = false")),
+        Index("ix_tasks_project_title_live", "project_id", "title", "id", postgresql_where=text("is_deleted = false")),
+        Index("ix_tasks_deleted_at", "deleted_at", postgresql_where=text("is_deleted = true")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -85,11 +123,13 @@ class Task(Base):
     priority = Column(String, default="medium") 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_deleted = Column(Boolean, default=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
     due_date = Column(DateTime(timezone=True), nullable=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     tenant_id = Column(Integer, ForeignKey("tenant.id"), nullable=False, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
     assigned_to = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     assignee = relationship("User")
 
@@ -97,6 +137,39 @@ class Task(Base):
     project = relationship("Project", back_populates="tasks")
 
 
+# Sort order of Task.priority. Constants are literal SQL so queries render the
+# exact expression the index below is built on; bound parameters would not match it.
+task_priority_rank = type_coerce(case(
+    (Task.priority == literal_column("'high'"), literal_column("3")),
+    (Task.priority == literal_column("'medium'"), literal_column("2")),
+    (Task.priority == literal_column("'low'"), literal_column("1")),
+    else_=literal_column("0"),
+), Integer)
+
+Index("ix_tasks_project_priority_live", Task.project_id, task_priority_rank, Task.id, postgresql_where=text("is_deleted = false"))
+
+
+def archive_table(source: Table, name: str, *indexes) -> Table:
+    """
+    A copy of source's columns without keys, defaults or constraints, plus
+    archived_at, for rows core.archive moves out of source. A migration that
+    adds a column to source must add it here too.
+    """
+    columns = [Column(column.name, column.type, primary_key=column.primary_key, autoincrement=False)
+               for column in source.columns]
+    return Table(name, Base.metadata, *columns,
+                 Column("archived_at", DateTime(timezone=True), server_default=func.now()),
+                 *indexes)
+
+
+projects_archive = archive_table(Project.__table__, "projects_archive",
+                                 Index("ix_projects_archive_tenant", "tenant_id"))
+tasks_archive = archive_table(Task.__table__, "tasks_archive",
+                              Index("ix_tasks_archive_project", "project_id"))
+project_members_archive = archive_table(ProjectMembers.__table__, "project_members_archive",
+                                        Index("ix_project_members_archive_project", "project_id"))
+
+
 class Invitation(Base):
     __tablename__ = "invitations"
 
@@ -121,16 +194,66 @@ class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
 
     id = Column(Integer, primary_key=True)
-    token = Column(String, unique=True, index=True, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    expires_at = Column(DateTime, nullable=False)
+    # SHA-256 hex digest; the token itself is only ever held by the client
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    # Every token rotated from the same login shares a family
+    family_id = Column(String(32), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    # Set when rotated or logged out; kept until expiry so reuse can be detected
+    revoked_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User")
 
 
+class TokenRevocation(Base):
+    """
+    Revoked access tokens for stateless auth: "jti:<jti>" revokes one token,
+    "user:<id>" revokes every token issued to that user before revoked_at.
+    Rows are only needed until the tokens they cover would have expired.
+    """
+    __tablename__ = "token_revocations"
+
+    key = Column(String, primary_key=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class SyncTombstone(Base):
+    """
+    Hard-deleted rows (project memberships, files) for delta sync. Projects
+    and tasks are soft-deleted, so their own rows carry the deletion until
+    they are archived, which leaves tombstones for them too.
+    """
+    __tablename__ = "sync_tombstones"
+    __table_args__ = (
+        Index("ix_sync_tombstones_tenant_change", "tenant_id", "change_seq"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(Integer, ForeignKey("tenant.id", ondelete="CASCADE"), nullable=False)
+    change_seq = Column(BigInteger, nullable=False)
+    kind = Column(String(16), nullable=False)
+    object_id = Column(Integer, nullable=False)
+    project_id = Column(Integer, nullable=True)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RateLimitBucket(Base):
+    """Shared GCRA state for the postgres rate-limit backend."""
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String, primary_key=True)
+    # Theoretical arrival time, seconds since the epoch
+    tat = Column(Float, nullable=False)
+
+
 class Log(Base):
     __tablename__ = "logs"
+    __table_args__ = (
+        Index("ix_logs_tenant_category_created", "tenant_id", "category", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     tenant_id = Column(Integer, index=True)
@@ -140,8 +263,26 @@ class Log(Base):
     message = Column(Text)
     ip_address = Column(String(45))
     user_agent = Column(Text)
+    # Route template ("GET /projects/{project_id}") so requests group per endpoint
+    route = Column(String(200))
+    status_code = Column(Integer)
+    duration_ms = Column(Float)
+    # Partition key on Postgres (see migration 0004): logs are split by day
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    
+
+
+class LogRollup(Base):
+    """Per tenant, route and hour request totals built from logs by log_maintenance."""
+    __tablename__ = "log_rollups_hourly"
+
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    # 0 for unauthenticated requests
+    tenant_id = Column(Integer, primary_key=True)
+    route = Column(String(200), primary_key=True)
+    requests = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)
+    p95_ms = Column(Float)
+
 class Conversation(Base):
     __tablename__ = "conversations"
 
@@ -158,6 +299,7 @@ class ConversationParticipant(Base):
     __tablename__ = "conversation_participants"
     __table_args__ = (
         UniqueConstraint("conversation_id", "user_id", name="uq_conversation_user"),
+        Index("ix_conversation_participants_user_conversation", "user_id", "conversation_id"),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -171,6 +313,10 @@ class ConversationParticipant(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_conversation_created", "conversation_id", "created_at"),
+        Index("ix_messages_conversation_unread", "conversation_id", "sender_id", postgresql_where=text("is_read = false")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"))
@@ -184,6 +330,11 @@ class Message(Base):
 
 class File(Base):
     __tablename__ = "files"
+    __table_args__ = (
+        Index("ix_files_tenant_uploaded", "tenant_id", "uploaded_at", "id"),
+        Index("ix_files_tenant_shared_uploaded", "tenant_id", "uploaded_at", "id", postgresql_where=text("is_shared = true")),
+        Index("ix_files_tenant_change", "tenant_id", "change_seq", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     tenant_id = Column(Integer, ForeignKey("tenant.id"))
@@ -193,5 +344,6 @@ class File(Base):
     size = Column(BigInteger)      
     is_shared = Column(Boolean, default=False)         
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     
\ No newline at end of file
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, or_
 from typing import List
-from ..database import get_db
+from ..database import get_read_db
 from ..models import models
 from ..core import oauth2
 from pydantic import BaseModel
@@ -26,18 +26,18 @@ class ActivityOut(BaseModel):
 
 @router.get("/recent", response_model=List[ActivityOut])
 async def get_recent_activity(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
     # Join with User to get names in one go
-    results = (
-        db.query(models.Log, models.User.name)
+    results = (await db.execute(
+        select(models.Log, models.User.name)
         .outerjoin(models.User, models.Log.user_id == models.User.id)
-        .filter(
+        .where(
             models.Log.tenant_id == current_user.tenant_id,
             models.Log.category == "SYSTEM"
         )
-        .filter(
+        .where(
             or_(
                 models.Log.action.like('POST%'),
                 models.Log.action.like('PUT%'),
@@ -46,8 +46,7 @@ async def get_recent_activity(
         )
         .order_by(models.Log.created_at.desc())
         .limit(10)
-        .all()
-    )
+    )).all()
 
     activities = []
     for log, user_name in results:
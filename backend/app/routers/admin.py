@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+from typing import List
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..schema import schemas
+from ..models import models
+from ..core import oauth2, permissions
+from ..core.log_writer import log_writer
+from ..core.user_cache import user_cache
+from .. import database
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"]
+)
+
+
+@router.get("/db/pool", response_model=schemas.PoolStatsOut)
+async def get_pool_stats(current_user: models.User = Depends(oauth2.get_principal)):
+    """Connection pool usage for the worker that served this request"""
+    permissions.require_admin(current_user)
+
+    return database.pool_stats()
+
+
+@router.get("/logs/writer", response_model=schemas.LogWriterStatsOut)
+async def get_log_writer_stats(current_user: models.User = Depends(oauth2.get_principal)):
+    """Request-log buffer for this worker: queue depth, writes and drops"""
+    permissions.require_admin(current_user)
+
+    return log_writer.stats()
+
+
+@router.get("/cache/users", response_model=schemas.UserCacheStatsOut)
+async def get_user_cache_stats(current_user: models.User = Depends(oauth2.get_principal)):
+    """Authenticated-user cache for this worker: size, hits and misses"""
+    permissions.require_admin(current_user)
+
+    return user_cache.stats()
+
+
+@router.get("/logs/traffic", response_model=List[schemas.TrafficRollupOut])
+async def get_traffic(hours: int = Query(24, ge=1, le=24 * 31),
+                      db: AsyncSession = Depends(database.get_read_db),
+                      current_user: models.User = Depends(oauth2.get_principal)):
+    """Hourly requests, 5xx errors and p95 latency per route for your tenant (Postgres only)"""
+    permissions.require_admin(current_user)
+
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    return (await db.scalars(
+        select(models.LogRollup)
+        .where(
+            models.LogRollup.tenant_id == current_user.tenant_id,
+            models.LogRollup.hour >= since
+        )
+        .order_by(models.LogRollup.hour.desc(), models.LogRollup.requests.desc())
+    )).all()
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, cast, Date, extract
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, and_, or_, cast, Date, extract
 from datetime import datetime, timedelta, timezone
 from typing import Optional, List
 from pydantic import BaseModel
-from ..database import get_db
+from ..database import get_read_db
 from ..models import models
 from app.core import oauth2
 from ..schema import schemas
@@ -15,73 +15,66 @@ router = APIRouter(prefix="/analytics",
 
 
 @router.get("/dashboard", response_model=schemas.DashboardMetrics)
-async def get_dashboard_metrics(db: Session = Depends(get_db),
-                                current_user: models.User = Depends(oauth2.get_current_user)):
+async def get_dashboard_metrics(db: AsyncSession = Depends(get_read_db),
+                                current_user: models.User = Depends(oauth2.get_principal)):
     
     tenant_id = current_user.tenant_id
 
-    total_projects = db.query(models.Project).filter(
+    total_projects = await db.scalar(select(func.count(models.Project.id)).where(
         models.Project.tenant_id == tenant_id,
         models.Project.is_deleted.is_(False)
-    ).count()
+    ))
 
-    active_projects = db.query(models.Project).filter(
+    active_projects = await db.scalar(select(func.count(models.Project.id)).where(
         models.Project.tenant_id == tenant_id,
         models.Project.status == 'active',
         models.Project.is_deleted.is_(False)
-    ).count()
+    ))
 
-    completed_projects = db.query(models.Project).filter(
+    completed_projects = await db.scalar(select(func.count(models.Project.id)).where(
         models.Project.tenant_id == tenant_id,
         models.Project.status == 'completed',
         models.Project.is_deleted.is_(False)
-    ).count()
+    ))
 
-    total_tasks = db.query(models.Task).join(
-        models.Project).filter(
-            models.Project.tenant_id == tenant_id,
-            models.Project.is_deleted.is_(False)
-        ).count()
+    total_tasks = await db.scalar(select(func.count(models.Task.id)).join(models.Project).where(
+        models.Project.tenant_id == tenant_id,
+        models.Project.is_deleted.is_(False)
+    ))
     
-    completed_tasks = db.query(models.Task).join(
-        models.Project
-    ).filter(
+    completed_tasks = await db.scalar(select(func.count(models.Task.id)).join(models.Project).where(
         models.Project.tenant_id == tenant_id,
         models.Task.status == "done",
         models.Project.is_deleted.is_(False)
-    ).count()
+    ))
 
-    pending_tasks = db.query(models.Task).join(
-        models.Project
-    ).filter(
+    pending_tasks = await db.scalar(select(func.count(models.Task.id)).join(models.Project).where(
         models.Project.tenant_id == tenant_id,
         models.Task.status == "pending",
         models.Project.is_deleted.is_(False)
-    ).count()
+    ))
 
     today = datetime.now(timezone.utc)
-    overdue_tasks = db.query(models.Task).join(
-        models.Project
-    ).filter(
+    overdue_tasks = await db.scalar(select(func.count(models.Task.id)).join(models.Project).where(
         models.Project.tenant_id == tenant_id,
         models.Task.due_date < today,
         models.Task.status != 'done',
         models.Project.is_deleted.is_(False)
-    ).count()
+    ))
 
-    total_team_members = db.query(models.User).filter(
+    total_team_members = await db.scalar(select(func.count(models.User.id)).where(
         models.User.tenant_id == tenant_id,
         models.User.is_active.is_(True)
-    ).count()
+    ))
 
     completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
 
-    avg_progress = db.query(
+    avg_progress = await db.scalar(select(
         func.avg(models.Project.progress)
-    ).filter(
+    ).where(
         models.Project.tenant_id == tenant_id,
         models.Project.is_deleted.is_(False)
-    ).scalar() or 0 
+    )) or 0 
 
     return schemas.DashboardMetrics(
         total_projects=total_projects,
@@ -102,8 +95,8 @@ async def get_dashboard_metrics(db: Session = Depends(get_db),
 async def get_projects_analytics(
     status: Optional[str] = Query(None, description="Filter by project status"),
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
     """
     Get detailed analytics for all projects
@@ -112,53 +105,53 @@ async def get_projects_analytics(
     today = datetime.utcnow()
 
     # Base query
-    query = db.query(models.Project).filter(
+    query = select(models.Project).where(
         models.Project.tenant_id == tenant_id,
         models.Project.is_deleted.is_(False)
     )
 
     if status:
-        query = query.filter(models.Project.status == status)
+        query = query.where(models.Project.status == status)
 
-    projects = query.limit(limit).all()
+    projects = (await db.scalars(query.limit(limit))).all()
 
     result = []
     for project in projects:
         # Task counts
-        total_tasks = db.query(models.Task).filter(
+        total_tasks = await db.scalar(select(func.count(models.Task.id)).where(
             models.Task.project_id == project.id,
             models.Task.is_deleted.is_(False)
-        ).count()
+        ))
 
-        completed_tasks = db.query(models.Task).filter(
+        completed_tasks = await db.scalar(select(func.count(models.Task.id)).where(
             models.Task.project_id == project.id,
             models.Task.status == "done",
             models.Task.is_deleted.is_(False)
-        ).count()
+        ))
 
-        in_progress_tasks = db.query(models.Task).filter(
+        in_progress_tasks = await db.scalar(select(func.count(models.Task.id)).where(
             models.Task.project_id == project.id,
             models.Task.status == "in_progress",
             models.Task.is_deleted.is_(False)
-        ).count()
+        ))
 
-        pending_tasks = db.query(models.Task).filter(
+        pending_tasks = await db.scalar(select(func.count(models.Task.id)).where(
             models.Task.project_id == project.id,
             models.Task.status == "pending",
             models.Task.is_deleted.is_(False)
-        ).count()
+        ))
 
-        overdue_tasks = db.query(models.Task).filter(
+        overdue_tasks = await db.scalar(select(func.count(models.Task.id)).where(
             models.Task.project_id == project.id,
             models.Task.due_date < today,
             models.Task.status != "done",
             models.Task.is_deleted.is_(False)
-        ).count()
+        ))
 
         # Team size
-        team_size = db.query(models.ProjectMembers).filter(
+        team_size = await db.scalar(select(func.count(models.ProjectMembers.id)).where(
             models.ProjectMembers.project_id == project.id
-        ).count()
+        ))
 
         # Completion rate
         completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
@@ -184,8 +177,8 @@ async def get_projects_analytics(
 @router.get("/projects/{project_id}", response_model=schemas.ProjectAnalytics)
 async def get_project_analytics(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
     """
     Get detailed analytics for a specific project
@@ -193,11 +186,11 @@ async def get_project_analytics(
     tenant_id = current_user.tenant_id
     today = datetime.utcnow()
 
-    project = db.query(models.Project).filter(
+    project = await db.scalar(select(models.Project).where(
         models.Project.id == project_id,
         models.Project.tenant_id == tenant_id,
         models.Project.is_deleted.is_(False)
-    ).first()
+    ))
 
     if not project:
         raise HTTPException(
@@ -206,40 +199,40 @@ async def get_project_analytics(
         )
 
     # Task counts
-    total_tasks = db.query(models.Task).filter(
+    total_tasks = await db.scalar(select(func.count(models.Task.id)).where(
         models.Task.project_id == project.id,
         models.Task.is_deleted.is_(False)
-    ).count()
+    ))
 
-    completed_tasks = db.query(models.Task).filter(
+    completed_tasks = await db.scalar(select(func.count(models.Task.id)).where(
         models.Task.project_id == project.id,
         models.Task.status == "done",
         models.Task.is_deleted.is_(False)
-    ).count()
+    ))
 
-    in_progress_tasks = db.query(models.Task).filter(
+    in_progress_tasks = await db.scalar(select(func.count(models.Task.id)).where(
         models.Task.project_id == project.id,
         models.Task.status == "in_progress",
         models.Task.is_deleted.is_(False)
-    ).count()
+    ))
 
-    pending_tasks = db.query(models.Task).filter(
+    pending_tasks = await db.scalar(select(func.count(models.Task.id)).where(
         models.Task.project_id == project.id,
         models.Task.status == "pending",
         models.Task.is_deleted.is_(False)
-    ).count()
+    ))
 
-    overdue_tasks = db.query(models.Task).filter(
+    overdue_tasks = await db.scalar(select(func.count(models.Task.id)).where(
         models.Task.project_id == project.id,
         models.Task.due_date < today,
         models.Task.status != "done",
         models.Task.is_deleted.is_(False)
-    ).count()
+    ))
 
     # Team size
-    team_size = db.query(models.ProjectMembers).filter(
+    team_size = await db.scalar(select(func.count(models.ProjectMembers.id)).where(
         models.ProjectMembers.project_id == project.id
-    ).count()
+    ))
 
     # Completion rate
     completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
@@ -267,8 +260,8 @@ async def get_project_analytics(
 @router.get("/users/productivity", response_model=List[schemas.UserProductivity])
 async def get_users_productivity(
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
     """
     Get productivity metrics for all users in the tenant
@@ -276,66 +269,58 @@ async def get_users_productivity(
     tenant_id = current_user.tenant_id
     today = datetime.utcnow()
 
-    users = db.query(models.User).filter(
+    users = (await db.scalars(select(models.User).where(
         models.User.tenant_id == tenant_id,
         models.User.is_active.is_(True)
-    ).limit(limit).all()
+    ).limit(limit))).all()
 
     result = []
     for user in users:
         # Task counts
-        assigned_tasks = db.query(models.Task).join(
-            models.Project
-        ).filter(
+        assigned_tasks = await db.scalar(select(func.count(models.Task.id)).join(models.Project).where(
             models.Task.assigned_to == user.id,
             models.Project.tenant_id == tenant_id,
             models.Task.is_deleted.is_(False)
-        ).count()
+        ))
 
-        completed_tasks = db.query(models.Task).join(
-            models.Project
-        ).filter(
+        completed_tasks = await db.scalar(select(func.count(models.Task.id)).join(models.Project).where(
             models.Task.assigned_to == user.id,
             models.Project.tenant_id == tenant_id,
             models.Task.status == "done",
             models.Task.is_deleted.is_(False)
-        ).count()
+        ))
 
-        in_progress_tasks = db.query(models.Task).join(
-            models.Project
-        ).filter(
+        in_progress_tasks = await db.scalar(select(func.count(models.Task.id)).join(models.Project).where(
             models.Task.assigned_to == user.id,
             models.Project.tenant_id == tenant_id,
             models.Task.status == "in_progress",
             models.Task.is_deleted.is_(False)
-        ).count()
+        ))
 
-        overdue_tasks = db.query(models.Task).join(
-            models.Project
-        ).filter(
+        overdue_tasks = await db.scalar(select(func.count(models.Task.id)).join(models.Project).where(
             models.Task.assigned_to == user.id,
             models.Project.tenant_id == tenant_id,
             models.Task.due_date < today,
             models.Task.status != "done",
             models.Task.is_deleted.is_(False)
-        ).count()
+        ))
 
         # Completion rate
         completion_rate = (completed_tasks / assigned_tasks * 100) if assigned_tasks > 0 else 0
 
         # Average completion time (for completed tasks)
-        avg_time = db.query(
+        avg_time = await db.scalar(select(
             func.avg(
                 extract('epoch', models.Task.updated_at - models.Task.created_at) / 86400.0
             )
-        ).join(
+        ).select_from(models.Task).join(
             models.Project
-        ).filter(
+        ).where(
             models.Task.assigned_to == user.id,
             models.Project.tenant_id == tenant_id,
             models.Task.status == "done",
             models.Task.is_deleted.is_(False)
-        ).scalar()
+        ))
 
         result.append(schemas.UserProductivity(
             user_id=user.id,
@@ -359,8 +344,8 @@ async def get_users_productivity(
 @router.get("/tasks/timeline", response_model=List[schemas.TimeSeriesData])
 async def get_tasks_timeline(
     days: int = Query(30, ge=7, le=365, description="Number of days to analyze"),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
     """
     Get task creation timeline (tasks created per day)
@@ -370,18 +355,18 @@ async def get_tasks_timeline(
     start_date = end_date - timedelta(days=days)
 
     # Query tasks grouped by date
-    tasks_by_date = db.query(
+    tasks_by_date = (await db.execute(select(
         cast(models.Task.created_at, Date).label('date'),
         func.count(models.Task.id).label('count')
     ).join(
         models.Project
-    ).filter(
+    ).where(
         models.Project.tenant_id == tenant_id,
         models.Task.created_at >= start_date,
         models.Task.is_deleted.is_(False)
     ).group_by(
         cast(models.Task.created_at, Date)
-    ).all()
+    ))).all()
 
     # Convert to dict for easy lookup
     data_dict = {str(row.date): row.count for row in tasks_by_date}
@@ -403,8 +388,8 @@ async def get_tasks_timeline(
 @router.get("/tasks/completion-timeline", response_model=List[schemas.TimeSeriesData])
 async def get_tasks_completion_timeline(
     days: int = Query(30, ge=7, le=365, description="Number of days to analyze"),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
     """
     Get task completion timeline (tasks completed per day)
@@ -414,19 +399,19 @@ async def get_tasks_completion_timeline(
     start_date = end_date - timedelta(days=days)
 
     # Query completed tasks grouped by date
-    tasks_by_date = db.query(
+    tasks_by_date = (await db.execute(select(
         cast(models.Task.updated_at, Date).label('date'),
         func.count(models.Task.id).label('count')
     ).join(
         models.Project
-    ).filter(
+    ).where(
         models.Project.tenant_id == tenant_id,
         models.Task.status == "done",
         models.Task.updated_at >= start_date,
         models.Task.is_deleted.is_(False)
     ).group_by(
         cast(models.Task.updated_at, Date)
-    ).all()
+    ))).all()
 
     # Convert to dict
     data_dict = {str(row.date): row.count for row in tasks_by_date}
@@ -449,8 +434,8 @@ async def get_tasks_completion_timeline(
 @router.get("/tasks/status-distribution", response_model=List[schemas.TaskStatusDistribution])
 async def get_task_status_distribution(
     project_id: Optional[int] = Query(None, description="Filter by project ID"),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
     """
     Get distribution of tasks by status
@@ -458,20 +443,20 @@ async def get_task_status_distribution(
     tenant_id = current_user.tenant_id
 
     # Base query
-    query = db.query(
+    query = select(
         models.Task.status,
         func.count(models.Task.id).label('count')
     ).join(
         models.Project
-    ).filter(
+    ).where(
         models.Project.tenant_id == tenant_id,
         models.Task.is_deleted.is_(False)
     )
 
     if project_id:
-        query = query.filter(models.Task.project_id == project_id)
+        query = query.where(models.Task.project_id == project_id)
 
-    status_counts = query.group_by(models.Task.status).all()
+    status_counts = (await db.execute(query.group_by(models.Task.status))).all()
 
     # Calculate total for percentages
     total = sum(row.count for row in status_counts)
@@ -491,8 +476,8 @@ async def get_task_status_distribution(
 @router.get("/tasks/priority-distribution", response_model=List[schemas.PriorityDistribution])
 async def get_task_priority_distribution(
     project_id: Optional[int] = Query(None, description="Filter by project ID"),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
     """
     Get distribution of tasks by priority
@@ -500,20 +485,20 @@ async def get_task_priority_distribution(
     tenant_id = current_user.tenant_id
 
     # Base query
-    query = db.query(
+    query = select(
         models.Task.priority,
         func.count(models.Task.id).label('count')
     ).join(
         models.Project
-    ).filter(
+    ).where(
         models.Project.tenant_id == tenant_id,
         models.Task.is_deleted.is_(False)
     )
 
     if project_id:
-        query = query.filter(models.Task.project_id == project_id)
+        query = query.where(models.Task.project_id == project_id)
 
-    priority_counts = query.group_by(models.Task.priority).all()
+    priority_counts = (await db.execute(query.group_by(models.Task.priority))).all()
 
     # Calculate total for percentages
     total = sum(row.count for row in priority_counts)
@@ -532,8 +517,8 @@ async def get_task_priority_distribution(
 
 @router.get("/projects/health-score")
 async def get_project_health_scores(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
     """
     Calculate health scores for projects based on multiple factors:
@@ -545,35 +530,35 @@ async def get_project_health_scores(
     tenant_id = current_user.tenant_id
     today = datetime.utcnow()
 
-    projects = db.query(models.Project).filter(
+    projects = (await db.scalars(select(models.Project).where(
         models.Project.tenant_id == tenant_id,
         models.Project.is_deleted.is_(False),
         models.Project.status == "active"
-    ).all()
+    ))).all()
 
     result = []
     for project in projects:
         # Calculate various health metrics
-        total_tasks = db.query(models.Task).filter(
+        total_tasks = await db.scalar(select(func.count(models.Task.id)).where(
             models.Task.project_id == project.id,
             models.Task.is_deleted.is_(False)
-        ).count()
+        ))
 
         if total_tasks == 0:
             continue
 
-        completed_tasks = db.query(models.Task).filter(
+        completed_tasks = await db.scalar(select(func.count(models.Task.id)).where(
             models.Task.project_id == project.id,
             models.Task.status == "done",
             models.Task.is_deleted.is_(False)
-        ).count()
+        ))
 
-        overdue_tasks = db.query(models.Task).filter(
+        overdue_tasks = await db.scalar(select(func.count(models.Task.id)).where(
             models.Task.project_id == project.id,
             models.Task.due_date < today,
             models.Task.status != "done",
             models.Task.is_deleted.is_(False)
-        ).count()
+        ))
 
         # Calculate health score (0-100)
         completion_score = (completed_tasks / total_tasks) * 40  # 40% weight
@@ -612,8 +597,8 @@ async def get_project_health_scores(
 
 @router.get("/reports/executive-summary")
 async def get_executive_summary(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
     """
     Generate an executive summary with key insights
@@ -629,52 +614,52 @@ async def get_executive_summary(
     last_30_days = today - timedelta(days=30)
 
     # Overall metrics
-    total_projects = db.query(models.Project).filter(
+    total_projects = await db.scalar(select(func.count(models.Project.id)).where(
         models.Project.tenant_id == tenant_id,
         models.Project.is_deleted.is_(False)
-    ).count()
+    ))
 
-    active_projects = db.query(models.Project).filter(
+    active_projects = await db.scalar(select(func.count(models.Project.id)).where(
         models.Project.tenant_id == tenant_id,
         models.Project.status == "active",
         models.Project.is_deleted.is_(False)
-    ).count()
+    ))
 
     # Tasks metrics
-    total_tasks = db.query(models.Task).join(models.Project).filter(
+    total_tasks = await db.scalar(select(func.count(models.Task.id)).join(models.Project).where(
         models.Project.tenant_id == tenant_id,
         models.Task.is_deleted.is_(False)
-    ).count()
+    ))
 
-    completed_tasks_30d = db.query(models.Task).join(models.Project).filter(
+    completed_tasks_30d = await db.scalar(select(func.count(models.Task.id)).join(models.Project).where(
         models.Project.tenant_id == tenant_id,
         models.Task.status == "done",
         models.Task.updated_at >= last_30_days,
         models.Task.is_deleted.is_(False)
-    ).count()
+    ))
 
-    overdue_tasks = db.query(models.Task).join(models.Project).filter(
+    overdue_tasks = await db.scalar(select(func.count(models.Task.id)).join(models.Project).where(
         models.Project.tenant_id == tenant_id,
         models.Task.due_date < today,
         models.Task.status != "done",
         models.Task.is_deleted.is_(False)
-    ).count()
+    ))
 
     # Team metrics
-    total_users = db.query(models.User).filter(
+    total_users = await db.scalar(select(func.count(models.User.id)).where(
         models.User.tenant_id == tenant_id,
         models.User.is_active.is_(True)
-    ).count()
+    ))
 
     # Projects at risk (deadline within 7 days and progress < 70%)
-    at_risk_projects = db.query(models.Project).filter(
+    at_risk_projects = await db.scalar(select(func.count(models.Project.id)).where(
         models.Project.tenant_id == tenant_id,
         models.Project.deadline.isnot(None),
         models.Project.deadline <= today + timedelta(days=7),
         models.Project.progress < 70,
         models.Project.status == "active",
         models.Project.is_deleted.is_(False)
-    ).count()
+    ))
 
     return {
         "summary": {
@@ -689,13 +674,13 @@ async def get_executive_summary(
         },
         "alerts": {
             "projects_at_risk": at_risk_projects,
-            "high_priority_overdue": db.query(models.Task).join(models.Project).filter(
+            "high_priority_overdue": await db.scalar(select(func.count(models.Task.id)).join(models.Project).where(
                 models.Project.tenant_id == tenant_id,
                 models.Task.priority == "high",
                 models.Task.due_date < today,
                 models.Task.status != "done",
                 models.Task.is_deleted.is_(False)
-            ).count()
+            ))
         },
         "generated_at": today.isoformat()
     }
\ No newline at end of file
@@ -1,40 +1,42 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm
 from ..database import get_db
 from ..schema.schemas import Token, SignupRequest, RefreshTokenRequest ,LogoutRequest
 
 from ..models import models
 from ..core import utils, oauth2
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 
 router = APIRouter(prefix="/auth",
                     tags=["Tenant"])
 
 @router.post('/login', response_model=Token)
-async def auth_user(db: Session = Depends(get_db), user_credentials: OAuth2PasswordRequestForm = Depends()):
+async def auth_user(db: AsyncSession = Depends(get_db), user_credentials: OAuth2PasswordRequestForm = Depends()):
 
-    user = db.query(models.User).filter(models.User.email == user_credentials.username).first()
+    user = await db.scalar(select(models.User).where(models.User.email == user_credentials.username))
 
-    if not user or not utils.verify(user_credentials.password, user.password):
+    if not user:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN , detail="Invalid credentials")
+
+    valid, new_hash = await utils.verify_password(user_credentials.password, user.password)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN , detail="Invalid credentials")
+
+    if new_hash:
+        # Cost parameters changed since this hash was made; saved with the refresh token below
+        user.password = new_hash
     
-    access_token = oauth2.create_access_token(
-        data={
-            "sub": str(user.id),
-            "tenant_id": user.tenant_id
-        }
-    )
-    refresh_token = utils.create_refresh_token()
+    access_token = oauth2.create_user_access_token(user)
+    refresh_token = utils.issue_refresh_token(db, user.id)
 
-    db.add(
-        models.RefreshToken(
-            token=refresh_token,
-            user_id=user.id,
-            expires_at=datetime.now(timezone.utc) + timedelta(days=7)
-        )
-    )
-    db.commit()
+    # Expired rows have outlived reuse detection; clear this user's out
+    await db.execute(delete(models.RefreshToken).where(
+        models.RefreshToken.user_id == user.id,
+        models.RefreshToken.expires_at < datetime.now(timezone.utc)
+    ))
+    await db.commit()
 
     return {
     "access_token": access_token,
@@ -43,36 +45,54 @@ async def auth_user(db: Session = Depends(get_db), user_credentials: OAuth2Passw
     }
 
 @router.post('/logout', status_code=status.HTTP_204_NO_CONTENT)
-async def logout(data: LogoutRequest, db: Session = Depends(get_db)):
-
-    token_record = db.query(models.RefreshToken).filter(models.RefreshToken.token == data.refresh_token).first()
-
-    if not token_record:
-        return
-    
-    db.delete(token_record)
-    db.commit()
+async def logout(data: LogoutRequest, db: AsyncSession = Depends(get_db),
+                 access_token: str = Depends(oauth2.optional_oauth2_scheme)):
+
+    # Also revoke the access token the client is holding, if it sent one.
+    # Only stateless auth checks revocations; otherwise the row would do nothing
+    if access_token and oauth2.STATELESS_AUTH:
+        try:
+            token_data = oauth2.verify_access_token(access_token, HTTPException(status_code=401))
+        except HTTPException:
+            token_data = None
+        if token_data is not None and token_data.jti and token_data.exp:
+            await oauth2.revocations.revoke_token(
+                db, token_data.jti, datetime.fromtimestamp(token_data.exp, timezone.utc)
+            )
+
+    # Ends the whole session: every token rotated from the same login
+    family = select(models.RefreshToken.family_id).where(
+        models.RefreshToken.token_hash == utils.hash_refresh_token(data.refresh_token)
+    ).scalar_subquery()
+
+    await db.execute(
+        update(models.RefreshToken)
+        .where(models.RefreshToken.family_id == family, models.RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
 
 
 
 
 @router.post('/admin', response_model=RefreshTokenRequest, status_code=status.HTTP_201_CREATED)
-async def admin(data: SignupRequest, db: Session = Depends(get_db)):
+async def admin(data: SignupRequest, db: AsyncSession = Depends(get_db)):
 
-    existing_tentant = db.query(models.Tenant).filter(models.Tenant.company_name == data.company_name).first()
+    existing_tentant = await db.scalar(select(models.Tenant).where(models.Tenant.company_name == data.company_name))
     if existing_tentant:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Company already Exists")
     
-    existing_user = db.query(models.User).filter(models.User.email == data.email).first()
+    existing_user = await db.scalar(select(models.User).where(models.User.email == data.email))
     if existing_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already Exists")
   
     new_tenant = models.Tenant(company_name=data.company_name)
     db.add(new_tenant)
-    db.commit()
-    db.refresh(new_tenant)
+    await db.commit()
+    await db.refresh(new_tenant)
 
-    hashed_password = utils.hash(data.password)
+    hashed_password = await utils.hash_password(data.password)
 
     admin_user = models.User(
         name=data.name,
@@ -84,27 +104,13 @@ async def admin(data: SignupRequest, db: Session = Depends(get_db)):
     )
 
     db.add(admin_user)
-    db.commit()
-    db.refresh(admin_user)
-
-    access_token = oauth2.create_access_token(
-        data={
-            "sub": str(admin_user.id),
-            "tenant_id": new_tenant.id,
-            "role": "admin"
-        }
-    )
-    
-    refresh_token = utils.create_refresh_token()
+    await db.commit()
+    await db.refresh(admin_user)
 
-    db.add(
-        models.RefreshToken(
-            token=refresh_token,
-            user_id=admin_user.id,
-            expires_at=datetime.now(timezone.utc) + timedelta(days=7)
-        )
-    )
-    db.commit()
+    access_token = oauth2.create_user_access_token(admin_user)
+    
+    refresh_token = utils.issue_refresh_token(db, admin_user.id)
+    await db.commit()
     
     return {
         "access_token": access_token,
@@ -116,37 +122,56 @@ async def admin(data: SignupRequest, db: Session = Depends(get_db)):
 @router.post("/refresh", response_model= Token)
 async def refresh_access_token(
     data: RefreshTokenRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    token_record = (
-        db.query(models.RefreshToken)
-        .filter(
-            models.RefreshToken.token == data.refresh_token,
-            models.RefreshToken.expires_at > datetime.now(timezone.utc)
+    now = datetime.now(timezone.utc)
+    token_hash = utils.hash_refresh_token(data.refresh_token)
+
+    # Rotation: revoking the presented token is the claim on it, so of two
+    # concurrent refreshes with the same token only one gets a row back
+    claimed = (await db.execute(
+        update(models.RefreshToken)
+        .where(
+            models.RefreshToken.token_hash == token_hash,
+            models.RefreshToken.revoked_at.is_(None),
+            models.RefreshToken.expires_at > now
         )
-        .first()
-    )
+        .values(revoked_at=now)
+        .returning(models.RefreshToken.user_id, models.RefreshToken.family_id)
+        .execution_options(synchronize_session=False)
+    )).first()
+
+    if not claimed:
+        # A token that was already rotated is being replayed: whoever holds
+        # this family can't be trusted, so end it for everyone
+        family = select(models.RefreshToken.family_id).where(
+            models.RefreshToken.token_hash == token_hash,
+            models.RefreshToken.revoked_at.is_not(None)
+        ).scalar_subquery()
+        await db.execute(
+            update(models.RefreshToken)
+            .where(models.RefreshToken.family_id == family, models.RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
 
-    if not token_record:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired refresh token"
         )
 
-    user = token_record.user
+    user = await db.get(models.User, claimed.user_id)
 
     if not user.is_active:
         raise HTTPException(status_code=403, detail="User is inactive")
 
-    new_access_token = oauth2.create_access_token(
-        data={
-            "sub": str(user.id),
-            "tenant_id": user.tenant_id,
-            "role": user.role
-        }
-    )
+    new_access_token = oauth2.create_user_access_token(user)
+    new_refresh_token = utils.issue_refresh_token(db, user.id, claimed.family_id)
+    await db.commit()
 
     return {
         "access_token": new_access_token,
+        "refresh_token": new_refresh_token,
         "token_type": "bearer"
     }
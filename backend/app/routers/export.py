@@ -0,0 +1,93 @@
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy import and_, select
+from typing import Literal
+from ..models import models
+from ..core import oauth2, utils, export, search as search_index
+from ..core.task_query import FIELDS as TASK_FIELDS, TaskQuery
+
+
+router = APIRouter(
+    prefix="/export",
+    tags=["Export"]
+)
+
+Format = Literal["ndjson", "csv"]
+
+PROJECT_COLUMNS = {
+    "id": models.Project.id,
+    "name": models.Project.name,
+    "description": models.Project.description,
+    "status": models.Project.status,
+    "progress": models.Project.progress,
+    "total_tasks": models.Project.total_tasks,
+    "done_tasks": models.Project.done_tasks,
+    "deadline": models.Project.deadline,
+    "created_at": models.Project.created_at,
+    "my_role": models.ProjectMembers.role,
+}
+
+MEMBER_COLUMNS = {
+    "id": models.ProjectMembers.id,
+    "user_id": models.ProjectMembers.user_id,
+    "role": models.ProjectMembers.role,
+    "joined_at": models.ProjectMembers.joined_at,
+    "user_name": models.User.name,
+    "user_email": models.User.email,
+    "user_role": models.User.role,
+}
+
+
+@router.get("/projects")
+async def export_projects(
+    request: Request,
+    format: Format = Query("ndjson"),
+    current_user: models.User = Depends(oauth2.get_principal),
+):
+    """Every live project the caller can see, newest first."""
+    query = (
+        select(*PROJECT_COLUMNS.values())
+        .outerjoin(models.ProjectMembers, and_(
+            models.ProjectMembers.project_id == models.Project.id,
+            models.ProjectMembers.user_id == current_user.id,
+        ))
+        .where(search_index.visible_projects(current_user))
+        .order_by(models.Project.created_at.desc(), models.Project.id.desc())
+    )
+    return export.stream(request, query, list(PROJECT_COLUMNS), format, "projects")
+
+
+@router.get("/projects/{project_id}/tasks")
+async def export_tasks(
+    project_id: int,
+    request: Request,
+    format: Format = Query("ndjson"),
+    query: TaskQuery = Depends(),
+    access = Depends(utils.require_project_access(["owner", "editor", "viewer"], allow_admin=True)),
+):
+    """The project's live tasks; takes the same filters, sort and fields as the task list."""
+    rows = (
+        select(*query.columns())
+        .where(
+            models.Task.project_id == project_id,
+            models.Task.is_deleted.is_(False),
+            *query.where(),
+        )
+        .order_by(*query.keyset.order())
+    )
+    return export.stream(request, rows, query.fields or TASK_FIELDS, format, f"project-{project_id}-tasks")
+
+
+@router.get("/projects/{project_id}/members")
+async def export_members(
+    project_id: int,
+    request: Request,
+    format: Format = Query("ndjson"),
+    access = Depends(utils.require_project_access(["owner", "editor", "viewer"], allow_admin=True)),
+):
+    query = (
+        select(*MEMBER_COLUMNS.values())
+        .join(models.User, models.User.id == models.ProjectMembers.user_id)
+        .where(models.ProjectMembers.project_id == project_id)
+        .order_by(models.ProjectMembers.id)
+    )
+    return export.stream(request, query, list(MEMBER_COLUMNS), format, f"project-{project_id}-members")
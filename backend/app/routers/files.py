@@ -1,12 +1,16 @@
 from ..core.s3 import s3_client, BUCKET
 import uuid
-from fastapi import APIRouter, HTTPException, File, UploadFile, Depends, status
+from fastapi import APIRouter, HTTPException, File, UploadFile, Depends, Response, status
+from fastapi.concurrency import run_in_threadpool
 from typing import List
 import os
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..database import get_db
 from ..models import models
-from ..core import oauth2
+from ..core import oauth2, changes
+from ..core.metrics import S3_REQUEST_DURATION
+from ..core.pagination import Keyset, OptionalPageParams
 from ..schema import schemas
 
 
@@ -15,6 +19,8 @@ router = APIRouter(
     tags=["Files"]
 )
 
+file_keyset = Keyset(models.File.uploaded_at, models.File.id)
+
 ALLOWED_MIME_TYPES = {
     "image/jpeg",
     "image/jpg",
@@ -44,8 +50,8 @@ MAX_FILE_SIZE = 50 * 1024 * 1024
 async def upload_file(
     file: UploadFile = File(...),
     is_shared: bool = False,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
 
     if file.content_type not in ALLOWED_MIME_TYPES:
@@ -72,15 +78,18 @@ async def upload_file(
     key = f"tenant_{current_user.tenant_id}/user_{current_user.id}/{uuid.uuid4()}-{file.filename}"
 
     try:
-        s3_client.upload_fileobj(
-            file.file,
-            BUCKET,
-            key,
-            ExtraArgs={
-                "ContentType": file.content_type,
-                "ACL": "private"
-            }
-        )
+        # boto3 is blocking; run it off the event loop
+        with S3_REQUEST_DURATION.time("upload_fileobj"):
+            await run_in_threadpool(
+                s3_client.upload_fileobj,
+                file.file,
+                BUCKET,
+                key,
+                ExtraArgs={
+                    "ContentType": file.content_type,
+                    "ACL": "private"
+                }
+            )
 
         file_obj = models.File(
             tenant_id=current_user.tenant_id,
@@ -88,12 +97,13 @@ async def upload_file(
             filename=file.filename,
             s3_key=key,
             size=size,
-            is_shared=is_shared
+            is_shared=is_shared,
+            change_seq=await changes.next_seq(db, current_user.tenant_id),
         )
 
         db.add(file_obj)
-        db.commit()
-        db.refresh(file_obj)
+        await db.commit()
+        await db.refresh(file_obj)
 
         return {
             "id": file_obj.id,
@@ -107,12 +117,12 @@ async def upload_file(
 
 @router.get("/{file_id}/download")
 async def download(file_id: int,
-                   db: Session = Depends(get_db),
-                   current_user: models.User = Depends(oauth2.get_current_user)):
+                   db: AsyncSession = Depends(get_db),
+                   current_user: models.User = Depends(oauth2.get_principal)):
      
-    file = db.query(models.File).filter(
+    file = await db.scalar(select(models.File).where(
           models.File.id==file_id,
-          models.File.tenant_id==current_user.tenant_id).first()
+          models.File.tenant_id==current_user.tenant_id))
 
     
     if not file:
@@ -130,34 +140,37 @@ async def download(file_id: int,
 
 
     
-    url = s3_client.generate_presigned_url(
-        "get_object",
-        Params={
-            "Bucket": BUCKET,
-            "Key": file.s3_key
-        },
-        ExpiresIn=300
-    )
+    with S3_REQUEST_DURATION.time("generate_presigned_url"):
+        url = await run_in_threadpool(
+            s3_client.generate_presigned_url,
+            "get_object",
+            Params={
+                "Bucket": BUCKET,
+                "Key": file.s3_key
+            },
+            ExpiresIn=300
+        )
 
     return {"download_url": url}
 
 
 @router.put("/{file_id}/share")
 async def share_file(file_id: int,
-                     db: Session = Depends(get_db),
-                     current_user: models.User = Depends(oauth2.get_current_user)):
+                     db: AsyncSession = Depends(get_db),
+                     current_user: models.User = Depends(oauth2.get_principal)):
     
-    file = db.query(models.File).filter(
+    file = await db.scalar(select(models.File).where(
         models.File.id == file_id,
         models.File.user_id == current_user.id,
         models.File.tenant_id == current_user.tenant_id
-    ).first()
+    ))
 
     if not file:
         raise HTTPException(404, "File not found")
     
     file.is_shared = True
-    db.commit()
+    file.change_seq = await changes.next_seq(db, current_user.tenant_id)
+    await db.commit()
 
     return {"message": "File shared with organization"}
 
@@ -165,59 +178,64 @@ async def share_file(file_id: int,
 @router.put("/{file_id}/unshare")
 async def unshare_file(
     file_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
 
-    file = db.query(models.File).filter(
+    file = await db.scalar(select(models.File).where(
         models.File.id == file_id,
         models.File.user_id == current_user.id,
         models.File.tenant_id == current_user.tenant_id
-    ).first()
+    ))
 
     if not file:
         raise HTTPException(404, "File not found")
 
     file.is_shared = False
-    db.commit()
+    file.change_seq = await changes.next_seq(db, current_user.tenant_id)
+    await db.commit()
 
     return {"message": "File is now private"}
 
 
 @router.get("/shared")
 async def get_shared_files(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    response: Response,
+    page: OptionalPageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
 
-    files = db.query(models.File).filter(
+    files = await db.scalars(file_keyset.apply(select(models.File).where(
         models.File.tenant_id == current_user.tenant_id,
         models.File.is_shared == True
-    ).all()
+    ), page))
 
-    return files
+    return file_keyset.page(files, page, response)
 
 @router.get("/", response_model=List[schemas.FileOut])
 async def list_files(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    response: Response,
+    page: OptionalPageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
-    files = db.query(models.File).filter(
+    files = await db.scalars(file_keyset.apply(select(models.File).where(
         models.File.tenant_id == current_user.tenant_id
-    ).order_by(models.File.uploaded_at.desc()).all()
-    return files
+    ), page))
+    return file_keyset.page(files, page, response)
 
 
 @router.delete("/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_file(
     file_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
-    file = db.query(models.File).filter(
+    file = await db.scalar(select(models.File).where(
         models.File.id == file_id,
         models.File.tenant_id == current_user.tenant_id
-    ).first()
+    ))
 
     if not file:
         raise HTTPException(404, "File not found")
@@ -226,10 +244,12 @@ async def delete_file(
         raise HTTPException(403, "Not authorized to delete this file")
 
     try:
-        s3_client.delete_object(Bucket=BUCKET, Key=file.s3_key)
+        with S3_REQUEST_DURATION.time("delete_object"):
+            await run_in_threadpool(s3_client.delete_object, Bucket=BUCKET, Key=file.s3_key)
     except Exception as e:
         print(f"Failed to delete from S3: {e}")
 
-    db.delete(file)
-    db.commit()
+    await db.delete(file)
+    db.add(changes.tombstone(current_user.tenant_id, await changes.next_seq(db, current_user.tenant_id), "file", file.id))
+    await db.commit()
     return
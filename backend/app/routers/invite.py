@@ -4,7 +4,8 @@ import uuid
 from ..schema import schemas
 from ..core import oauth2, utils, email
 from ..models import models
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta, timezone
 
 
@@ -19,7 +20,7 @@ VALID_ROLES = ["admin", "editor", "viewer", "member"]
 @router.post('/', response_model=schemas.InviteOut)
 async def invite_user(invite: schemas.CreateInvite, 
                 background_tasks: BackgroundTasks , 
-                db: Session = Depends(get_db), 
+                db: AsyncSession = Depends(get_db), 
                 current_user: models.User = Depends(oauth2.get_current_user)):
 
     # print(f"DEBUG: Current user role: {current_user.role}")
@@ -37,16 +38,16 @@ async def invite_user(invite: schemas.CreateInvite,
             detail=f"Invalid role. Must be one of: {', '.join(VALID_ROLES)}"
         )
     
-    existing_user = db.query(models.User).filter(models.User.email == invite.email, models.User.tenant_id == current_user.tenant_id).first()
+    existing_user = await db.scalar(select(models.User).where(models.User.email == invite.email, models.User.tenant_id == current_user.tenant_id))
 
     if existing_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="User with this email already exists in your organization")
     
-    existing_invite = db.query(models.Invitation).filter(models.Invitation.email == invite.email, 
+    existing_invite = await db.scalar(select(models.Invitation).where(models.Invitation.email == invite.email, 
     models.Invitation.tenant_id == current_user.tenant_id,
     models.Invitation.is_used == False,
-    models.Invitation.expires_at > datetime.now(timezone.utc)).first()
+    models.Invitation.expires_at > datetime.now(timezone.utc)))
 
     if existing_invite:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
@@ -62,8 +63,8 @@ async def invite_user(invite: schemas.CreateInvite,
     )
 
     db.add(new_invite)
-    db.commit()
-    db.refresh(new_invite)
+    await db.commit()
+    await db.refresh(new_invite)
 
     invite_link = f"http://localhost:3000/accept-invite?token={new_invite.token}"
 
@@ -72,7 +73,7 @@ async def invite_user(invite: schemas.CreateInvite,
         to_email=invite.email,
         invite_link=invite_link,
         invited_by=current_user.name,
-        company_name=new_invite.tenant.company_name)
+        company_name=current_user.company_name)
     
     return new_invite
 
@@ -82,13 +83,13 @@ async def invite_user(invite: schemas.CreateInvite,
 async def accept_invite(
     token: uuid.UUID,  
     invite: schemas.AcceptInvite,  
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    invitation = db.query(models.Invitation).filter(
+    invitation = await db.scalar(select(models.Invitation).where(
         models.Invitation.token == token, 
         models.Invitation.is_used == False, 
         models.Invitation.expires_at > datetime.now(timezone.utc)
-    ).first()
+    ))
 
     if not invitation:
         raise HTTPException(
@@ -96,9 +97,9 @@ async def accept_invite(
             detail="Invalid or expired invitation"
         )
     
-    existing_user = db.query(models.User).filter(
+    existing_user = await db.scalar(select(models.User).where(
         models.User.email == invitation.email
-    ).first()
+    ))
     
     if existing_user:
         raise HTTPException(
@@ -114,7 +115,7 @@ async def accept_invite(
     if len(invite.password) < 8:
         raise HTTPException(status_code=400, detail="Password must be at least 8 characters long")
     
-    hashed_password = utils.hash(invite.password) 
+    hashed_password = await utils.hash_password(invite.password)
 
     new_user = models.User( 
         name=invite.name,
@@ -126,34 +127,20 @@ async def accept_invite(
     )
 
     db.add(new_user)
-    db.flush()
+    await db.flush()
 
 
     invitation.is_used = True
     invitation.accepted_at = datetime.now(timezone.utc)
     invitation.accepted_by_user_id = new_user.id
 
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
 
-    access_token = oauth2.create_access_token(
-        data={
-            "sub": str(new_user.id),
-            "tenant_id": new_user.tenant_id,
-            "role": new_user.role
-        }
-    )
-    refresh_token = utils.create_refresh_token()
-
-    db.add(
-        models.RefreshToken(
-            token=refresh_token,
-            user_id=new_user.id,
-            expires_at=datetime.now(timezone.utc) + timedelta(days=7)
-        )
-    )
-    db.commit()
+    access_token = oauth2.create_user_access_token(new_user)
+    refresh_token = utils.issue_refresh_token(db, new_user.id)
+    await db.commit()
 
     return {
         "user": new_user,                 
@@ -1,13 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import select, update, func, and_
 from typing import List, Optional
 from datetime import datetime, timezone
 import json
 
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models import models
 from ..core import oauth2
+from ..core.metrics import registry
 from ..schema import schemas
 
 router = APIRouter(
@@ -40,6 +42,16 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+registry.callback("websocket_connections", "Open messaging websockets on this worker",
+                  lambda: len(manager.active_connections))
+
+# ConversationOut/MessageOut nest participants, messages and their users;
+# load them up front since AsyncSession can't lazy-load during serialization
+CONVERSATION_LOAD_OPTIONS = (
+    selectinload(models.Conversation.participants).selectinload(models.ConversationParticipant.user),
+    selectinload(models.Conversation.messages).selectinload(models.Message.sender),
+)
+
 @router.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: int):
     await manager.connect(websocket, user_id)
@@ -71,28 +83,32 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int):
 @router.post("/conversations", response_model=schemas.ConversationOut)
 async def create_conversation(
     data: schemas.CreateConversation,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_principal),
 ):
     
-    existing = (
-        db.query(models.Conversation)
+    existing_id = await db.scalar(
+        select(models.Conversation.id)
         .join(models.ConversationParticipant)
-        .filter(
+        .where(
             models.Conversation.is_group.is_(False),
             models.ConversationParticipant.user_id.in_([current_user.id, data.user_id])
         )
         .group_by(models.Conversation.id)
         .having(func.count(models.ConversationParticipant.user_id) == 2)
-        .first()
+        .limit(1)
     )
 
-    if existing:
-        return existing
+    if existing_id:
+        return await db.scalar(
+            select(models.Conversation)
+            .options(*CONVERSATION_LOAD_OPTIONS)
+            .where(models.Conversation.id == existing_id)
+        )
 
     conversation = models.Conversation(is_group=False)
     db.add(conversation)
-    db.flush()
+    await db.flush()
 
     participants = [
         models.ConversationParticipant(
@@ -105,64 +121,75 @@ async def create_conversation(
         )
     ]
     db.add_all(participants)
-    db.commit()
-    db.refresh(conversation)
+    await db.commit()
+
+    conversation = await db.scalar(
+        select(models.Conversation)
+        .options(*CONVERSATION_LOAD_OPTIONS)
+        .where(models.Conversation.id == conversation.id)
+        .execution_options(populate_existing=True)
+    )
 
     print(f"✅ Created conversation {conversation.id} between users {current_user.id} and {data.user_id}")
     return conversation
 
 @router.get("/conversations", response_model=List[schemas.ConversationOut])
 async def get_conversations(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
-    conversations = (
-        db.query(models.Conversation)
+    conversations = (await db.scalars(
+        select(models.Conversation)
         .join(models.ConversationParticipant)
-        .filter(models.ConversationParticipant.user_id == current_user.id)
+        .options(*CONVERSATION_LOAD_OPTIONS)
+        .where(models.ConversationParticipant.user_id == current_user.id)
         .order_by(models.Conversation.updated_at.desc())
-        .all()
-    )
+    )).all()
     
     return conversations
 
+# Stays on the primary: reading a conversation also marks its messages read
 @router.get("/conversations/{conversation_id}/messages", response_model=List[schemas.MessageOut])
 async def get_messages(
     conversation_id: int,
     limit: int = 50,
     offset: int = 0,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_principal),
 ):
   
-    participant = db.query(models.ConversationParticipant).filter(
+    participant = await db.scalar(select(models.ConversationParticipant).where(
         and_(
             models.ConversationParticipant.conversation_id == conversation_id,
             models.ConversationParticipant.user_id == current_user.id
         )
-    ).first()
+    ))
 
     if not participant:
         raise HTTPException(status_code=403, detail="Not a participant in this conversation")
     
-    messages = (
-        db.query(models.Message)
-        .filter(models.Message.conversation_id == conversation_id)
+    messages = (await db.scalars(
+        select(models.Message)
+        .options(selectinload(models.Message.sender))
+        .where(models.Message.conversation_id == conversation_id)
         .order_by(models.Message.created_at.desc())
         .offset(offset)
         .limit(limit)
-        .all()
-    )
+    )).all()
 
 
-    db.query(models.Message).filter(
-        and_(
-            models.Message.conversation_id == conversation_id,
-            models.Message.sender_id != current_user.id,
-            models.Message.is_read.is_(False)
+    await db.execute(
+        update(models.Message)
+        .where(
+            and_(
+                models.Message.conversation_id == conversation_id,
+                models.Message.sender_id != current_user.id,
+                models.Message.is_read.is_(False)
+            )
         )
-    ).update({"is_read": True})
-    db.commit()
+        .values(is_read=True)
+    )
+    await db.commit()
 
     return list(reversed(messages))
 
@@ -170,15 +197,15 @@ async def get_messages(
 async def send_message(
     conversation_id: int,
     data: schemas.CreateMessage,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_principal),
 ):
-    participant = db.query(models.ConversationParticipant).filter(
+    participant = await db.scalar(select(models.ConversationParticipant).where(
         and_(
             models.ConversationParticipant.conversation_id == conversation_id,
             models.ConversationParticipant.user_id == current_user.id
         )
-    ).first()
+    ))
 
     if not participant:
         raise HTTPException(status_code=403, detail="Not a participant in this conversation")
@@ -191,19 +218,21 @@ async def send_message(
     )
     db.add(message)
 
-    db.query(models.Conversation).filter(
-        models.Conversation.id == conversation_id
-    ).update({"updated_at": datetime.now(timezone.utc)})
+    await db.execute(
+        update(models.Conversation)
+        .where(models.Conversation.id == conversation_id)
+        .values(updated_at=datetime.now(timezone.utc))
+    )
 
-    db.commit()
-    db.refresh(message)
+    await db.commit()
+    await db.refresh(message, ["created_at", "sender"])
 
-    participants = db.query(models.ConversationParticipant).filter(
+    participants = (await db.scalars(select(models.ConversationParticipant).where(
         and_(
             models.ConversationParticipant.conversation_id == conversation_id,
             models.ConversationParticipant.user_id != current_user.id
         )
-    ).all()
+    ))).all()
 
     message_data = {
         "type": "message",
@@ -225,23 +254,22 @@ async def send_message(
 
 @router.get("/unread_count")
 async def get_unread_count(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
-    count = (
-        db.query(models.Message)
+    count = await db.scalar(
+        select(func.count(models.Message.id))
         .join(
             models.ConversationParticipant,
             models.Message.conversation_id == models.ConversationParticipant.conversation_id
         )
-        .filter(
+        .where(
             and_(
                 models.ConversationParticipant.user_id == current_user.id,
                 models.Message.sender_id != current_user.id,
                 models.Message.is_read.is_(False)
             )
         )
-        .count()
     )
     
     return {"unread_count": count}
\ No newline at end of file
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, status, HTTPException, Query
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from ..schema import schemas
 from ..models import models
-from ..core import oauth2, utils
-from ..database import get_db
-from sqlalchemy.orm import Session
+from ..core import oauth2, utils, task_counters, etags, changes, archive, search as search_index
+from ..core.task_query import TaskQuery
+from ..core.project_access import project_access_cache
+from ..core.pagination import Keyset, OptionalPageParams, PageParams
+from ..database import get_db, get_read_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
 from typing import List, Optional
-from sqlalchemy import or_, func, extract
+from datetime import datetime, timezone
+from sqlalchemy import select, insert, update, func, extract
 
 
 router = APIRouter(
@@ -13,26 +20,33 @@ router = APIRouter(
     tags=["Projects"]
 )
 
+project_keyset = Keyset(models.Project.created_at, models.Project.id)
+
+# Task columns a batch update can't set to null
+TASK_REQUIRED_FIELDS = [column.name for column in models.Task.__table__.columns if not column.nullable]
+
 # ===================== PROJECTS =====================
 
 @router.get("/", response_model=List[schemas.ProjectOut])
 async def see_projects(
-    limit: int = Query(10, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    offset: int = Query(0, ge=0, deprecated=True),
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal),
 ):
     if current_user.role == "admin":
         # Admin sees everything in their tenant
         query = (
-            db.query(models.Project, models.ProjectMembers.role.label("my_role"))
+            select(models.Project, models.ProjectMembers.role.label("my_role"))
             .outerjoin(
                 models.ProjectMembers,
                 (models.ProjectMembers.project_id == models.Project.id) & 
                 (models.ProjectMembers.user_id == current_user.id)
             )
-            .filter(
+            .where(
                 models.Project.tenant_id == current_user.tenant_id,
                 models.Project.is_deleted.is_(False),
             )
@@ -40,9 +54,9 @@ async def see_projects(
     else:
         # Regular user sees only projects they are members of
         query = (
-            db.query(models.Project, models.ProjectMembers.role.label("my_role"))
+            select(models.Project, models.ProjectMembers.role.label("my_role"))
             .join(models.ProjectMembers)
-            .filter(
+            .where(
                 models.ProjectMembers.user_id == current_user.id,
                 models.Project.tenant_id == current_user.tenant_id,
                 models.Project.is_deleted.is_(False),
@@ -50,15 +64,23 @@ async def see_projects(
         )
 
     if search:
-        query = query.filter(
-            or_(
-                models.Project.name.ilike(f"%{search}%"),
-                models.Project.description.ilike(f"%{search}%"),
-            )
-        )
+        query = query.where(search_index.project_match(db.bind.dialect.name, search)[0])
+
+    # Any project write bumps its version; adding or losing a project changes the count and ids
+    count, versions, ids = (await db.execute(query.with_only_columns(
+        func.count(models.Project.id),
+        func.coalesce(func.sum(models.Project.version), 0),
+        func.coalesce(func.sum(models.Project.id), 0),
+    ))).one()
+    not_modified = etags.conditional(request, response, current_user.id, current_user.role, count, versions, ids)
+    if not_modified:
+        return not_modified
+
+    if offset:
+        query = query.offset(offset)
+    rows = (await db.execute(project_keyset.apply(query, page))).all()
+    results = project_keyset.page(rows, page, response, key=lambda row: row[0])
 
-    results = query.offset(offset).limit(limit).all()
-    
     projects = []
     for project, my_role in results:
         # Construct the response object with role info
@@ -69,26 +91,29 @@ async def see_projects(
     return projects
 
 
+@router.get("/search", response_model=List[schemas.SearchResultOut])
+async def search_projects(
+    response: Response,
+    q: str = Query(..., min_length=2, max_length=200),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal),
+):
+    """Ranked projects and tasks matching q, across the projects the caller can see."""
+    return await search_index.search(db, current_user, q, page, response)
+
+
 @router.get("/{project_id}", response_model=schemas.ProjectOut)
 async def see_project(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
-    project_obj = Depends(utils.require_project_access(["owner", "editor", "viewer"], allow_admin=True)),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal),
+    access = Depends(utils.require_project_access(["owner", "editor", "viewer"], allow_admin=True)),
 ):
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    
+    project = await access.load_project(db)
+
     # Identify user role
-    my_role = None
-    if current_user.role == "admin":
-        my_role = "admin"
-    else:
-        member = db.query(models.ProjectMembers).filter(
-            models.ProjectMembers.project_id == project_id,
-            models.ProjectMembers.user_id == current_user.id
-        ).first()
-        if member:
-            my_role = member.role
+    my_role = "admin" if current_user.role == "admin" else access.role
 
     p_out = schemas.ProjectOut.from_orm(project)
     p_out.my_role = my_role
@@ -98,25 +123,28 @@ async def see_project(
 @router.post("/", response_model=schemas.ProjectOut, status_code=status.HTTP_201_CREATED)
 async def create_project(
     project: schemas.ProjectCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_principal),
 ):
+    seq = await changes.next_seq(db, current_user.tenant_id)
     new_project = models.Project(
         **project.model_dump(),
         tenant_id=current_user.tenant_id,
+        change_seq=seq,
     )
 
     # Use relationship to add the owner
     new_project.members.append(
         models.ProjectMembers(
             user_id=current_user.id,
-            role="owner"
+            role="owner",
+            change_seq=seq,
         )
     )
 
     db.add(new_project)
-    db.commit()
-    db.refresh(new_project)
+    await db.commit()
+    await db.refresh(new_project)
     return new_project
 
 
@@ -124,34 +152,64 @@ async def create_project(
 async def update_project(
     project_id: int,
     project: schemas.ProjectUpdate,
-    db: Session = Depends(get_db),
-     project_obj = Depends(utils.require_project_access(["owner", "editor"], allow_admin=True)),
+    db: AsyncSession = Depends(get_db),
+    access = Depends(utils.require_project_access(["owner", "editor"], allow_admin=True)),
 ):
-    project_q = db.query(models.Project).filter(
-        models.Project.id == project_id
-    )
-
-    project_q.update(
-        project.model_dump(exclude_unset=True),
-        synchronize_session=False
+    updates = project.model_dump(exclude_unset=True)
+    if not updates:
+        return await access.load_project(db)
+
+    seq = await changes.next_seq(db, access.tenant_id)
+    result = await db.execute(
+        update(models.Project)
+        .where(
+            models.Project.id == project_id,
+            models.Project.tenant_id == access.tenant_id,
+            models.Project.is_deleted.is_(False),
+        )
+        .values(**updates, version=models.Project.version + 1, change_seq=seq)
     )
-    db.commit()
+    # The access check may have come from cache, after another worker deleted it
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Project not found")
+    await db.commit()
 
-    return project_q.first()
+    return await db.get(models.Project, project_id, populate_existing=True)
 
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_project(
     project_id: int,
-    db: Session = Depends(get_db),
-    project_obj = Depends(utils.require_project_access(["owner"], allow_admin=True)),
+    db: AsyncSession = Depends(get_db),
+    access = Depends(utils.require_project_access(["owner"], allow_admin=True)),
 ):
-    project = db.query(models.Project).filter(
-        models.Project.id == project_id
-    ).first()
+    project = await access.load_project(db)
 
     project.is_deleted = True
-    db.commit()
+    project.deleted_at = func.now()
+    project.version = models.Project.version + 1
+    project.change_seq = await changes.next_seq(db, access.tenant_id)
+    await db.commit()
+    project_access_cache.invalidate_project(project_id)
+
+
+@router.post("/{project_id}/restore", response_model=schemas.ProjectOut)
+async def restore_project(
+    project_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_principal),
+):
+    """Undelete a project, moving it and its tasks back from the archive if they were archived."""
+    if current_user.role != "admin" and not await archive.was_owner(db, current_user.id, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    seq = await changes.next_seq(db, current_user.tenant_id)
+    if not await archive.restore_project(db, current_user.tenant_id, project_id, seq=seq):
+        raise HTTPException(status_code=404, detail="Project not found")
+    await db.commit()
+    project_access_cache.invalidate_project(project_id)
+
+    return await db.get(models.Project, project_id, populate_existing=True)
 
 
 # ===================== TASKS =====================
@@ -160,38 +218,160 @@ async def delete_project(
 async def create_task(
     project_id: int,
     task: schemas.TaskCreate,
-    db: Session = Depends(get_db),
-    project_obj = Depends(utils.require_project_access(["owner", "editor"], allow_admin=True)),
+    db: AsyncSession = Depends(get_db),
+    access = Depends(utils.require_project_access(["owner", "editor"], allow_admin=True)),
 ):
-    
-    project = db.query(models.Project).filter(
-    models.Project.id == project_id).first()
-    
+    seq = await changes.next_seq(db, access.tenant_id)
     new_task = models.Task(
         **task.model_dump(),
         project_id=project_id,
-        tenant_id=project.tenant_id,
+        tenant_id=access.tenant_id,
+        change_seq=seq,
     )
 
     db.add(new_task)
-    db.commit()
-    db.refresh(new_task)
-
-    utils.update_project_progress(db, project_id)
+    await task_counters.task_changed(db, project_id, None, (new_task.status, False), seq=seq)
+    await db.commit()
+    await db.refresh(new_task)
 
     return new_task
 
 
+@router.post("/{project_id}/task/batch", response_model=List[schemas.TaskBatchResult])
+async def batch_tasks(
+    project_id: int,
+    batch: schemas.TaskBatch,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_principal),
+    access = Depends(utils.require_project_access(["owner", "editor"], allow_admin=True)),
+):
+    """
+    Create, update and delete many tasks in one transaction.
+
+    Every operation is checked before anything is written; if any fails the
+    response is a 422 listing each failing operation's index and nothing is
+    applied. Deletes need the same owner role as DELETE .../task/{id}.
+    """
+    operations = batch.operations
+    ids = [op.id for op in operations if op.op != "create"]
+    tasks = {}
+    if ids:
+        tasks = {task.id: task for task in await db.scalars(select(models.Task).where(
+            models.Task.id.in_(ids),
+            models.Task.project_id == project_id,
+            models.Task.is_deleted.is_(False),
+        ).with_for_update())}
+
+    can_delete = current_user.role == "admin" or access.role == "owner"
+    errors, seen = [], set()
+    for index, op in enumerate(operations):
+        if op.op == "create":
+            if not op.task.description:
+                errors.append({"index": index, "error": "Task description is required"})
+            continue
+        nulls = []
+        if op.op == "update":
+            nulls = [field for field, value in op.task.model_dump(exclude_unset=True).items()
+                     if value is None and field in TASK_REQUIRED_FIELDS]
+        if op.id in seen:
+            errors.append({"index": index, "error": "Task appears more than once in the batch"})
+        elif op.id not in tasks:
+            errors.append({"index": index, "error": "Task not found"})
+        elif op.op == "delete" and not can_delete:
+            errors.append({"index": index, "error": "You do not have required role for this action"})
+        elif nulls:
+            errors.append({"index": index, "error": f"Cannot be null: {', '.join(nulls)}"})
+        seen.add(op.id)
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+
+    seq = await changes.next_seq(db, access.tenant_id)
+    total = done = 0
+    results = [None] * len(operations)
+
+    creates = [(index, op) for index, op in enumerate(operations) if op.op == "create"]
+    if creates:
+        created = (await db.scalars(
+            insert(models.Task).returning(models.Task.id, sort_by_parameter_order=True),
+            [{**op.task.model_dump(), "project_id": project_id, "tenant_id": access.tenant_id, "change_seq": seq}
+             for _, op in creates],
+        )).all()
+        for (index, op), task_id in zip(creates, created):
+            results[index] = {"index": index, "op": "create", "id": task_id}
+            new_total, new_done = task_counters.counts(op.task.status, False)
+            total += new_total
+            done += new_done
+
+    # Bulk updates by primary key skip onupdate defaults
+    now = datetime.now(timezone.utc)
+    updated = []
+    for index, op in enumerate(operations):
+        if op.op == "create":
+            continue
+        results[index] = {"index": index, "op": op.op, "id": op.id}
+        task = tasks[op.id]
+        old_total, old_done = task_counters.counts(task.status, False)
+        if op.op == "update":
+            fields = op.task.model_dump(exclude_unset=True)
+            if fields:
+                updated.append({"id": op.id, **fields, "updated_at": now, "change_seq": seq})
+            new_total, new_done = task_counters.counts(fields.get("status", task.status), False)
+        else:
+            new_total, new_done = 0, 0
+        total += new_total - old_total
+        done += new_done - old_done
+
+    if updated:
+        # Bulk UPDATE by primary key; rows sending the same fields share a statement
+        await db.execute(update(models.Task), updated)
+    deleted = [op.id for op in operations if op.op == "delete"]
+    if deleted:
+        await db.execute(
+            update(models.Task).where(models.Task.id.in_(deleted)).values(is_deleted=True, deleted_at=func.now(), change_seq=seq)
+            .execution_options(synchronize_session=False)
+        )
+
+    await task_counters.adjust(db, project_id, total, done, seq=seq)
+    await db.commit()
+
+    returned = [result["id"] for result in results if result["op"] != "delete"]
+    if returned:
+        rows = {task.id: task for task in await db.scalars(
+            select(models.Task).where(models.Task.id.in_(returned))
+        )}
+        for result in results:
+            if result["op"] != "delete":
+                result["task"] = rows[result["id"]]
+    return results
+
+
 @router.get("/{project_id}/task", response_model=List[schemas.TaskOut])
 async def see_tasks(
     project_id: int,
-    db: Session = Depends(get_db),
-    project_obj = Depends(utils.require_project_access(["owner", "editor", "viewer"], allow_admin=True)),
+    request: Request,
+    response: Response,
+    page: OptionalPageParams = Depends(),
+    query: TaskQuery = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    access = Depends(utils.require_project_access(["owner", "editor", "viewer"], allow_admin=True)),
 ):
-    return db.query(models.Task).filter(
+    """
+    Live tasks in the project, filtered and sorted server-side (see
+    core.task_query). With ?fields=, each task has only those fields.
+    """
+    not_modified = etags.conditional(request, response, await access.load_version(db))
+    if not_modified:
+        return not_modified
+
+    result = await db.execute(query.keyset.apply(select(*query.columns()).where(
         models.Task.project_id == project_id,
         models.Task.is_deleted.is_(False),
-    ).all()
+        *query.where(),
+    ), page))
+    rows = query.keyset.page(result, page, response)
+    if query.fields is None:
+        return rows
+    return JSONResponse(jsonable_encoder([query.project(row) for row in rows]), headers=response.headers)
 
 
 @router.put("/{project_id}/task/{task_id}", response_model=schemas.TaskOut)
@@ -200,16 +380,16 @@ async def update_task(
     task_id: int,
     task: schemas.TaskCreate,
     # current_user: models.User = Depends(oauth2.get_current_user),
-    db: Session = Depends(get_db),
-    project_obj = Depends(utils.require_project_access(["owner", "editor"], allow_admin=True)),):
+    db: AsyncSession = Depends(get_db),
+    access = Depends(utils.require_project_access(["owner", "editor"], allow_admin=True)),):
 
-    task_q = db.query(models.Task).filter(
+    task_obj = await db.scalar(select(models.Task).where(
         models.Task.id == task_id,
         models.Task.project_id == project_id,
         models.Task.is_deleted.is_(False),
-    )
+    ).with_for_update())
 
-    if not task_q.first():
+    if not task_obj:
         # logger.create_log(
         #     db,
         #     request,
@@ -220,37 +400,64 @@ async def update_task(
         #     tenant_id=current_user.tenant_id)
         raise HTTPException(status_code=404, detail="Task not found")
 
-    task_q.update(
-        task.model_dump(exclude_unset=True),
-        synchronize_session=False
-    )
-    db.commit()
-
-    utils.update_project_progress(db, project_id)
+    seq = await changes.next_seq(db, access.tenant_id)
+    before = (task_obj.status, task_obj.is_deleted)
+    for field, value in task.model_dump(exclude_unset=True).items():
+        setattr(task_obj, field, value)
+    task_obj.change_seq = seq
+    await task_counters.task_changed(db, project_id, before, (task_obj.status, task_obj.is_deleted), seq=seq)
+    await db.commit()
 
-    return task_q.first()
+    await db.refresh(task_obj)
+    return task_obj
 
 
 @router.delete("/{project_id}/task/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_task(
     project_id: int,
     task_id: int,
-    db: Session = Depends(get_db),
-    project_obj = Depends(utils.require_project_access(["owner"], allow_admin=True))):
+    db: AsyncSession = Depends(get_db),
+    access = Depends(utils.require_project_access(["owner"], allow_admin=True))):
 
-    task = db.query(models.Task).filter(
+    task = await db.scalar(select(models.Task).where(
         models.Task.id == task_id,
         models.Task.project_id == project_id,
         models.Task.is_deleted.is_(False),
-    ).first()
+    ).with_for_update())
 
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
+    seq = await changes.next_seq(db, access.tenant_id)
     task.is_deleted = True
-    db.commit()
+    task.deleted_at = func.now()
+    task.change_seq = seq
+    await task_counters.task_changed(db, project_id, (task.status, False), None, seq=seq)
+    await db.commit()
+
+
+@router.post("/{project_id}/task/{task_id}/restore", response_model=schemas.TaskOut)
+async def restore_task(
+    project_id: int,
+    task_id: int,
+    db: AsyncSession = Depends(get_db),
+    access = Depends(utils.require_project_access(["owner"], allow_admin=True)),
+):
+    """Undelete a task, moving it back from the archive if it was archived."""
+    task, moved = await archive.restore_task(db, project_id, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
 
-    utils.update_project_progress(db, project_id)
+    # Deleted and archived tasks alike aren't in the project's counters
+    if task.is_deleted or moved:
+        seq = await changes.next_seq(db, access.tenant_id)
+        task.is_deleted = False
+        task.deleted_at = None
+        task.change_seq = seq
+        await task_counters.task_changed(db, project_id, None, (task.status, False), seq=seq)
+        await db.commit()
+        await db.refresh(task)
+    return task
 
 
 # ===================== MEMBERS =====================
@@ -259,22 +466,22 @@ async def delete_task(
 async def add_member(
     project_id: int,
     data: schemas.ProjectMemberCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_principal),
     project_obj = Depends(utils.require_project_access(["owner"], allow_admin=True)),):
 
-    user = db.query(models.User).filter(
+    user = await db.scalar(select(models.User).where(
         models.User.id == data.user_id,
         models.User.tenant_id == current_user.tenant_id,
-    ).first()
+    ))
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found in tenant")
 
-    existing = db.query(models.ProjectMembers).filter(
+    existing = await db.scalar(select(models.ProjectMembers).where(
         models.ProjectMembers.project_id == project_id,
         models.ProjectMembers.user_id == data.user_id,
-    ).first()
+    ))
 
     if existing:
         raise HTTPException(
@@ -282,14 +489,18 @@ async def add_member(
             detail="User is already a member of this project",
         )
 
+    seq = await changes.next_seq(db, current_user.tenant_id)
     db.add(
         models.ProjectMembers(
             project_id=project_id,
             user_id=data.user_id,
             role=data.role,
+            change_seq=seq,
         )
     )
-    db.commit()
+    await task_counters.touch(db, project_id, seq=seq)
+    await db.commit()
+    project_access_cache.invalidate(data.user_id, project_id)
 
     return {"message": "Member added"}
 
@@ -297,15 +508,21 @@ async def add_member(
 @router.get("/{project_id}/members", response_model=List[schemas.ProjectMemberWithUserOut])
 async def members_of_project(
     project_id: int,
-    db: Session = Depends(get_db),
-    project_obj = Depends(utils.require_project_access(["owner", "editor", "viewer"], allow_admin=True)),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    access = Depends(utils.require_project_access(["owner", "editor", "viewer"], allow_admin=True)),
 ):
-    members = (
-        db.query(models.ProjectMembers)
+    not_modified = etags.conditional(request, response, await access.load_version(db))
+    if not_modified:
+        return not_modified
+
+    members = (await db.scalars(
+        select(models.ProjectMembers)
         .join(models.User, models.ProjectMembers.user_id == models.User.id)
-        .filter(models.ProjectMembers.project_id == project_id)
-        .all()
-    )
+        .options(contains_eager(models.ProjectMembers.user))
+        .where(models.ProjectMembers.project_id == project_id)
+    )).all()
     
     return [schemas.ProjectMemberWithUserOut.from_orm(member) for member in members]
 
@@ -314,71 +531,79 @@ async def members_of_project(
 async def remove_project_member(
     project_id: int,
     member_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_principal),
     project_obj = Depends(utils.require_project_access(["owner"], allow_admin=True)),
 ):
     """Remove a member from a project"""
-    member = db.query(models.ProjectMembers).filter(
+    member = await db.scalar(select(models.ProjectMembers).where(
         models.ProjectMembers.id == member_id,
         models.ProjectMembers.project_id == project_id
-    ).first()
+    ))
     
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
     
     if member.role == "owner":
-        owner_count = db.query(models.ProjectMembers).filter(
+        owner_count = await db.scalar(select(func.count(models.ProjectMembers.id)).where(
             models.ProjectMembers.project_id == project_id,
             models.ProjectMembers.role == "owner"
-        ).count()
+        ))
         if owner_count <= 1:
             raise HTTPException(
                 status_code=400,
                 detail="Cannot remove the last owner from the project"
             )
     
-    db.delete(member)
-    db.commit()
+    seq = await changes.next_seq(db, current_user.tenant_id)
+    await db.delete(member)
+    db.add(changes.tombstone(current_user.tenant_id, seq, "member", member.id, project_id))
+    await task_counters.touch(db, project_id, seq=seq)
+    await db.commit()
+    project_access_cache.invalidate(member.user_id, project_id)
 
 
 @router.get("/stats", response_model=schemas.ProjectStatsOut)
 async def get_project_stats(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
     # Base queries for projects and tasks
-    project_query = db.query(models.Project).filter(
+    project_query = select(models.Project).where(
         models.Project.tenant_id == current_user.tenant_id,
         models.Project.is_deleted == False
     )
     
-    task_query = db.query(models.Task).filter(
+    task_query = select(models.Task).where(
         models.Task.tenant_id == current_user.tenant_id,
         models.Task.is_deleted == False
     )
 
     # Filter by membership if not admin
     if current_user.role != "admin":
-        project_query = project_query.join(models.ProjectMembers).filter(
+        project_query = project_query.join(models.ProjectMembers).where(
             models.ProjectMembers.user_id == current_user.id
         )
         task_query = task_query.join(
             models.ProjectMembers, 
             models.Task.project_id == models.ProjectMembers.project_id
-        ).filter(
+        ).where(
             models.ProjectMembers.user_id == current_user.id
         )
 
-    total_projects = project_query.count()
-    active_tasks = task_query.filter(models.Task.status != "done").count()
+    total_projects = await db.scalar(
+        select(func.count()).select_from(project_query.subquery())
+    )
+    active_tasks = await db.scalar(
+        select(func.count()).select_from(task_query.where(models.Task.status != "done").subquery())
+    )
 
-    avg_progress = project_query.with_entities(func.avg(models.Project.progress)).scalar() or 0.0
+    avg_progress = await db.scalar(project_query.with_only_columns(func.avg(models.Project.progress))) or 0.0
 
-    status_dist = task_query.with_entities(
+    status_dist = (await db.execute(task_query.with_only_columns(
         models.Task.status,
         func.count(models.Task.id)
-    ).group_by(models.Task.status).all()
+    ).group_by(models.Task.status))).all()
     
     status_distribution = [
         schemas.StatusDistribution(
@@ -388,10 +613,10 @@ async def get_project_stats(
         ) for s, c in status_dist
     ]
 
-    priority_dist = task_query.with_entities(
+    priority_dist = (await db.execute(task_query.with_only_columns(
         models.Task.priority,
         func.count(models.Task.id)
-    ).group_by(models.Task.priority).all()
+    ).group_by(models.Task.priority))).all()
     
     # Calculate tasks total for priority distribution
     total_tasks = sum(c for s, c in status_dist)
@@ -403,16 +628,16 @@ async def get_project_stats(
         ) for p, c in priority_dist
     ]
 
-    trends = project_query.with_entities(
+    trends = (await db.execute(project_query.with_only_columns(
         extract('month', models.Project.created_at).label('month_num'),
         extract('year', models.Project.created_at).label('year_num'),
         func.count(models.Project.id)
-    ).group_by('year_num', 'month_num').order_by('year_num', 'month_num').limit(6).all()
+    ).group_by('year_num', 'month_num').order_by('year_num', 'month_num').limit(6))).all()
     
     monthly_trends = [schemas.MonthlyTrend(month=f"{int(y)}-{int(m):02d}", count=c) for m, y, c in trends]
 
     # Top Projects
-    top_projects = project_query.order_by(models.Project.progress.desc()).limit(5).all()
+    top_projects = (await db.scalars(project_query.order_by(models.Project.progress.desc()).limit(5))).all()
 
     return {
         "total_projects": total_projects,
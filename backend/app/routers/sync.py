@@ -0,0 +1,132 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, or_, tuple_
+from typing import Optional
+import base64
+import json
+from ..database import get_read_db
+from ..models import models
+from ..schema import schemas
+from ..core import oauth2
+
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["Sync"]
+)
+
+# Each stream pages on its own (change_seq, id) position
+STREAMS = {
+    "projects": models.Project,
+    "tasks": models.Task,
+    "members": models.ProjectMembers,
+    "files": models.File,
+    "deleted": models.SyncTombstone,
+}
+
+START = [0, 0]
+
+
+async def visibility(db: AsyncSession, current_user) -> str:
+    """Changes whenever the set of projects the caller can see might have changed."""
+    if current_user.role == "admin":
+        return f"{current_user.id}:admin"
+    count, ids = (await db.execute(
+        select(func.count(models.ProjectMembers.id), func.coalesce(func.sum(models.ProjectMembers.project_id), 0))
+        .where(models.ProjectMembers.user_id == current_user.id)
+    )).one()
+    return f"{current_user.id}:{current_user.role}:{count}:{ids}"
+
+
+def encode_cursor(scope: str, positions: dict) -> str:
+    raw = json.dumps({"s": scope, "p": positions}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        positions = {name: [int(seq), int(row_id)] for name, (seq, row_id) in data["p"].items()}
+        if set(positions) != set(STREAMS):
+            raise ValueError
+        return data["s"], positions
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("", response_model=schemas.SyncOut)
+async def sync(
+    since: Optional[str] = Query(None, description="cursor from the previous sync; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=2000, description="most rows per stream in this page"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(oauth2.get_principal),
+):
+    """
+    Projects, tasks, memberships and files changed since the cursor, plus
+    tombstones for deleted memberships and files. Soft-deleted projects and
+    tasks come back with is_deleted set, and get tombstones once archived. When the caller's role or project
+    memberships changed since the cursor was issued, the response starts over
+    from scratch with reset set.
+    """
+    scope = await visibility(db, current_user)
+    reset = since is None
+    positions = {name: START for name in STREAMS}
+    if since is not None:
+        cursor_scope, positions = decode_cursor(since)
+        if cursor_scope != scope:
+            reset = True
+            positions = {name: START for name in STREAMS}
+
+    tenant_id = current_user.tenant_id
+    member_projects = None
+    if current_user.role != "admin":
+        member_projects = select(models.ProjectMembers.project_id).where(
+            models.ProjectMembers.user_id == current_user.id
+        )
+
+    queries = {
+        "projects": select(models.Project).where(models.Project.tenant_id == tenant_id),
+        "tasks": select(models.Task).where(models.Task.tenant_id == tenant_id),
+        "members": select(models.ProjectMembers)
+            .join(models.Project, models.Project.id == models.ProjectMembers.project_id)
+            .where(models.Project.tenant_id == tenant_id),
+        "files": select(models.File).where(models.File.tenant_id == tenant_id),
+        "deleted": select(models.SyncTombstone).where(models.SyncTombstone.tenant_id == tenant_id),
+    }
+    if member_projects is not None:
+        queries["projects"] = queries["projects"].where(models.Project.id.in_(member_projects))
+        queries["tasks"] = queries["tasks"].where(models.Task.project_id.in_(member_projects))
+        queries["members"] = queries["members"].where(models.ProjectMembers.project_id.in_(member_projects))
+        queries["deleted"] = queries["deleted"].where(or_(
+            models.SyncTombstone.kind == "file",
+            models.SyncTombstone.project_id.in_(member_projects),
+        ))
+
+    page, has_more = {}, False
+    for name, model in STREAMS.items():
+        rows = (await db.scalars(
+            queries[name]
+            .where(tuple_(model.change_seq, model.id) > tuple_(*positions[name]))
+            .order_by(model.change_seq, model.id)
+            .limit(limit + 1)
+        )).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            has_more = True
+        if rows:
+            positions[name] = [rows[-1].change_seq, rows[-1].id]
+        page[name] = rows
+
+    return schemas.SyncOut(
+        cursor=encode_cursor(scope, positions),
+        reset=reset,
+        has_more=has_more,
+        projects=page["projects"],
+        tasks=page["tasks"],
+        members=page["members"],
+        files=page["files"],
+        deleted=[
+            schemas.TombstoneOut(kind=row.kind, id=row.object_id, project_id=row.project_id)
+            for row in page["deleted"]
+        ],
+    )
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from ..schema import schemas
 from ..database import get_db
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..models import models
-from ..core import utils, oauth2
+from ..core import utils, oauth2, task_counters, changes
+from ..core.user_cache import user_cache
+from ..core.pagination import Keyset, OptionalPageParams
 
 
 router = APIRouter(
@@ -11,11 +14,15 @@ router = APIRouter(
     tags=["User"]
 )
 
+user_keyset = Keyset(models.User.created_at, models.User.id)
+
 # Add to your user router
 @router.get("/", response_model=list[schemas.UserOut])
 async def get_tenant_users(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    response: Response,
+    page: OptionalPageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_principal),
 ):
     """Get all users in the current tenant (Admin only)"""
     if current_user.role not in ["admin", "owner"]:
@@ -24,11 +31,11 @@ async def get_tenant_users(
             detail="You do not have permission to view organization users"
         )
 
-    users = db.query(models.User).filter(
+    users = await db.scalars(user_keyset.apply(select(models.User).where(
         models.User.tenant_id == current_user.tenant_id,
         models.User.is_active == True
-    ).all()
-    return users
+    ), page))
+    return user_keyset.page(users, page, response)
 # @router.post('/', status_code=status.HTTP_201_CREATED, response_model=schemas.UserOut)
 # def new_user(user: schemas.UserSignup, db:Session = Depends(get_db), current_user: models.User= Depends(oauth2.get_current_user)):
 
@@ -51,7 +58,7 @@ async def get_tenant_users(
 
 
 @router.delete("/delete/{user_id}")
-def delete_user(user_id: int , db: Session = Depends(get_db), current_user: models.User = Depends(oauth2.get_current_user)):
+async def delete_user(user_id: int , db: AsyncSession = Depends(get_db), current_user: models.User = Depends(oauth2.get_principal)):
 
     if current_user.role not in ["admin", "owner"]:
         raise HTTPException(
@@ -65,9 +72,9 @@ def delete_user(user_id: int , db: Session = Depends(get_db), current_user: mode
             detail="You cannot delete yourself"
         )
 
-    user = db.query(models.User).filter(
+    user = await db.scalar(select(models.User).where(
         models.User.id == user_id, 
-        models.User.tenant_id == current_user.tenant_id).first()
+        models.User.tenant_id == current_user.tenant_id))
     
     if not user:
         raise HTTPException(
@@ -81,8 +88,14 @@ def delete_user(user_id: int , db: Session = Depends(get_db), current_user: mode
         )
     
 
-    db.delete(user)
-    db.commit()
+    seq = await changes.next_seq(db, current_user.tenant_id)
+    await task_counters.touch_member_projects(db, user_id, seq=seq)
+    await changes.tombstone_memberships(db, current_user.tenant_id, seq, user_id)
+    await db.delete(user)
+    await db.commit()
+    await user_cache.invalidate(db, user_id, current_user.tenant_id)
+    if oauth2.STATELESS_AUTH:
+        await oauth2.revocations.revoke_user(db, user_id)
     
     return {
         "message": "User deleted successfully",
@@ -90,19 +103,19 @@ def delete_user(user_id: int , db: Session = Depends(get_db), current_user: mode
     }
 
 @router.patch("/{user_id}/role", response_model=schemas.UserOut)
-def update_user_role(
+async def update_user_role(
     user_id: int, 
     role_update: schemas.UserInvite, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_db), 
+    current_user: models.User = Depends(oauth2.get_principal)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can update roles")
 
-    user = db.query(models.User).filter(
+    user = await db.scalar(select(models.User).where(
         models.User.id == user_id, 
         models.User.tenant_id == current_user.tenant_id
-    ).first()
+    ))
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -111,7 +124,11 @@ def update_user_role(
          raise HTTPException(status_code=400, detail="Cannot change your own role")
 
     user.role = role_update.role
-    db.commit()
-    db.refresh(user)
+    await task_counters.touch_member_projects(db, user.id, seq=await changes.next_seq(db, user.tenant_id))
+    await db.commit()
+    await user_cache.invalidate(db, user.id, user.tenant_id)
+    if oauth2.STATELESS_AUTH:
+        await oauth2.revocations.revoke_user(db, user.id)
+    await db.refresh(user)
     return user
     
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, field_validator, Field
 from datetime import datetime
-from typing import Optional, Literal, List
+from typing import Optional, Literal, List, Union, Annotated
 import uuid
 import re
 import html
@@ -92,6 +92,12 @@ class Token(SecureBaseModel):
 class TokenData(SecureBaseModel):
     user_id: int
     tenant_id: int
+    # Absent on tokens issued before these claims were added
+    role: Optional[str] = None
+    is_active: Optional[bool] = None
+    jti: Optional[str] = None
+    iat: Optional[float] = None
+    exp: Optional[int] = None
 
 
 class RefreshTokenRequest(SecureBaseModel):
@@ -142,10 +148,20 @@ class ProjectOut(SecureBaseModel):
     name: str
     description: str
     progress: int
+    total_tasks: int = 0
+    done_tasks: int = 0
     created_at: datetime
     my_role: Optional[str] = None
 
 
+class SearchResultOut(SecureBaseModel):
+    kind: str  # "project" or "task"
+    id: int
+    project_id: int
+    title: str
+    rank: float
+
+
 class ProjectMemberOut(BaseModel):
     user_id: int
     role: str
@@ -194,6 +210,8 @@ class TaskCreate(SecureBaseModel):
     @field_validator("title")
     @classmethod
     def validate_title(cls, v):
+        if v is None:
+            return v
         if not (3 <= len(v) <= 100):
             raise ValueError("Invalid task title")
         return cls.sanitize_text(v)
@@ -219,6 +237,43 @@ class TaskOut(SecureBaseModel):
     updated_at: Optional[datetime] = None
 
 
+class TaskUpdate(TaskCreate):
+    """
+    Fields to change on a task; anything not sent is left as is. Nulls get
+    through here and are rejected per operation by the batch endpoint.
+    """
+    title: Optional[str] = None
+
+
+class TaskCreateOp(SecureBaseModel):
+    op: Literal["create"]
+    task: TaskCreate
+
+
+class TaskUpdateOp(SecureBaseModel):
+    op: Literal["update"]
+    id: int
+    task: TaskUpdate
+
+
+class TaskDeleteOp(SecureBaseModel):
+    op: Literal["delete"]
+    id: int
+
+
+class TaskBatch(SecureBaseModel):
+    operations: List[Annotated[Union[TaskCreateOp, TaskUpdateOp, TaskDeleteOp], Field(discriminator="op")]] = Field(
+        min_length=1, max_length=500
+    )
+
+
+class TaskBatchResult(BaseModel):
+    index: int
+    op: str
+    id: int
+    task: Optional[TaskOut] = None
+
+
 class CreateInvite(SecureBaseModel):
     email: EmailStr
     role: Literal["member", "admin"] = "member"
@@ -334,6 +389,57 @@ class FileOut(BaseModel):
     class Config:
         from_attributes = True
 
+class ProjectSyncOut(BaseModel):
+    id: int
+    name: str
+    description: str
+    status: Optional[str] = None
+    progress: int
+    total_tasks: int
+    done_tasks: int
+    deadline: Optional[datetime] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    is_deleted: bool
+
+    class Config:
+        from_attributes = True
+
+
+class TaskSyncOut(TaskOut):
+    is_deleted: bool
+
+
+class MemberSyncOut(BaseModel):
+    id: int
+    project_id: int
+    user_id: int
+    role: str
+    joined_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class TombstoneOut(BaseModel):
+    kind: str  # "member", "file", or "task"/"project" once archived
+    id: int
+    project_id: Optional[int] = None
+
+
+class SyncOut(BaseModel):
+    cursor: str
+    # Drop everything held locally before applying this page (first sync, or visibility changed)
+    reset: bool
+    # More changes are waiting; call again with cursor right away
+    has_more: bool
+    projects: List[ProjectSyncOut]
+    tasks: List[TaskSyncOut]
+    members: List[MemberSyncOut]
+    files: List[FileOut]
+    deleted: List[TombstoneOut]
+
+
 class MonthlyTrend(BaseModel):
     month: str
     count: int
@@ -431,4 +537,51 @@ class PriorityDistribution(BaseModel):
     percentage: float
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class PoolStatsOut(BaseModel):
+    pool_size: int
+    max_overflow: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_avg: float
+    wait_seconds_max: float
+    # Opening new connections; not counted in the wait figures above
+    connects: int
+    connect_seconds_total: float
+    connect_seconds_max: float
+
+
+class LogWriterStatsOut(BaseModel):
+    queued: int
+    max_queue: int
+    submitted: int
+    written: int
+    dropped: int
+    failed: int
+    batches: int
+
+
+class UserCacheStatsOut(BaseModel):
+    size: int
+    max_users: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    hit_ratio: float
+    invalidations: int
+
+
+class TrafficRollupOut(BaseModel):
+    hour: datetime
+    route: str
+    requests: int
+    errors: int
+    p95_ms: Optional[float]
+
+    class Config:
+        from_attributes = True
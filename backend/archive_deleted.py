@@ -0,0 +1,21 @@
+"""
+Run one archival pass: move projects and tasks soft-deleted more than
+ARCHIVE_RETENTION_DAYS ago into the archive tables. For cron, with
+ARCHIVE_INTERVAL_SECONDS=0.
+
+    python archive_deleted.py
+"""
+import asyncio
+from app.core import archive
+from app.database import async_engine
+
+
+async def main():
+    try:
+        print(await archive.run_once())
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""
+Access-token verify throughput for each JWT backend.
+
+Times verify_access_token's decode step on one token per configuration:
+python-jose and PyJWT with HS256, PyJWT with EdDSA (Ed25519), and the
+verified-claims cache in front of each. EdDSA keys are generated on the fly.
+
+    python bench_jwt.py [verifies]
+"""
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.getcwd())
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from app.core.jwt_backend import TokenCache, make_backend
+
+
+def claims() -> dict:
+    now = datetime.now(timezone.utc)
+    return {"sub": "42", "tenant_id": 7, "role": "member", "is_active": True,
+            "iat": now, "exp": now + timedelta(minutes=30), "jti": "0" * 32}
+
+
+def ed25519_key_files(directory: str):
+    key = Ed25519PrivateKey.generate()
+    private = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption())
+    public = key.public_key().public_bytes(serialization.Encoding.PEM,
+                                           serialization.PublicFormat.SubjectPublicKeyInfo)
+    for name, data in (("JWT_PRIVATE_KEY_FILE", private), ("JWT_PUBLIC_KEY_FILE", public)):
+        path = os.path.join(directory, name.lower())
+        with open(path, "wb") as f:
+            f.write(data)
+        os.environ[name] = path
+
+
+def measure(verify, token: str, n: int) -> float:
+    for _ in range(100):
+        verify(token)
+    start = time.perf_counter()
+    for _ in range(n):
+        verify(token)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main(n: int):
+    with tempfile.TemporaryDirectory() as directory:
+        ed25519_key_files(directory)
+        backends = {
+            "jose HS256": make_backend("jose", "HS256", "bench-secret"),
+            "pyjwt HS256": make_backend("pyjwt", "HS256", "bench-secret"),
+            "pyjwt EdDSA": make_backend("pyjwt", "EdDSA"),
+        }
+
+    results = {}
+    for name, backend in backends.items():
+        token = backend.encode(claims())
+        results[name] = measure(backend.decode, token, n)
+        cache = TokenCache()
+        results[f"{name} + cache"] = measure(lambda t: cache.verify(t, backend.decode), token, n)
+
+    base = results["jose HS256"]
+    print(f"{n} verifies of one access token")
+    for name, us in results.items():
+        print(f"  {name:<22} {us:8.2f} us/verify  {1e6 / us:10.0f} verifies/s  {base / us:6.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,111 @@
+"""
+Per-request overhead of the middleware stack on a trivial endpoint.
+
+Compares the same three middlewares (logging, rate limit, upload size)
+written as BaseHTTPMiddleware subclasses ("before") against the pure ASGI
+versions in app.core ("after"). Nothing touches the database: log records
+are only queued.
+
+    python bench_middleware.py [requests]
+"""
+import os
+import sys
+import time
+import asyncio
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+sys.path.append(os.getcwd())
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.core import logging, config, rate_limit
+from app.core.log_writer import log_writer
+
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+        finally:
+            user = getattr(request.state, "user", None)
+            log_writer.submit(
+                tenant_id=user.tenant_id if user else None,
+                user_id=user.id if user else None,
+                action=f"{request.method} {request.url.path}",
+                category="SYSTEM",
+                message=f"Status {status_code} | {round(time.time() - start_time, 3)}s",
+                ip_address=request.client.host if request.client else None,
+                user_agent=request.headers.get("user-agent")
+            )
+        return response
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        key, tenant_id = logging.request_identity(request.scope)
+        if await rate_limit.limiter.check(key, tenant_id, request.url.path) is not None:
+            return JSONResponse({"detail": "Too many requests"}, status_code=429)
+        return await call_next(request)
+
+
+class LegacyLimitUploadSizeMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        cl = request.headers.get("content-length")
+        if request.method == "POST" and cl and int(cl) > config.MAX_SIZE:
+            return Response("File too large (max 10MB)", status_code=413)
+        return await call_next(request)
+
+
+def build_app(middlewares):
+    app = FastAPI()
+
+    @app.get('/')
+    def home():
+        return "Hello Here resides my Saas"
+
+    for middleware in middlewares:
+        app.add_middleware(middleware)
+    return app
+
+
+async def measure(app, n: int) -> float:
+    transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 1234))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(50):
+            await client.get("/")
+        start = time.perf_counter()
+        for _ in range(n):
+            response = await client.get("/")
+            assert response.status_code == 200, response.status_code
+        return (time.perf_counter() - start) / n * 1e6
+
+
+async def main(n: int):
+    # Keep the limiter out of the way; we're timing the layers, not the limit
+    rate_limit.limiter.default = rate_limit.Limit(n * 10, 60)
+
+    stacks = {
+        "no middleware": [],
+        "BaseHTTPMiddleware x3": [LegacyLoggingMiddleware, LegacyRateLimitMiddleware, LegacyLimitUploadSizeMiddleware],
+        "pure ASGI x3": [logging.LoggingMiddleware, logging.RateLimitMiddleware, config.LimitUploadSizeMiddleware],
+    }
+
+    results = {}
+    for name, middlewares in stacks.items():
+        rate_limit.limiter.backend = rate_limit.MemoryBackend()
+        results[name] = await measure(build_app(middlewares), n)
+
+    base = results["no middleware"]
+    print(f"{n} sequential GET / requests")
+    for name, us in results.items():
+        per_layer = (us - base) / 3 if name != "no middleware" else 0.0
+        print(f"  {name:<24} {us:8.1f} us/request   {per_layer:7.1f} us/layer")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,125 @@
+"""
+Search latency on one large tenant.
+
+Seeds a tenant with 100 projects and the given number of tasks (once; a
+rerun with the same count reuses them), then times a first page of
+GET /projects/search for a few kinds of term: one that matches about 1% of
+tasks, one that matches a handful, a typo of the common one and a
+substring. Times are per query through app.core.search, without HTTP.
+
+    DATABASE_URL=postgresql://... python migrate.py
+    DATABASE_URL=postgresql://... python bench_search.py [tasks] [runs]
+
+Use Postgres: SQLite has no search index and scans every row. Ranking
+scores every match, so a term's cost follows how many tasks it matches,
+not the page size.
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+sys.path.append(os.getcwd())
+
+from fastapi import Response
+from sqlalchemy import func, insert, select
+from app.database import AsyncSessionLocal, async_engine, engine
+from app.migrations import runner
+from app.models import models
+from app.core import search
+from app.core.oauth2 import Principal
+from app.core.pagination import PageParams
+
+
+COMPANY = "bench-search"
+WORDS = ["design", "review", "deploy", "budget", "invoice", "backlog", "meeting", "migrate",
+         "onboard", "audit", "sprint", "release", "roadmap", "support", "hiring", "metrics"]
+TERMS = {
+    "common (~1%)": "quarterly",
+    "rare": "zephyr",
+    "typo": "quartrly",
+    "substring": "arterl",
+}
+
+
+def title(rng: random.Random, i: int) -> str:
+    words = rng.sample(WORDS, 2)
+    if i % 100 == 0:
+        words.append("quarterly")
+    if i % 200_003 == 0:
+        words.append("zephyr")
+    return f"{' '.join(words).capitalize()} {i}"
+
+
+def seed(tasks: int) -> tuple:
+    """(tenant_id, admin user id), seeding when the tenant doesn't have exactly tasks tasks."""
+    with engine.begin() as conn:
+        tenant_id = conn.execute(select(models.Tenant.id).where(models.Tenant.company_name == COMPANY)).scalar()
+        if tenant_id is not None:
+            count = conn.execute(select(func.count()).where(models.Task.tenant_id == tenant_id)).scalar()
+            user_id = conn.execute(select(models.User.id).where(models.User.tenant_id == tenant_id)).scalar()
+            if count == tasks:
+                return tenant_id, user_id
+            # Explicitly, since SQLite doesn't cascade
+            for model in (models.Task, models.Project, models.User, models.Tenant):
+                key = model.id if model is models.Tenant else model.tenant_id
+                conn.execute(model.__table__.delete().where(key == tenant_id))
+
+        tenant_id = conn.execute(insert(models.Tenant).values(company_name=COMPANY).returning(models.Tenant.id)).scalar()
+        user_id = conn.execute(insert(models.User).values(
+            name="Bench", email=f"bench@{COMPANY}.test", password="x", role="admin", is_active=True, tenant_id=tenant_id,
+        ).returning(models.User.id)).scalar()
+        project_ids = conn.execute(insert(models.Project).returning(models.Project.id), [
+            {"name": f"Project {i}", "description": "Seeded for bench_search.py", "tenant_id": tenant_id}
+            for i in range(100)
+        ]).scalars().all()
+
+    rng = random.Random(0)
+    batch = 10_000
+    for start in range(0, tasks, batch):
+        with engine.begin() as conn:
+            conn.execute(insert(models.Task), [
+                {"title": title(rng, i), "description": f"{' '.join(rng.sample(WORDS, 4))}.",
+                 "project_id": project_ids[i % len(project_ids)], "tenant_id": tenant_id}
+                for i in range(start, min(start + batch, tasks))
+            ])
+        print(f"  seeded {min(start + batch, tasks)}/{tasks} tasks", end="\r")
+    print()
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE tasks")
+    return tenant_id, user_id
+
+
+async def measure(user, term: str, runs: int) -> tuple:
+    timings = []
+    async with AsyncSessionLocal() as db:
+        for i in range(runs + 2):
+            start = time.perf_counter()
+            rows = await search.search(db, user, term, PageParams(limit=20, cursor=None), Response())
+            if i >= 2:
+                timings.append((time.perf_counter() - start) * 1000)
+    return timings, len(rows)
+
+
+async def main(tasks: int, runs: int):
+    runner.upgrade()
+    tenant_id, user_id = seed(tasks)
+    user = Principal(id=user_id, tenant_id=tenant_id, role="admin", is_active=True)
+
+    print(f"{engine.dialect.name}, {tasks} tasks, first page of 20, {runs} runs per term")
+    for name, term in TERMS.items():
+        timings, found = await measure(user, term, runs)
+        p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+        print(f"  {name:<14} {term!r:<12} {statistics.median(timings):8.1f} ms median  {p95:8.1f} ms p95  ({found} rows)")
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+    ))
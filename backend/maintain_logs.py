@@ -0,0 +1,20 @@
+"""
+Run one log maintenance pass: create upcoming daily partitions, drop expired
+ones and refresh the hourly rollups. For cron, with LOG_MAINTENANCE_SECONDS=0.
+
+    python maintain_logs.py
+"""
+import asyncio
+from app.core import log_maintenance
+from app.database import async_engine
+
+
+async def main():
+    try:
+        print(await log_maintenance.run_once())
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,34 @@
+"""
+Apply database migrations.
+
+    python migrate.py            # apply everything pending
+    python migrate.py status     # list migrations and whether they're applied
+    python migrate.py upgrade 2  # apply up to and including version 2
+"""
+import sys
+from app.migrations import runner
+
+
+def main(argv):
+    command = argv[0] if argv else "upgrade"
+
+    if command == "status":
+        for version, description, done in runner.status():
+            print(f"{'x' if done else ' '} {version:04d}  {description}")
+        return
+
+    if command == "upgrade":
+        target = int(argv[1]) if len(argv) > 1 else None
+        applied = runner.upgrade(target=target)
+        if applied:
+            print(f"Applied migrations: {', '.join(str(v) for v in applied)}")
+        else:
+            print("Database is up to date")
+        return
+
+    print(__doc__)
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
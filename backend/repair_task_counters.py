@@ -0,0 +1,25 @@
+"""
+Recompute projects.total_tasks, done_tasks and progress from the tasks
+table, fixing any project whose counters have drifted.
+
+    python repair_task_counters.py [project_id]
+"""
+import sys
+import asyncio
+from app.core import task_counters
+from app.database import async_engine
+
+
+async def main(project_id: int = None):
+    try:
+        async with async_engine.begin() as conn:
+            counters, progress = task_counters.recount(project_id)
+            fixed = (await conn.execute(counters)).rowcount
+            await conn.execute(progress)
+        print(f"Repaired task counters on {fixed} project(s)")
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else None))
@@ -0,0 +1,70 @@
+import os
+import tempfile
+
+# Settings are read at import time, so set them before the app is imported
+DB_PATH = os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("SECRET_KEY", "test-secret-key-with-enough-length")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("RATE_LIMIT", "100000")
+os.environ.setdefault("ARCHIVE_INTERVAL_SECONDS", "0")
+os.environ.setdefault("LOG_MAINTENANCE_SECONDS", "0")
+
+import httpx
+import pytest
+from app.main import app
+from app.core.rate_limit import limiter
+from app.database import async_engine, engine
+from app.migrations import runner
+
+
+# One event loop and one app startup for the whole run, as in a worker:
+# module-level queues and events bind to the loop they first run on
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def started_app(anyio_backend):
+    async with app.router.lifespan_context(app):
+        yield app
+    await async_engine.dispose()
+
+
+@pytest.fixture
+async def client(started_app):
+    # A fresh database per test; pooled connections would still point at the old file
+    await async_engine.dispose()
+    engine.dispose()
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    runner.upgrade()
+    # Per-route limits (5 signups a minute) would otherwise carry across tests
+    limiter.backend.tats.clear()
+    transport = httpx.ASGITransport(app=started_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+async def signup_admin(client, email="admin@example.com"):
+    r = await client.post("/auth/admin", json={
+        "company_name": "Acme", "name": "Admin", "email": email, "password": "password1",
+    })
+    assert r.status_code == 201, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def invite_user(client, admin, email, role="member", password="password2"):
+    r = await client.post("/invite/", json={"email": email, "role": role}, headers=admin)
+    assert r.status_code in (200, 201), r.text
+    r = await client.post(f"/invite/accept/{r.json()['token']}", json={"name": "User", "password": password})
+    assert r.status_code in (200, 201), r.text
+    body = r.json()
+    return body["user"]["id"], {"Authorization": f"Bearer {body['access_token']}"}
+
+
+async def login(client, email, password):
+    r = await client.post("/auth/login", data={"username": email, "password": password})
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
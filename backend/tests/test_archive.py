@@ -0,0 +1,40 @@
+import pytest
+from sqlalchemy import text
+from app.core import archive
+from app.database import async_engine
+from conftest import signup_admin
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def backdate_deletes():
+    async with async_engine.begin() as conn:
+        for table in ("projects", "tasks"):
+            await conn.execute(text(f"UPDATE {table} SET deleted_at = datetime('now', '-400 days') WHERE is_deleted"))
+
+
+async def test_sync_learns_about_rows_archived_since_its_cursor(client):
+    admin = await signup_admin(client)
+    r = await client.post("/projects/", json={"name": "Proj", "description": "d"}, headers=admin)
+    project_id = r.json()["id"]
+    r = await client.post(f"/projects/{project_id}/task", json={"title": "Old task", "description": "d"}, headers=admin)
+    task_id = r.json()["id"]
+    cursor = (await client.get("/sync", headers=admin)).json()["cursor"]
+
+    assert (await client.delete(f"/projects/{project_id}/task/{task_id}", headers=admin)).status_code == 204
+    await backdate_deletes()
+    assert await archive.run_once() == {"tasks": 1, "projects": 0}
+
+    r = await client.get("/sync", params={"since": cursor}, headers=admin)
+    body = r.json()
+    assert not body["reset"]
+    assert body["tasks"] == []
+    assert body["deleted"] == [{"kind": "task", "id": task_id, "project_id": project_id}]
+
+    # Restored under the same id, so the tombstone must not delete it again
+    assert (await client.post(f"/projects/{project_id}/task/{task_id}/restore", headers=admin)).status_code == 200
+    r = await client.get("/sync", params={"since": cursor}, headers=admin)
+    body = r.json()
+    assert [task["id"] for task in body["tasks"]] == [task_id]
+    assert body["deleted"] == []
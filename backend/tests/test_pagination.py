@@ -0,0 +1,39 @@
+import pytest
+from app.core.pagination import DEFAULT_PAGE_SIZE, NEXT_CURSOR_HEADER
+from conftest import signup_admin
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_tasks(client, headers, n):
+    r = await client.post("/projects/", json={"name": "Big", "description": "d"}, headers=headers)
+    project_id = r.json()["id"]
+    operations = [{"op": "create", "task": {"title": f"Task {i}", "description": "d"}} for i in range(n)]
+    r = await client.post(f"/projects/{project_id}/task/batch", json={"operations": operations}, headers=headers)
+    assert r.status_code == 200, r.text
+    return project_id
+
+
+async def test_task_list_is_unpaginated_without_limit_or_cursor(client):
+    admin = await signup_admin(client)
+    project_id = await create_tasks(client, admin, DEFAULT_PAGE_SIZE + 5)
+
+    r = await client.get(f"/projects/{project_id}/task", headers=admin)
+    assert r.status_code == 200
+    assert len(r.json()) == DEFAULT_PAGE_SIZE + 5
+    assert NEXT_CURSOR_HEADER not in r.headers
+
+
+async def test_task_list_pages_with_limit_and_cursor(client):
+    admin = await signup_admin(client)
+    project_id = await create_tasks(client, admin, 5)
+
+    r = await client.get(f"/projects/{project_id}/task", params={"limit": 3}, headers=admin)
+    first = r.json()
+    assert len(first) == 3
+    r = await client.get(f"/projects/{project_id}/task", params={"cursor": r.headers[NEXT_CURSOR_HEADER]}, headers=admin)
+    rest = r.json()
+    assert len(rest) == 2
+    assert NEXT_CURSOR_HEADER not in r.headers
+    assert {t["id"] for t in first}.isdisjoint(t["id"] for t in rest)
@@ -0,0 +1,40 @@
+import pytest
+from app.core.project_access import project_access_cache
+from conftest import signup_admin
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_cached_access_to_deleted_project_is_not_found(client):
+    admin = await signup_admin(client)
+    r = await client.post("/projects/", json={"name": "Doomed", "description": "d"}, headers=admin)
+    project_id = r.json()["id"]
+    me = (await client.post("/me", headers=admin)).json()
+
+    assert (await client.delete(f"/projects/{project_id}", headers=admin)).status_code == 204
+    # As if another worker still had the entry from before the delete
+    project_access_cache.put(me["id"], project_id, "owner")
+
+    assert (await client.get(f"/projects/{project_id}", headers=admin)).status_code == 404
+    r = await client.put(f"/projects/{project_id}", json={"name": "Back"}, headers=admin)
+    assert r.status_code == 404
+    assert (await client.put(f"/projects/{project_id}", json={}, headers=admin)).status_code == 404
+    assert (await client.delete(f"/projects/{project_id}", headers=admin)).status_code == 404
+
+
+async def test_task_cannot_be_added_to_deleted_project_with_cached_access(client):
+    admin = await signup_admin(client)
+    r = await client.post("/projects/", json={"name": "Doomed", "description": "d"}, headers=admin)
+    project_id = r.json()["id"]
+    # Caches the caller's role
+    assert (await client.get(f"/projects/{project_id}/task", headers=admin)).status_code == 200
+
+    assert (await client.delete(f"/projects/{project_id}", headers=admin)).status_code == 204
+    # The delete cleared this worker's entry; another worker's would still be there
+    me = (await client.post("/me", headers=admin)).json()
+    project_access_cache.put(me["id"], project_id, "owner")
+
+    r = await client.post(f"/projects/{project_id}/task", json={"title": "Late task", "description": "d"}, headers=admin)
+    assert r.status_code == 404
+    assert (await client.get(f"/projects/{project_id}/task", headers=admin)).status_code == 404
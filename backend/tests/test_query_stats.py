@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.core.query_stats import QueryStats, current_stats
+from app.database import async_engine
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failed_statement_is_counted_and_does_not_leak_its_start_time(client):
+    stats = QueryStats()
+    token = current_stats.set(stats)
+    try:
+        async with async_engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                await conn.execute(text("SELECT * FROM no_such_table"))
+            await conn.rollback()
+            await conn.execute(text("SELECT 1"))
+            assert conn.sync_connection.info["query_start"] == []
+    finally:
+        current_stats.reset(token)
+    assert stats.count == 2
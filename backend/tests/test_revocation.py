@@ -0,0 +1,33 @@
+import pytest
+from app.core import oauth2
+from conftest import invite_user, login, signup_admin
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def stateless_auth(monkeypatch):
+    monkeypatch.setattr(oauth2, "STATELESS_AUTH", True)
+
+
+def test_tokens_are_ordered_against_revocation_within_a_second():
+    revocations = oauth2.RevocationList(oauth2.revocations.token_lifetime)
+    revocations.users[1] = 1_000.7
+    assert revocations.is_revoked("a", 1, 999)
+    assert revocations.is_revoked("b", 1, 1_000.5)
+    assert not revocations.is_revoked("c", 1, 1_000.9)
+
+
+async def test_relogin_right_after_role_change_works(client, stateless_auth):
+    admin = await signup_admin(client)
+    user_id, old = await invite_user(client, admin, "member@example.com")
+
+    r = await client.patch(f"/user/{user_id}/role", json={"email": "member@example.com", "role": "admin"}, headers=admin)
+    assert r.status_code == 200, r.text
+    new = await login(client, "member@example.com", "password2")
+
+    assert (await client.get("/projects/", headers=new)).status_code == 200
+    # Issued moments before the revocation, most likely in the same second
+    assert (await client.get("/projects/", headers=old)).status_code == 401
+
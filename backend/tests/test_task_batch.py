@@ -0,0 +1,28 @@
+import pytest
+from conftest import signup_admin
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_batch_update_rejects_nulls_per_operation(client):
+    admin = await signup_admin(client)
+    r = await client.post("/projects/", json={"name": "Proj", "description": "d"}, headers=admin)
+    project_id = r.json()["id"]
+    ids = []
+    for title in ("Task one", "Task two"):
+        r = await client.post(f"/projects/{project_id}/task", json={"title": title, "description": "d"}, headers=admin)
+        ids.append(r.json()["id"])
+
+    r = await client.post(f"/projects/{project_id}/task/batch", json={"operations": [
+        {"op": "update", "id": ids[0], "task": {"status": "done"}},
+        {"op": "update", "id": ids[1], "task": {"title": None, "description": None}},
+    ]}, headers=admin)
+    assert r.status_code == 422
+    assert r.json()["detail"] == [{"index": 1, "error": "Cannot be null: title, description"}]
+
+    r = await client.get(f"/projects/{project_id}/task", headers=admin)
+    assert sorted((t["title"], t["description"], t["status"]) for t in r.json()) == [
+        ("Task one", "d", "todo"),
+        ("Task two", "d", "todo"),
+    ]